@@ -0,0 +1,142 @@
+"""
+Admission Control
+=================
+Protects the OpenAI quota from bursts:
+
+  AdmissionController — caps in-flight LLM calls with a semaphore and a
+      bounded wait queue.  A request is shed at once (Overloaded) when the
+      queue is full or its expected queue wait exceeds the client's
+      remaining time budget, instead of queueing into a provider 429 / 90s
+      timeout that fails every caller.
+  AccountRateLimiter — per-account token buckets (rate per minute + burst).
+      Only requests that need an OpenAI call are charged (RateLimited);
+      cache hits and joined in-flight requests are free.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable, Optional
+
+
+class Overloaded(Exception):
+    """The request was shed; ``reason`` is "queue_full" or "deadline"."""
+
+    def __init__(self, reason: str, expected_wait: float = 0.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.expected_wait = expected_wait
+
+
+class RateLimited(Exception):
+    """``account`` has no tokens left for another OpenAI call."""
+
+    def __init__(self, account: Hashable):
+        super().__init__(f"rate limited: {account}")
+        self.account = account
+
+
+class AdmissionController:
+    def __init__(self, max_inflight: int = 8, max_queue: int = 50, initial_service_seconds: float = 4.0):
+        self.max_inflight = max(1, max_inflight)
+        self.max_queue = max_queue
+        self._semaphore = asyncio.Semaphore(self.max_inflight)
+        self.inflight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed: dict[str, int] = {"queue_full": 0, "deadline": 0}
+        # EWMA of how long a slot is held (one LLM round-trip)
+        self.service_seconds = initial_service_seconds
+
+    def expected_wait(self) -> float:
+        """Rough queue wait for a new arrival: zero with a free slot, else
+        its share of the in-flight calls' residual time — with every slot
+        busy, one frees up about every ``service_seconds / max_inflight``."""
+        if self.inflight < self.max_inflight and self.waiting == 0:
+            return 0.0
+        return (self.waiting + 1) / self.max_inflight * self.service_seconds
+
+    @asynccontextmanager
+    async def slot(self, budget_seconds: Optional[float] = None) -> AsyncIterator[None]:
+        """Hold one in-flight LLM slot.  Raises Overloaded without waiting if
+        the queue is full or the expected wait exceeds ``budget_seconds``,
+        and if the slot still is not free when the budget runs out."""
+        if self.waiting >= self.max_queue:
+            self.shed["queue_full"] += 1
+            raise Overloaded("queue_full", self.expected_wait())
+        expected = self.expected_wait()
+        if budget_seconds is not None and expected > budget_seconds:
+            self.shed["deadline"] += 1
+            raise Overloaded("deadline", expected)
+
+        if self._semaphore.locked() or self.waiting:
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=budget_seconds)
+            except asyncio.TimeoutError:
+                self.shed["deadline"] += 1
+                raise Overloaded("deadline", expected)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()  # free slot: returns immediately
+
+        self.inflight += 1
+        self.admitted += 1
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.inflight -= 1
+            self._semaphore.release()
+            self.service_seconds += 0.2 * (time.monotonic() - start - self.service_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "admitted": self.admitted,
+            "shed": dict(self.shed),
+            "expected_wait_seconds": round(self.expected_wait(), 2),
+        }
+
+
+class AccountRateLimiter:
+    def __init__(self, rate_per_minute: float, burst: int, max_accounts: int = 10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_accounts = max_accounts
+        # account -> (tokens, last refill)
+        self._buckets: OrderedDict[Hashable, tuple[float, float]] = OrderedDict()
+        self.limited = 0
+
+    def allow(self, account: Hashable) -> bool:
+        now = time.monotonic()
+        tokens, last = self._buckets.get(account, (float(self.burst), now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        allowed = tokens >= 1.0
+        if allowed:
+            tokens -= 1.0
+        else:
+            self.limited += 1
+        self._buckets[account] = (tokens, now)
+        self._buckets.move_to_end(account)
+        while len(self._buckets) > self.max_accounts:
+            self._buckets.popitem(last=False)
+        return allowed
+
+    async def acquire(self, account: Hashable) -> bool:
+        """allow() for callers that also work with the shared (multi-worker)
+        limiter, whose check needs I/O."""
+        return self.allow(account)
+
+    def stats(self) -> dict:
+        return {
+            "accounts": len(self._buckets),
+            "rate_per_minute": round(self.rate * 60, 2),
+            "burst": self.burst,
+            "limited": self.limited,
+        }
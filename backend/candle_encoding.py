@@ -0,0 +1,116 @@
+"""
+Candle Encoding
+===============
+Renders the candle tables of the user prompt.  Candle rows are most of the
+prompt tokens (and so most of the time-to-first-token), so besides the
+original verbose layout there are denser encodings:
+
+  verbose — ``  <time> O=.. H=.. L=.. C=.. V=..`` per candle (original)
+  csv     — one header line, then ``time,open,high,low,close,volume`` rows
+            with prices at ``digits`` precision
+  delta   — prices as integer points relative to a base price and times as
+            minutes before the newest bar (``age_min``)
+
+All encodings read the same CandleSeries arrays; the per-TF candle limit is
+chosen by the caller.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from indicators import CandleSeries
+
+ENCODINGS = ("verbose", "csv", "delta")
+
+
+def parse_limits(spec: str) -> dict[str, int]:
+    """Parse ``"M5=30,H1=60"`` into {timeframe: candle limit}."""
+    limits = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        tf, _, value = part.partition("=")
+        if value.strip().isdigit():
+            limits[tf.strip().upper()] = int(value)
+    return limits
+
+
+def _iso_label(label: str) -> str:
+    label = label.strip().rstrip("Z")
+    if label[4:5] == ".":
+        label = label.replace(".", "-", 2)
+    return label.replace(" ", "T")
+
+
+def epoch_seconds(series: CandleSeries, start: int = 0) -> Optional[np.ndarray]:
+    """Candle times as epoch seconds, or None when the EA's labels cannot be
+    parsed (MT5 ``2026.01.15 10:30`` and ISO-8601 UTC labels are supported)."""
+    if isinstance(series.time, np.ndarray):
+        return series.time[start:]
+    try:
+        return np.array([_iso_label(label) for label in series.time[start:]], dtype="datetime64[s]").astype(np.int64)
+    except ValueError:
+        return None
+
+
+def label_epoch(label: str) -> Optional[int]:
+    """One time label (same formats as epoch_seconds) as epoch seconds."""
+    try:
+        return int(np.datetime64(_iso_label(label), "s").astype(np.int64)) if label.strip() else None
+    except ValueError:
+        return None
+
+
+def _verbose(series: CandleSeries, start: int, digits: int) -> list[str]:
+    rows = zip(
+        series.time_labels(start), series.open[start:].tolist(), series.high[start:].tolist(),
+        series.low[start:].tolist(), series.close[start:].tolist(), series.volume[start:].tolist(),
+    )
+    return [f"  {t} O={o} H={h} L={l} C={c} V={v}" for t, o, h, l, c, v in rows]
+
+
+def _csv(series: CandleSeries, start: int, digits: int) -> list[str]:
+    d = digits
+    rows = zip(
+        series.time_labels(start), series.open[start:].tolist(), series.high[start:].tolist(),
+        series.low[start:].tolist(), series.close[start:].tolist(), series.volume[start:].tolist(),
+    )
+    lines = ["time,open,high,low,close,volume"]
+    lines.extend(f"{t},{o:.{d}f},{h:.{d}f},{l:.{d}f},{c:.{d}f},{v:.0f}" for t, o, h, l, c, v in rows)
+    return lines
+
+
+def _delta(series: CandleSeries, start: int, digits: int) -> list[str]:
+    scale = 10 ** digits
+    base = round(float(series.close[start]) * scale)
+    prices = [np.rint(col[start:] * scale).astype(np.int64) - base
+              for col in (series.open, series.high, series.low, series.close)]
+    volume = np.rint(series.volume[start:]).astype(np.int64)
+
+    seconds = epoch_seconds(series, start)
+    newest = series.time_labels(len(series) - 1)[0]
+    if seconds is not None:
+        age = ((seconds[-1] - seconds) // 60).tolist()
+        time_col, time_note = "age_min", f"minutes before the newest bar ({newest})"
+    else:
+        age = list(range(len(volume) - 1, -1, -1))
+        time_col, time_note = "bars_ago", f"bars before the newest bar ({newest})"
+
+    lines = [
+        f"Prices in points (1 point = {1 / scale:.{digits}f}) relative to base {base / scale:.{digits}f}; "
+        f"{time_col} = {time_note}",
+        f"{time_col},o,h,l,c,v",
+    ]
+    lines.extend(
+        f"{a},{o:+d},{h:+d},{l:+d},{c:+d},{v}"
+        for a, o, h, l, c, v in zip(age, *(p.tolist() for p in prices), volume.tolist())
+    )
+    return lines
+
+
+_ENCODERS = {"verbose": _verbose, "csv": _csv, "delta": _delta}
+
+
+def encode_candles(series: CandleSeries, limit: int, digits: int, encoding: str = "verbose") -> list[str]:
+    """The newest ``limit`` candles of one timeframe as prompt lines."""
+    start = max(0, len(series) - limit)
+    return _ENCODERS.get(encoding, _verbose)(series, start, digits)
@@ -0,0 +1,103 @@
+"""
+Candle Store
+============
+Bounded per-(account, symbol, timeframe) ring buffers of candles for the
+incremental "delta" ingest mode.  After one full upload the EA only sends
+candles at or after the last timestamp the server acknowledged, plus a
+checksum of the series it expects; the server merges them into its buffer
+and rebuilds the full candle view for ATR and the prompt.
+
+Candles are stored as-is (any object with ``time`` and ``close``
+attributes), so this module does not depend on the request models.
+"""
+
+import zlib
+from collections import OrderedDict, deque
+from typing import Any, Optional, Sequence
+
+
+def series_checksum(candles: Sequence[Any], digits: int) -> str:
+    """CRC32 over ``time,close_in_points`` of every candle, as 8 hex chars.
+
+    Closes are compared as integer points (close × 10^digits) so the EA and
+    the server agree regardless of how each side formats floats."""
+    scale = 10 ** digits
+    payload = ";".join(f"{c.time},{round(c.close * scale)}" for c in candles)
+    return f"{zlib.crc32(payload.encode('utf-8')):08x}"
+
+
+class CandleStore:
+    def __init__(self, max_candles: int = 1000, max_series: int = 500):
+        self.max_candles = max_candles
+        self.max_series = max_series
+        self._series: OrderedDict[tuple, deque] = OrderedDict()
+        self.resyncs = 0
+
+    def replace(self, key: tuple, candles: Sequence[Any]):
+        """Seed (or reset) a series from a full upload.  The buffer size
+        follows the EA's CandleCount, capped at max_candles."""
+        size = max(1, min(len(candles), self.max_candles))
+        self._series[key] = deque(candles[-size:], maxlen=size)
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_series:
+            self._series.popitem(last=False)
+
+    def apply_delta(
+        self,
+        key: tuple,
+        since: Optional[str],
+        candles: Sequence[Any],
+        checksum: Optional[str],
+        digits: int,
+    ) -> bool:
+        """Merge candles newer than ``since`` (and optionally the ``since``
+        bar itself, now closed) into the buffer.  ``since=None`` means the
+        candles are a full series.  Returns False when the server cannot
+        rebuild the series (unknown series, ``since`` no longer buffered, or
+        checksum mismatch) — the EA must then resend that timeframe in full."""
+        if since is None:
+            if not candles:
+                return False
+            self.replace(key, candles)
+            buf = self._series[key]
+        else:
+            buf = self._series.get(key)
+            if buf is None:
+                self.resyncs += 1
+                return False
+            # Roll back to the acknowledged bar, tolerating acks the EA never
+            # received; the bar itself is replaced if the EA resends it closed.
+            while buf and buf[-1].time > since:
+                buf.pop()
+            if not buf or buf[-1].time != since:
+                self._series.pop(key, None)
+                self.resyncs += 1
+                return False
+            for c in candles:
+                if c.time == buf[-1].time:
+                    buf[-1] = c
+                elif c.time > buf[-1].time:
+                    buf.append(c)
+            self._series.move_to_end(key)
+
+        if checksum and series_checksum(buf, digits) != checksum.lower():
+            self._series.pop(key, None)
+            self.resyncs += 1
+            return False
+        return True
+
+    def view(self, key: tuple) -> list:
+        buf = self._series.get(key)
+        return list(buf) if buf is not None else []
+
+    def last_time(self, key: tuple) -> Optional[str]:
+        buf = self._series.get(key)
+        return buf[-1].time if buf else None
+
+    def stats(self) -> dict:
+        return {
+            "series": len(self._series),
+            "max_series": self.max_series,
+            "max_candles": self.max_candles,
+            "resyncs": self.resyncs,
+        }
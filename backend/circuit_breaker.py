@@ -0,0 +1,161 @@
+"""
+Circuit Breakers
+================
+One breaker per OpenAI model.  Each keeps a rolling window of call outcomes
+(success + latency, or failure) and moves through the usual states:
+
+  closed     — traffic flows; opens after ``failure_threshold`` consecutive
+               failures/timeouts, or when the window's error rate reaches
+               ``error_rate`` (with at least ``min_samples`` calls)
+  open       — no traffic; after ``open_seconds`` a background probe call
+               is made (half-open)
+  half_open  — probe in flight; success closes the breaker, failure
+               re-opens it for another ``open_seconds``
+
+``route()`` orders models for a request: closed breakers only, with models
+whose recent p90 latency exceeds ``slow_seconds`` moved behind the rest.
+
+Only failures that say something about the model's health should be
+recorded — timeouts, connection errors, 429s and 5xx responses.  A bad
+request or an unparseable answer is the caller's problem, not the model's.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional
+
+logger = logging.getLogger()
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    def __init__(self, model: str, window: int = 20):
+        self.model = model
+        self.state = CLOSED
+        # (ok, seconds) per call, newest last
+        self.outcomes: deque[tuple[bool, float]] = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.times_opened = 0
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return sum(1 for ok, _ in self.outcomes if not ok) / len(self.outcomes)
+
+    def latency_percentile(self, q: float) -> Optional[float]:
+        latencies = sorted(seconds for ok, seconds in self.outcomes if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def status(self) -> dict:
+        p50, p90 = self.latency_percentile(0.5), self.latency_percentile(0.9)
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 3),
+            "samples": len(self.outcomes),
+            "consecutive_failures": self.consecutive_failures,
+            "p50_seconds": round(p50, 2) if p50 is not None else None,
+            "p90_seconds": round(p90, 2) if p90 is not None else None,
+            "open_for_seconds": round(time.time() - self.opened_at, 1) if self.opened_at else 0.0,
+            "times_opened": self.times_opened,
+        }
+
+
+class BreakerBoard:
+    def __init__(
+        self,
+        probe: Callable[[str], Awaitable[None]],
+        failure_threshold: int = 3,
+        error_rate: float = 0.5,
+        min_samples: int = 10,
+        open_seconds: float = 60.0,
+        slow_seconds: float = 60.0,
+        window: int = 20,
+    ):
+        self.probe = probe              # model -> raises if the model is still unhealthy
+        self.failure_threshold = failure_threshold
+        self.error_rate = error_rate
+        self.min_samples = min_samples
+        self.open_seconds = open_seconds
+        self.slow_seconds = slow_seconds
+        self.window = window
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._probes: dict[str, asyncio.Task] = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self._breakers:
+            self._breakers[model] = CircuitBreaker(model, self.window)
+        return self._breakers[model]
+
+    def route(self, models: list[str]) -> list[str]:
+        """Models to try, in order: closed breakers only; slow ones last."""
+        healthy = [m for m in models if self.breaker(m).state == CLOSED]
+
+        def is_slow(model: str) -> bool:
+            p90 = self.breaker(model).latency_percentile(0.9)
+            return p90 is not None and p90 > self.slow_seconds
+
+        return sorted(healthy, key=is_slow)
+
+    def record_success(self, model: str, seconds: float):
+        b = self.breaker(model)
+        b.outcomes.append((True, seconds))
+        b.consecutive_failures = 0
+
+    def record_failure(self, model: str, reason: str):
+        b = self.breaker(model)
+        b.outcomes.append((False, 0.0))
+        b.consecutive_failures += 1
+        if b.state != CLOSED:
+            return
+        if b.consecutive_failures >= self.failure_threshold or (
+            len(b.outcomes) >= self.min_samples and b.error_rate() >= self.error_rate
+        ):
+            self._open(b, f"{b.consecutive_failures} consecutive failures, last: {reason}"
+                          if b.consecutive_failures >= self.failure_threshold
+                          else f"error rate {b.error_rate():.0%} over {len(b.outcomes)} calls")
+
+    def _open(self, b: CircuitBreaker, why: str):
+        b.state = OPEN
+        b.opened_at = time.time()
+        b.times_opened += 1
+        logger.error(f"   ⛔ Circuit OPEN for {b.model} ({why}) — routing around it, probing in {self.open_seconds:.0f}s")
+        if b.model not in self._probes:
+            self._probes[b.model] = asyncio.ensure_future(self._probe_loop(b))
+
+    async def _probe_loop(self, b: CircuitBreaker):
+        try:
+            while b.state != CLOSED:
+                await asyncio.sleep(self.open_seconds)
+                b.state = HALF_OPEN
+                start = time.time()
+                try:
+                    await self.probe(b.model)
+                except Exception as e:
+                    b.state = OPEN
+                    b.opened_at = time.time()
+                    logger.warning(f"   ⛔ Probe of {b.model} failed ({e}) — circuit stays open")
+                    continue
+                b.state = CLOSED
+                b.opened_at = None
+                b.consecutive_failures = 0
+                b.outcomes.clear()
+                b.outcomes.append((True, time.time() - start))
+                logger.info(f"   ✅ Probe of {b.model} succeeded — circuit closed")
+        finally:
+            self._probes.pop(b.model, None)
+
+    async def stop(self):
+        tasks = list(self._probes.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def status(self) -> dict:
+        return {model: b.status() for model, b in self._breakers.items()}
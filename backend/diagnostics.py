@@ -0,0 +1,175 @@
+"""
+Diagnostics
+===========
+Tools for finding out where the time goes when latency spikes, without
+restarting the server or adding a dependency.
+
+  SamplingProfiler — a background thread that snapshots the event-loop
+                     thread's stack every few milliseconds and counts
+                     identical stacks.  The result is written in the
+                     "folded" format (``frame;frame;frame count`` per line)
+                     that flamegraph.pl, speedscope.app and inferno read.
+  LoopMonitor      — measures how late a periodic event-loop timer fires
+                     (loop lag) and runs a watchdog thread that, when the
+                     loop has not come back for ``threshold`` seconds, logs
+                     the stack of whatever is blocking it.
+
+Both read ``sys._current_frames()`` from their own thread, so the loop is
+never paused to take a sample.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Optional
+
+from metrics import LOOP_BLOCKED, LOOP_LAG_SECONDS
+
+logger = logging.getLogger()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def folded_stack(frame) -> str:
+    """Outermost-first ``;``-joined frame labels."""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self.samples: Counter = Counter()
+        self.started_at: Optional[float] = None
+        self.stopped_at: Optional[float] = None
+        self.interval = 0.005
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float, interval: float = 0.005, thread_id: Optional[int] = None):
+        """Sample ``thread_id`` (default: the calling thread, i.e. the event
+        loop) every ``interval`` seconds for ``seconds``.  Replaces the last
+        profile.  Raises RuntimeError if one is already running."""
+        if self.running:
+            raise RuntimeError("profiler already running")
+        self.samples = Counter()
+        self.interval = interval
+        self.started_at, self.stopped_at = time.time(), None
+        self._stop.clear()
+        target = thread_id if thread_id is not None else threading.get_ident()
+        self._thread = threading.Thread(target=self._run, args=(target, seconds), name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self, thread_id: int, seconds: float):
+        deadline = time.monotonic() + seconds
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self.samples[folded_stack(frame)] += 1
+            del frame
+            self._stop.wait(self.interval)
+        self.stopped_at = time.time()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+    def status(self) -> dict:
+        end = self.stopped_at or (time.time() if self.started_at else None)
+        return {
+            "running": self.running,
+            "started_at": self.started_at,
+            "seconds": round(end - self.started_at, 1) if self.started_at else 0.0,
+            "interval_ms": self.interval * 1000,
+            "samples": sum(self.samples.values()),
+            "unique_stacks": len(self.samples),
+        }
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.2, log_cooldown: float = 10.0):
+        self.interval = interval
+        self.threshold = threshold
+        self.log_cooldown = log_cooldown
+        self._beat = time.monotonic()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread: Optional[int] = None
+        self.max_lag = 0.0
+        self.blocked = 0
+        self.stacks_logged = 0
+
+    def start(self):
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.ensure_future(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+        if self._watchdog is not None:
+            await asyncio.to_thread(self._watchdog.join)
+
+    async def _tick(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = time.monotonic()
+            lag = max(0.0, self._beat - start - self.interval)
+            LOOP_LAG_SECONDS.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    def _watch(self):
+        """Runs in its own thread: catch the loop in the act of being blocked."""
+        reported_beat = None
+        last_log = 0.0
+        while not self._stop.wait(self.threshold / 2):
+            beat = self._beat
+            stalled = time.monotonic() - beat - self.interval
+            if stalled < self.threshold or beat == reported_beat:
+                continue
+            reported_beat = beat    # one report per stall
+            self.blocked += 1
+            LOOP_BLOCKED.inc()
+            now = time.monotonic()
+            if now - last_log < self.log_cooldown:
+                continue
+            last_log = now
+            frame = sys._current_frames().get(self._loop_thread)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "(no frame)\n"
+            del frame
+            self.stacks_logged += 1
+            logger.warning(f"🐢 Event loop blocked for {stalled * 1000:.0f}ms+ — stack of the blocking code:\n{stack.rstrip()}")
+
+    def stats(self) -> dict:
+        return {
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "max_lag_ms": round(self.max_lag * 1000, 1),
+            "blocked": self.blocked,
+            "stacks_logged": self.stacks_logged,
+        }
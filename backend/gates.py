@@ -0,0 +1,189 @@
+"""
+Pre-filter Gates
+================
+Deterministic checks that run on the computed indicators before any LLM
+call.  Each gate looks at the request context and returns a veto reason
+(short-circuiting the pipeline) or None.  They take microseconds, so on a
+dead or closed market the backend answers at once instead of paying for an
+OpenAI call that would veto anyway.
+
+Gates (enabled and ordered by the PREFILTER_GATES setting):
+  market_closed      — weekend for non-crypto instruments
+  session            — instrument type blocked in the current session
+  stale_candles      — newest candle too old for its timeframe (needs the
+                       broker's UTC offset; see broker_utc_offset)
+  atr_regime         — ATR far below its own average (market asleep)
+  choppiness         — Choppiness Index above the limit
+  range_compression  — recent range only a few ATRs wide
+"""
+
+import math
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Optional
+
+from candle_encoding import epoch_seconds, label_epoch
+from indicators import ATR_PERIOD, TIMEFRAME_SECONDS, CandleSeries, TFIndicators, true_range
+
+
+@dataclass
+class GateConfig:
+    atr_min_ratio: float = 0.3          # ATR / mean true range of the whole series
+    chop_period: int = ATR_PERIOD
+    chop_max: float = 80.0              # Choppiness Index (0–100)
+    min_range_atr: float = 2.0          # structure-window range in ATRs
+    stale_periods: float = 4.0          # candle periods
+    broker_utc_offset: Optional[float] = None   # seconds; None = derive per request
+    session_block: dict[str, set[str]] = field(default_factory=dict)  # instrument type -> session keys
+
+
+@dataclass
+class GateContext:
+    symbol: str
+    timeframe: str
+    series: dict[str, CandleSeries]
+    indicators: dict[str, TFIndicators]
+    atr_tf: Optional[str]               # timeframe the ATR-based gates use
+    session: dict                       # get_session_info() result
+    now: datetime                       # UTC
+    server_time: str = ""               # broker clock when the request was sent
+
+
+def parse_session_block(spec: str) -> dict[str, set[str]]:
+    """Parse ``"index=asian,forex=asian+newyork"`` into {type: {session keys}}."""
+    rules: dict[str, set[str]] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        kind, _, sessions = part.partition("=")
+        rules.setdefault(kind.strip().lower(), set()).update(
+            s.strip().lower() for s in sessions.split("+") if s.strip()
+        )
+    return rules
+
+
+def broker_utc_offset(server_time: str, now: datetime) -> Optional[float]:
+    """Broker server time minus UTC in seconds, from the broker clock the EA
+    sent, rounded to 15 minutes (broker offsets are whole or half hours; the
+    rounding absorbs transit time).  None when it cannot be parsed."""
+    broker_now = label_epoch(server_time)
+    if broker_now is None:
+        return None
+    return round((broker_now - now.timestamp()) / 900) * 900.0
+
+
+def market_closed(ctx: GateContext, cfg: GateConfig) -> Optional[str]:
+    if ctx.session["instrument"]["type"] == "crypto":
+        return None
+    weekday, hour = ctx.now.weekday(), ctx.now.hour
+    if weekday == 5 or (weekday == 4 and hour >= 22) or (weekday == 6 and hour < 21):
+        return "market closed (weekend)"
+    return None
+
+
+def session(ctx: GateContext, cfg: GateConfig) -> Optional[str]:
+    kind = ctx.session["instrument"]["type"]
+    if ctx.session["key"] in cfg.session_block.get(kind, ()):
+        return f"{kind} not traded during {ctx.session['session']}"
+    return None
+
+
+def stale_candles(ctx: GateContext, cfg: GateConfig) -> Optional[str]:
+    tf = ctx.timeframe if ctx.timeframe in ctx.series else ctx.atr_tf
+    period = TIMEFRAME_SECONDS.get((tf or "").upper())
+    if period is None or not len(ctx.series[tf]):
+        return None
+    # Bar times are broker server time: compare them with the broker's clock
+    offset = cfg.broker_utc_offset
+    if offset is None:
+        offset = broker_utc_offset(ctx.server_time, ctx.now)
+    times = epoch_seconds(ctx.series[tf], len(ctx.series[tf]) - 1)
+    if times is None or offset is None:
+        return None
+    age = ctx.now.timestamp() + offset - int(times[-1])
+    if age > cfg.stale_periods * period:
+        return f"stale candles: newest {tf} bar is {age / 60:.0f} min old"
+    return None
+
+
+def atr_regime(ctx: GateContext, cfg: GateConfig) -> Optional[str]:
+    if ctx.atr_tf is None:
+        return None
+    s = ctx.series[ctx.atr_tf]
+    tr = true_range(s.high, s.low, s.close)
+    if len(tr) < 3 * ATR_PERIOD or tr.mean() <= 0:
+        return None
+    ratio = ctx.indicators[ctx.atr_tf].atr / float(tr.mean())
+    if ratio < cfg.atr_min_ratio:
+        return f"ATR regime: {ctx.atr_tf} ATR is {ratio:.0%} of its average"
+    return None
+
+
+def choppiness_index(s: CandleSeries, period: int) -> Optional[float]:
+    """100·log10(ΣTR / (highest high − lowest low)) / log10(period) over the
+    last ``period`` bars; high values mean sideways chop."""
+    if len(s) < period + 1:
+        return None
+    tr = true_range(s.high[-period - 1:], s.low[-period - 1:], s.close[-period - 1:])
+    span = float(s.high[-period:].max() - s.low[-period:].min())
+    if span <= 0:
+        return 100.0
+    return 100.0 * math.log10(float(tr.sum()) / span) / math.log10(period)
+
+
+def choppiness(ctx: GateContext, cfg: GateConfig) -> Optional[str]:
+    if ctx.atr_tf is None:
+        return None
+    ci = choppiness_index(ctx.series[ctx.atr_tf], cfg.chop_period)
+    if ci is not None and ci > cfg.chop_max:
+        return f"choppy: {ctx.atr_tf} Choppiness Index {ci:.0f} > {cfg.chop_max:.0f}"
+    return None
+
+
+def range_compression(ctx: GateContext, cfg: GateConfig) -> Optional[str]:
+    if ctx.atr_tf is None:
+        return None
+    ind = ctx.indicators[ctx.atr_tf]
+    if ind.atr <= 0 or ind.window < 2 * ATR_PERIOD:
+        return None
+    range_atr = (ind.recent_high - ind.recent_low) / ind.atr
+    if range_atr < cfg.min_range_atr:
+        return f"range compression: {ctx.atr_tf} {ind.window}-candle range is {range_atr:.1f}×ATR"
+    return None
+
+
+GATES: dict[str, Callable[[GateContext, GateConfig], Optional[str]]] = {
+    "market_closed": market_closed,
+    "session": session,
+    "stale_candles": stale_candles,
+    "atr_regime": atr_regime,
+    "choppiness": choppiness,
+    "range_compression": range_compression,
+}
+
+
+class GatePipeline:
+    def __init__(self, names: list[str], config: GateConfig):
+        unknown = [n for n in names if n not in GATES]
+        if unknown:
+            raise ValueError(f"unknown pre-filter gate(s): {', '.join(unknown)}")
+        self.names = names
+        self.config = config
+        self.hits: dict[str, int] = {name: 0 for name in names}
+        self.checked = 0
+
+    def run(self, ctx: GateContext) -> Optional[tuple[str, str]]:
+        """(gate name, veto reason) for the first gate that vetoes, else None."""
+        self.checked += 1
+        for name in self.names:
+            reason = GATES[name](ctx, self.config)
+            if reason:
+                self.hits[name] += 1
+                return name, reason
+        return None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "gates": self.names,
+            "checked": self.checked,
+            "hits": dict(self.hits),
+            "llm_calls_avoided": sum(self.hits.values()),
+        }
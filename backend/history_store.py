@@ -0,0 +1,182 @@
+"""
+History Store
+=============
+Embedded SQLite database (WAL mode) with one row per answered /signal
+request: account, symbol, market snapshot, the signal, where it came from
+(openai / cache / precomputed / prefilter / ...), the model, latency and
+token usage.
+
+The request path only appends a row to an in-memory queue; a background
+writer task inserts queued rows in batches (one transaction per batch) on a
+worker thread, so requests never wait on disk.  When the queue is full,
+rows are dropped and counted rather than blocking.
+
+Queries run on their own read-only connection and are read in chunks, so
+large result sets stream instead of loading into memory.
+"""
+
+import asyncio
+import logging
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, AsyncIterator, Optional
+
+logger = logging.getLogger()
+
+COLUMNS = (
+    "ts", "account_id", "symbol", "timeframe", "bid", "ask", "spread_points",
+    "source", "model", "bias", "order_type", "entry", "sl", "tp", "expiry_minutes",
+    "confidence", "veto", "veto_reason", "latency_ms",
+    "prompt_tokens", "completion_tokens", "cached_tokens",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS signals (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,                -- epoch seconds (UTC)
+    account_id TEXT,
+    symbol TEXT NOT NULL,
+    timeframe TEXT,
+    bid REAL,
+    ask REAL,
+    spread_points INTEGER,
+    source TEXT,
+    model TEXT,
+    bias TEXT,
+    order_type TEXT,
+    entry REAL,
+    sl REAL,
+    tp REAL,
+    expiry_minutes INTEGER,
+    confidence REAL,
+    veto INTEGER,
+    veto_reason TEXT,
+    latency_ms REAL,
+    prompt_tokens INTEGER,
+    completion_tokens INTEGER,
+    cached_tokens INTEGER
+);
+CREATE INDEX IF NOT EXISTS signals_ts ON signals (ts);
+CREATE INDEX IF NOT EXISTS signals_symbol_ts ON signals (symbol, ts);
+CREATE INDEX IF NOT EXISTS signals_account_ts ON signals (account_id, ts);
+"""
+
+_INSERT = f"INSERT INTO signals ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+
+
+class HistoryStore:
+    def __init__(self, path: str, batch_size: int = 200, flush_seconds: float = 1.0, max_pending: int = 10000):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self._queue: asyncio.Queue[tuple] = asyncio.Queue(maxsize=max_pending)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self._batch: list[tuple] = []     # taken off the queue, not yet handed to a write
+        self._writing: Optional[asyncio.Future] = None
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def record(self, row: dict[str, Any]):
+        """Queue one row (keys from COLUMNS; missing ones are NULL).  Never blocks."""
+        try:
+            self._queue.put_nowait(tuple(row.get(c) for c in COLUMNS))
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def start(self):
+        await asyncio.to_thread(self._open)
+        self._task = asyncio.ensure_future(self._run())
+
+    def _open(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    async def stop(self):
+        """Stop the writer, flush whatever is still queued and close."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        if self._writing is not None:
+            await asyncio.gather(self._writing, return_exceptions=True)
+        rest, self._batch = self._batch, []
+        while not self._queue.empty():
+            rest.append(self._queue.get_nowait())
+        if rest:
+            await asyncio.to_thread(self._write, rest)
+        await asyncio.to_thread(self._conn.close)
+        self._task = None
+
+    async def _run(self):
+        while True:
+            self._batch = [await self._queue.get()]
+            await asyncio.sleep(self.flush_seconds)  # let the batch fill up
+            while len(self._batch) < self.batch_size and not self._queue.empty():
+                self._batch.append(self._queue.get_nowait())
+            batch, self._batch = self._batch, []
+            # Shielded so shutdown waits for the transaction instead of cutting it
+            self._writing = asyncio.ensure_future(asyncio.to_thread(self._write, batch))
+            await asyncio.shield(self._writing)
+
+    def _write(self, batch: list[tuple]):
+        try:
+            with self._conn:
+                self._conn.executemany(_INSERT, batch)
+        except sqlite3.Error as e:
+            self.failed += len(batch)
+            logger.error(f"   ❌ History write failed ({len(batch)} rows dropped): {e}")
+            return
+        self.written += len(batch)
+        self.batches += 1
+
+    async def query(
+        self,
+        symbol: Optional[str] = None,
+        account_id: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        limit: int = 1000,
+        chunk_size: int = 500,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """Rows matching the filters, newest first, read ``chunk_size`` at a time."""
+        where, params = [], []
+        for clause, value in (("symbol = ?", symbol), ("account_id = ?", account_id),
+                              ("ts >= ?", since), ("ts < ?", until)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        sql = f"SELECT {', '.join(COLUMNS)} FROM signals"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+
+        uri = Path(self.path).absolute().as_uri() + "?mode=ro"
+        conn = await asyncio.to_thread(sqlite3.connect, uri, uri=True, check_same_thread=False)
+        try:
+            cursor = await asyncio.to_thread(conn.execute, sql, params)
+            while True:
+                rows = await asyncio.to_thread(cursor.fetchmany, chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(COLUMNS, row))
+        finally:
+            conn.close()
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "pending": self._queue.qsize(),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
@@ -0,0 +1,266 @@
+"""
+HTTP Compression
+================
+Pure ASGI middleware for compressed request and response bodies.  A
+1000-candle × 5-TF /signal body is hundreds of KB of repetitive JSON, and
+it shrinks roughly 5–10× compressed.
+
+Requests: ``Content-Encoding: gzip``, ``deflate`` (zlib-wrapped or raw — MT5's
+``CryptEncode(CRYPT_ARCH_ZIP)`` output is raw deflate) and ``zstd`` (when the
+optional ``zstandard`` package is installed) are decompressed chunk by chunk
+as the body arrives.  Output is capped at ``max_body_bytes``, so a small
+"decompression bomb" is refused with 413 long before it fills memory.  The
+app behind the middleware sees a plain body.
+
+Responses: complete (non-streaming) bodies of at least ``min_response_bytes``
+are compressed with the best coding the client lists in ``Accept-Encoding``.
+Streaming replies (SSE, NDJSON) are passed through as they are.
+"""
+
+import logging
+import time
+import zlib
+from typing import Optional
+
+from fastapi.responses import JSONResponse
+
+from metrics import HTTP_BODY_BYTES, HTTP_DECOMPRESS_SECONDS, HTTP_DECOMPRESS_REJECTED
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip and deflate always work
+    zstandard = None
+
+logger = logging.getLogger()
+
+# Server preference when the client rates several codings equally
+RESPONSE_CODINGS = ("zstd", "gzip", "deflate") if zstandard is not None else ("gzip", "deflate")
+REQUEST_CODINGS = {"gzip", "x-gzip", "deflate"} | ({"zstd"} if zstandard is not None else set())
+
+
+class BodyTooLarge(Exception):
+    pass
+
+
+class _CappedSink:
+    """Write target for the zstd stream writer that refuses to grow past the cap."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.parts: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise BodyTooLarge
+        self.parts.append(bytes(data))
+        return len(data)
+
+
+class BodyDecoder:
+    """Incremental decompressor with an output cap.  feed() raises
+    BodyTooLarge past ``max_bytes`` and ValueError on corrupt input."""
+
+    def __init__(self, encoding: str, max_bytes: int):
+        self.encoding = encoding
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.parts: list[bytes] = []
+        self._zlib = None
+        self._zstd_sink: Optional[_CappedSink] = None
+        self._zstd = None
+        if encoding == "zstd":
+            self._zstd_sink = _CappedSink(max_bytes)
+            self._zstd = zstandard.ZstdDecompressor().stream_writer(self._zstd_sink, write_size=65536)
+
+    def _new_zlib(self, head: bytes):
+        if self.encoding in ("gzip", "x-gzip"):
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        # "deflate" should be zlib-wrapped (RFC 9110) but is often sent raw
+        is_zlib = len(head) >= 2 and head[0] & 0x0F == 8 and (head[0] << 8 | head[1]) % 31 == 0
+        return zlib.decompressobj(zlib.MAX_WBITS if is_zlib else -zlib.MAX_WBITS)
+
+    def feed(self, data: bytes):
+        if self._zstd is not None:
+            try:
+                self._zstd.write(data)
+            except zstandard.ZstdError as e:
+                raise ValueError(str(e))
+            return
+        while data:
+            if self._zlib is None:
+                self._zlib = self._new_zlib(data)
+            try:
+                # One byte over the remaining room is enough to know it's too large
+                out = self._zlib.decompress(data, self.max_bytes - self.size + 1)
+            except zlib.error as e:
+                raise ValueError(str(e))
+            self.size += len(out)
+            if self.size > self.max_bytes:
+                raise BodyTooLarge
+            self.parts.append(out)
+            # A gzip body may hold several members back to back
+            data = self._zlib.unused_data
+            if data:
+                self._zlib = None
+
+    def finish(self) -> bytes:
+        if self._zstd is not None:
+            self._zstd.flush()
+            return b"".join(self._zstd_sink.parts)
+        if self._zlib is not None and not self._zlib.eof:
+            raise ValueError("truncated compressed body")
+        return b"".join(self.parts)
+
+
+def choose_coding(accept_encoding: str) -> Optional[str]:
+    """Best coding from an Accept-Encoding header (q-values honoured), or None."""
+    weights: dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name.strip().lower()] = q
+    wildcard = weights.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in RESPONSE_CODINGS:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(data: bytes, coding: str, level: int) -> bytes:
+    if coding == "zstd":
+        return zstandard.ZstdCompressor(level=min(level, 19)).compress(data)
+    if coding == "gzip":
+        c = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    else:
+        c = zlib.compressobj(level)
+    return c.compress(data) + c.flush()
+
+
+def _kb(n: int) -> str:
+    return f"{n / 1024:.1f} KB"
+
+
+class CompressionMiddleware:
+    def __init__(self, app, max_body_bytes: int = 32 * 1024 * 1024, min_response_bytes: int = 1024, level: int = 5):
+        self.app = app
+        self.max_body_bytes = max_body_bytes
+        self.min_response_bytes = min_response_bytes
+        self.level = level
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        encoding = headers.get(b"content-encoding", b"").decode("latin-1").strip().lower()
+        if encoding and encoding != "identity":
+            if encoding not in REQUEST_CODINGS:
+                HTTP_DECOMPRESS_REJECTED.inc(reason="unsupported")
+                response = JSONResponse(status_code=415, content={"detail": f"unsupported Content-Encoding: {encoding}"})
+                return await response(scope, receive, send)
+            body = await self._decompress(encoding, receive)
+            if isinstance(body, JSONResponse):
+                return await body(scope, receive, send)
+            # In place, not a copy: the router writes "endpoint" into this scope
+            # and the outer request logger reads it for the handler label
+            scope["headers"] = [(k, v) for k, v in scope["headers"] if k not in (b"content-encoding", b"content-length")]
+            scope["headers"].append((b"content-length", str(len(body)).encode()))
+            receive = _replay(body, receive)
+
+        coding = choose_coding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if coding is None:
+            return await self.app(scope, receive, send)
+        await self.app(scope, receive, self._compressing_send(send, coding))
+
+    async def _decompress(self, encoding: str, receive):
+        decoder = BodyDecoder(encoding, self.max_body_bytes)
+        wire = 0
+        busy = 0.0
+        try:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    raise ValueError("client disconnected")
+                chunk = message.get("body", b"")
+                more_body = message.get("more_body", False)
+                wire += len(chunk)
+                start = time.perf_counter()
+                decoder.feed(chunk)
+                busy += time.perf_counter() - start
+            start = time.perf_counter()
+            body = decoder.finish()
+            busy += time.perf_counter() - start
+        except BodyTooLarge:
+            HTTP_DECOMPRESS_REJECTED.inc(reason="too_large")
+            logger.warning(f"   🗜️ Refused {encoding} body: decompresses past {_kb(self.max_body_bytes)}")
+            return JSONResponse(status_code=413, content={"detail": "body_too_large", "max_bytes": self.max_body_bytes})
+        except ValueError as e:
+            HTTP_DECOMPRESS_REJECTED.inc(reason="invalid")
+            logger.warning(f"   🗜️ Refused {encoding} body: {e}")
+            return JSONResponse(status_code=400, content={"detail": f"invalid {encoding} body: {e}"})
+
+        HTTP_BODY_BYTES.inc(wire, direction="request", encoding=encoding, form="wire")
+        HTTP_BODY_BYTES.inc(len(body), direction="request", encoding=encoding, form="decoded")
+        HTTP_DECOMPRESS_SECONDS.observe(busy, encoding=encoding)
+        ratio = len(body) / wire if wire else 0.0
+        speed = len(body) / busy / 1e6 if busy > 0 else 0.0
+        logger.info(f"   🗜️ {encoding} body: {_kb(wire)} → {_kb(len(body))} ({ratio:.1f}×, "
+                    f"{busy * 1000:.1f}ms, {speed:.0f} MB/s)")
+        return body
+
+    def _compressing_send(self, send, coding: str):
+        start_message = None
+
+        async def compressing_send(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                return await send(message)
+            start, start_message = start_message, None
+            body = message.get("body", b"")
+            headers = start.get("headers") or []
+            encoded = any(k.lower() == b"content-encoding" for k, _ in headers)
+            if message.get("more_body") or encoded or len(body) < self.min_response_bytes:
+                # Streaming, already encoded or too small to be worth it
+                await send(start)
+                return await send(message)
+
+            compressed = compress(body, coding, self.level)
+            HTTP_BODY_BYTES.inc(len(body), direction="response", encoding=coding, form="decoded")
+            HTTP_BODY_BYTES.inc(len(compressed), direction="response", encoding=coding, form="wire")
+            headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+            headers += [(b"content-encoding", coding.encode()), (b"content-length", str(len(compressed)).encode()),
+                        (b"vary", b"Accept-Encoding")]
+            await send({**start, "headers": headers})
+            await send({**message, "body": compressed})
+
+        return compressing_send
+
+
+def _replay(body: bytes, receive):
+    """receive() that hands the app the decompressed body, then defers to
+    the real channel (so disconnects are still seen)."""
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return replay
@@ -0,0 +1,215 @@
+"""
+Indicator Engine
+================
+Turns each timeframe's candles into contiguous float64 arrays once and
+computes every indicator the prompt and the server-side checks need with
+NumPy: Wilder ATR, EMA/SMA, range position, swing highs/lows and trend
+slope.  Recursive averages (Wilder, EMA) are evaluated in closed form as
+weighted sums, so there are no per-candle Python loops.
+"""
+
+from dataclasses import dataclass, field
+from functools import lru_cache
+from operator import attrgetter
+from typing import Any, Optional, Sequence, Union
+
+import numpy as np
+
+ATR_PERIOD = 14
+EMA_FAST = 20
+EMA_SLOW = 50
+SMA_PERIOD = 20
+STRUCTURE_WINDOW = 60  # Candles used for the market structure summary
+SWING_STRENGTH = 2     # Bars on each side that must be lower/higher
+
+TIMEFRAME_SECONDS = {
+    "M1": 60, "M5": 300, "M15": 900, "M30": 1800,
+    "H1": 3600, "H4": 14400, "D1": 86400,
+}
+
+_OHLCV = ("open", "high", "low", "close", "volume")
+
+
+@dataclass
+class CandleSeries:
+    """One timeframe as columns.  ``time`` keeps the EA's labels as-is for
+    row uploads, or epoch seconds (int64 array) for columnar uploads."""
+    time: Union[list, np.ndarray]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @classmethod
+    def from_candles(cls, candles: Sequence[Any]) -> "CandleSeries":
+        """Build from row objects with open/high/low/close/volume/time attributes."""
+        n = len(candles)
+        cols = [np.fromiter(map(attrgetter(name), candles), dtype=np.float64, count=n) for name in _OHLCV]
+        return cls(list(map(attrgetter("time"), candles)), *cols)
+
+    @classmethod
+    def from_columns(cls, cols: dict[str, Sequence]) -> "CandleSeries":
+        """Build from columnar lists ``t`` (epoch seconds), ``o``, ``h``, ``l``,
+        ``c`` and optional ``v``.  Raises ValueError on missing or ragged columns."""
+        missing = [k for k in ("t", "o", "h", "l", "c") if k not in cols]
+        if missing:
+            raise ValueError(f"missing columns: {', '.join(missing)}")
+        n = len(cols["t"])
+        arrays = [np.asarray(cols[k], dtype=np.float64) for k in ("o", "h", "l", "c")]
+        volume = np.asarray(cols["v"], dtype=np.float64) if cols.get("v") is not None else np.zeros(n)
+        if any(len(a) != n for a in (*arrays, volume)):
+            raise ValueError("columns must all have the same length")
+        return cls(np.asarray(cols["t"], dtype=np.int64), *arrays, volume)
+
+    def time_labels(self, start: int = 0) -> list[str]:
+        """Candle times as strings (epoch times rendered as ISO-8601 UTC)."""
+        if isinstance(self.time, np.ndarray):
+            return np.datetime_as_string(self.time[start:].astype("datetime64[s]"), unit="s").tolist()
+        return self.time[start:]
+
+    def last_time(self):
+        """Time of the newest candle as a plain Python value (for cache keys)."""
+        last = self.time[-1]
+        return int(last) if isinstance(self.time, np.ndarray) else last
+
+
+@dataclass
+class TFIndicators:
+    atr: float
+    ema_fast: float
+    ema_slow: float
+    sma: float
+    recent_high: float
+    recent_low: float
+    range_position: float        # 0 = at recent low, 100 = at recent high
+    trend_change: float          # last close − first close over the window
+    trend_dir: str
+    slope: float                 # least-squares close slope per candle over the window
+    swing_highs: list[float] = field(default_factory=list)
+    swing_lows: list[float] = field(default_factory=list)
+    window: int = 0
+
+
+def build_series(candles: dict[str, Sequence[Any]]) -> dict[str, CandleSeries]:
+    return {tf: CandleSeries.from_candles(c) for tf, c in candles.items() if c}
+
+
+def preferred_timeframe(timeframes: Sequence[str]) -> Optional[str]:
+    """ATR timeframe used for the prompt: H1, else M15, else the first one."""
+    for tf in ("H1", "M15"):
+        if tf in timeframes:
+            return tf
+    return timeframes[0] if timeframes else None
+
+
+def true_range(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True range for bars 1..n-1 (bar 0 has no previous close)."""
+    prev_close = close[:-1]
+    h, l = high[1:], low[1:]
+    return np.maximum(h - l, np.maximum(np.abs(h - prev_close), np.abs(l - prev_close)))
+
+
+@lru_cache(maxsize=64)
+def _decay_weights(alpha: float, k: int) -> np.ndarray:
+    return alpha * (1.0 - alpha) ** np.arange(k - 1, -1, -1, dtype=np.float64)
+
+
+def _recursive_mean_last(values: np.ndarray, alpha: float, seed: float) -> float:
+    """Last value of ``m_t = m_{t-1} + alpha * (x_t - m_{t-1})`` seeded with
+    ``seed``, evaluated as a single weighted sum."""
+    k = len(values)
+    if k == 0:
+        return seed
+    return float((1.0 - alpha) ** k * seed + _decay_weights(alpha, k) @ values)
+
+
+def wilder_atr(high: np.ndarray, low: np.ndarray, close: np.ndarray, period: int = ATR_PERIOD) -> float:
+    """Wilder's ATR: SMA of the first ``period`` true ranges, then smoothed
+    with alpha = 1/period.  Falls back to a plain average on short series."""
+    tr = true_range(high, low, close)
+    if len(tr) == 0:
+        return 0.0
+    if len(tr) <= period:
+        return float(tr.mean())
+    return _recursive_mean_last(tr[period:], 1.0 / period, float(tr[:period].mean()))
+
+
+def ema(values: np.ndarray, period: int) -> float:
+    """Last EMA value, seeded with the SMA of the first ``period`` values."""
+    if len(values) == 0:
+        return 0.0
+    if len(values) <= period:
+        return float(values.mean())
+    return _recursive_mean_last(values[period:], 2.0 / (period + 1), float(values[:period].mean()))
+
+
+def sma(values: np.ndarray, period: int) -> float:
+    if len(values) == 0:
+        return 0.0
+    return float(values[-period:].mean())
+
+
+def swing_points(high: np.ndarray, low: np.ndarray, strength: int = SWING_STRENGTH) -> tuple[np.ndarray, np.ndarray]:
+    """Fractal swing highs/lows: bars whose high (low) is strictly above
+    (below) the ``strength`` bars on either side."""
+    n = len(high)
+    if n < 2 * strength + 1:
+        return np.empty(0), np.empty(0)
+    center_h = high[strength:n - strength]
+    center_l = low[strength:n - strength]
+    is_high = np.ones(len(center_h), dtype=bool)
+    is_low = np.ones(len(center_l), dtype=bool)
+    for offset in range(1, strength + 1):
+        for shift in (-offset, offset):
+            is_high &= center_h > high[strength + shift:n - strength + shift]
+            is_low &= center_l < low[strength + shift:n - strength + shift]
+    return center_h[is_high], center_l[is_low]
+
+
+def trend_slope(values: np.ndarray) -> float:
+    """Least-squares slope of ``values`` per candle."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    x = np.arange(n, dtype=np.float64)
+    x -= x.mean()
+    return float(x @ (values - values.mean()) / (x @ x))
+
+
+def compute_tf_indicators(series: CandleSeries, price: float, window: int = STRUCTURE_WINDOW) -> TFIndicators:
+    high, low, close = series.high, series.low, series.close
+    w_high, w_low, w_close = high[-window:], low[-window:], close[-window:]
+
+    recent_high = float(w_high.max())
+    recent_low = float(w_low.min())
+    price_range = recent_high - recent_low
+    position = (price - recent_low) / price_range * 100 if price_range > 0 else 50.0
+
+    trend_change = float(w_close[-1] - w_close[0])
+    trend_dir = "bullish" if trend_change > 0 else "bearish" if trend_change < 0 else "flat"
+    swing_h, swing_l = swing_points(w_high, w_low)
+
+    return TFIndicators(
+        atr=wilder_atr(high, low, close),
+        ema_fast=ema(close, EMA_FAST),
+        ema_slow=ema(close, EMA_SLOW),
+        sma=sma(close, SMA_PERIOD),
+        recent_high=recent_high,
+        recent_low=recent_low,
+        range_position=position,
+        trend_change=trend_change,
+        trend_dir=trend_dir,
+        slope=trend_slope(w_close),
+        swing_highs=swing_h[-3:].tolist(),
+        swing_lows=swing_l[-3:].tolist(),
+        window=len(w_close),
+    )
+
+
+def compute_indicators(series: dict[str, CandleSeries], price: float) -> dict[str, TFIndicators]:
+    """Indicators for every timeframe, keyed like the request's candles."""
+    return {tf: compute_tf_indicators(s, price) for tf, s in series.items() if len(s)}
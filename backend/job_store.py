@@ -0,0 +1,92 @@
+"""
+Job Store
+=========
+Bounded in-memory table of asynchronous signal jobs for the submit-then-poll
+mode (``POST /signal?async=1`` → ``GET /signal/{job_id}``).  The EA's
+WebRequest gives up after ~10s, but an OpenAI call can take longer; a job
+keeps running after the submit call returns and its result stays available
+until it expires.
+
+Finished jobs expire after their own TTL; when the table is full the oldest
+finished jobs are evicted first.  Running jobs are never evicted.
+"""
+
+import asyncio
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Optional
+
+
+class JobTableFull(Exception):
+    """Every slot holds a running job."""
+
+
+@dataclass
+class Job:
+    id: str
+    task: asyncio.Task
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    expires_at: float = float("inf")
+
+    @property
+    def done(self) -> bool:
+        return self.task.done()
+
+
+class JobStore:
+    def __init__(self, max_jobs: int = 1000):
+        self.max_jobs = max_jobs
+        self._jobs: OrderedDict[str, Job] = OrderedDict()
+        self.submitted = 0
+        self.evictions = 0
+
+    def submit(self, work: Callable[[], Awaitable[Any]], ttl_for: Callable[[Any], float]) -> Job:
+        """Start ``work`` as a background task and return its job.  The
+        result stays retrievable for ``ttl_for(result)`` seconds (or
+        ``ttl_for(None)`` if the work raised).  Raises JobTableFull."""
+        self._make_room()
+        job_id = secrets.token_urlsafe(12)
+        job = Job(job_id, asyncio.ensure_future(work()))
+        job.task.add_done_callback(lambda task: self._finish(job, task, ttl_for))
+        self._jobs[job_id] = job
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is not None and time.time() >= job.expires_at:
+            del self._jobs[job_id]
+            return None
+        return job
+
+    def _finish(self, job: Job, task: asyncio.Task, ttl_for):
+        job.finished_at = time.time()
+        result = None if task.cancelled() or task.exception() else task.result()
+        job.expires_at = job.finished_at + ttl_for(result)
+
+    def _make_room(self):
+        now = time.time()
+        for job_id in [k for k, j in self._jobs.items() if now >= j.expires_at]:
+            del self._jobs[job_id]
+        if len(self._jobs) < self.max_jobs:
+            return
+        for job_id, job in list(self._jobs.items()):
+            if job.done:
+                del self._jobs[job_id]
+                self.evictions += 1
+                if len(self._jobs) < self.max_jobs:
+                    return
+        raise JobTableFull()
+
+    def stats(self) -> dict:
+        running = sum(1 for j in self._jobs.values() if not j.done)
+        return {
+            "jobs": len(self._jobs),
+            "max_jobs": self.max_jobs,
+            "running": running,
+            "submitted": self.submitted,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,288 @@
+"""
+Logging Setup
+=============
+Console + rotating file logging for the backend.  In the default "queue"
+mode the request path only drops records onto an in-memory queue; a
+background listener thread does the formatting, console/file writes and
+rotation, so a burst of EA requests is never held up by log I/O.  Also
+provides an optional compact JSON-lines format and per-level sampling.
+
+In multi-worker mode only the parent process writes the log files: it runs
+a LogReceiver on a localhost socket, and each worker's listener thread
+forwards its records there (ForwardingHandler) instead of rotating the same
+file from several processes.
+"""
+
+import json
+import logging
+import queue
+import random
+import socket
+import socketserver
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+TEXT_FORMAT = logging.Formatter(
+    "%(asctime)s | %(levelname)-5s | %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per line: ts, level, logger, msg (+ exc)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage().strip(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LevelSampler(logging.Filter):
+    """Keep only a fraction of records per level, e.g. {"INFO": 0.1}.
+    Levels without a rate are always kept."""
+
+    def __init__(self, rates: dict[int, float]):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = self.rates.get(record.levelno)
+        return rate is None or random.random() < rate
+
+
+class DecorationFilter(logging.Filter):
+    """Drop blank and separator-only lines ("━━━━", "") — used in JSON mode
+    where they only add noise."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return any(ch.isalnum() for ch in record.getMessage())
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread and drops
+    records (counting them) instead of blocking when the queue is full."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated later) but do not format here.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    def enqueue_sentinel(self):
+        # Block until the listener has room, so stop() flushes a full queue.
+        self.queue.put(self._sentinel)
+
+
+class ForwardingHandler(logging.Handler):
+    """Send records as JSON lines to the parent's LogReceiver at
+    ``host:port``, tagged with ``channel`` ("log" or "capture")."""
+
+    def __init__(self, address: str, channel: str):
+        super().__init__()
+        host, _, port = address.rpartition(":")
+        self.address = (host, int(port))
+        self.channel = channel
+        self._sock: Optional[socket.socket] = None
+
+    def emit(self, record: logging.LogRecord):
+        entry = {
+            "channel": self.channel,
+            "created": record.created,
+            "name": record.name,
+            "levelno": record.levelno,
+            "levelname": record.levelname,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["msg"] += "\n" + logging.Formatter().formatException(record.exc_info)
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        for attempt in (1, 2):  # reconnect once if the socket went away
+            try:
+                if self._sock is None:
+                    self._sock = socket.create_connection(self.address, timeout=5)
+                self._sock.sendall(line)
+                return
+            except OSError:
+                self.close_socket()
+                if attempt == 2:
+                    self.handleError(record)
+
+    def close_socket(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def close(self):
+        self.close_socket()
+        super().close()
+
+
+class _ReceiverHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            target = _file_handler if entry.pop("channel", "log") == "log" else _capture_file_handler
+            if target is not None:
+                target.handle(logging.makeLogRecord(entry))
+
+
+class LogReceiver(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+def start_log_receiver() -> str:
+    """Start the parent-side receiver on a free localhost port and return
+    its ``host:port`` for the workers (GOLDMIND_LOG_SOCKET)."""
+    global _receiver
+    _receiver = LogReceiver(("127.0.0.1", 0), _ReceiverHandler)
+    threading.Thread(target=_receiver.serve_forever, name="log-receiver", daemon=True).start()
+    host, port = _receiver.server_address
+    return f"{host}:{port}"
+
+
+def parse_sampling(spec: str) -> dict[int, float]:
+    """Parse ``"DEBUG=0,INFO=0.25"`` into {levelno: rate}."""
+    rates = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, rate = part.partition("=")
+        level = logging.getLevelName(name.strip().upper())
+        if isinstance(level, int) and rate:
+            rates[level] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+
+_listener: Optional[DrainingQueueListener] = None
+_queue_handler: Optional[DeferredQueueHandler] = None
+_capture_listener: Optional[DrainingQueueListener] = None
+_file_handler: Optional[logging.Handler] = None
+_capture_file_handler: Optional[logging.Handler] = None
+_receiver: Optional[LogReceiver] = None
+_stop_lock = threading.Lock()
+
+
+def configure_logging(
+    log_file: str,
+    mode: str = "queue",
+    fmt: str = "text",
+    sampling: str = "",
+    queue_size: int = 10000,
+    forward_to: Optional[str] = None,
+) -> logging.Logger:
+    """Install console + rotating file handlers on the root logger, either
+    directly ("sync") or behind a queue and listener thread ("queue").
+    With ``forward_to`` (a worker process) file records go to the parent's
+    LogReceiver instead of the file."""
+    global _listener, _queue_handler, _file_handler
+    formatter = JsonLinesFormatter() if fmt == "json" else TEXT_FORMAT
+
+    # Console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+
+    # File handler
+    if forward_to:
+        file_handler = ForwardingHandler(forward_to, "log")
+    else:
+        file_handler = RotatingFileHandler(
+            log_file, maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8",
+            delay=True,  # Don't open file until first write (avoids lock conflict on reload)
+        )
+        file_handler.setFormatter(formatter)
+        _file_handler = file_handler
+
+    stop_logging()
+    if mode == "queue":
+        _queue_handler = DeferredQueueHandler(queue.Queue(maxsize=queue_size))
+        handlers = [_queue_handler]
+        _listener = DrainingQueueListener(_queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handlers = [console_handler, file_handler]
+
+    rates = parse_sampling(sampling)
+    for handler in handlers:
+        if fmt == "json":
+            handler.addFilter(DecorationFilter())
+        if rates:
+            handler.addFilter(LevelSampler(rates))
+
+    # Set up root logger with force=True (works reliably under uvicorn reload)
+    logging.basicConfig(level=logging.INFO, handlers=handlers, force=True)
+    # Use the root logger directly — avoids all named-logger propagation issues
+    return logging.getLogger()
+
+
+def configure_capture(
+    path: str,
+    max_bytes: int = 50 * 1024 * 1024,
+    queue_size: int = 1000,
+    forward_to: Optional[str] = None,
+) -> logging.Logger:
+    """Logger that appends one raw line per record to ``path`` (request
+    capture for offline replay), written by its own background thread
+    (or forwarded to the parent's LogReceiver, see configure_logging)."""
+    global _capture_listener, _capture_file_handler
+    if forward_to:
+        handler = ForwardingHandler(forward_to, "capture")
+    else:
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=3, encoding="utf-8", delay=True)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        _capture_file_handler = handler
+    queue_handler = DeferredQueueHandler(queue.Queue(maxsize=queue_size))
+    if _capture_listener is not None:
+        _capture_listener.stop()
+    _capture_listener = DrainingQueueListener(queue_handler.queue, handler)
+    _capture_listener.start()
+
+    capture = logging.getLogger("goldmind.capture")
+    capture.handlers = [queue_handler]
+    capture.setLevel(logging.INFO)
+    capture.propagate = False
+    return capture
+
+
+def stop_logging():
+    """Flush and stop the listener threads (no-op in sync mode)."""
+    global _listener, _capture_listener
+    with _stop_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        if _capture_listener is not None:
+            _capture_listener.stop()
+            _capture_listener = None
+
+
+def logging_stats() -> dict:
+    if _queue_handler is None or _listener is None:
+        return {"mode": "sync"}
+    return {
+        "mode": "queue",
+        "queued": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+    }
@@ -8,21 +8,63 @@ Supports any symbol: XAUUSD, EURUSD, US30, BTCUSD, etc.
 """
 
 import asyncio
+import atexit
+import json
 import os
+import random
+import secrets
 import sys
 import time
 import logging
-import traceback
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
 from enum import Enum
-from typing import Optional
+from typing import Any, Awaitable, Callable, Optional
 
+import httpx
 from dotenv import load_dotenv
-from fastapi import FastAPI, Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import FastAPI, Query, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.exceptions import RequestValidationError
+from fastapi.openapi.utils import get_openapi
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 import openai
 from openai import AsyncOpenAI
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr, ValidationError, field_validator
+from pydantic.json_schema import models_json_schema
+
+try:
+    from orjson import loads as json_loads
+except ImportError:  # orjson is optional; the stdlib parser is just slower
+    from json import loads as json_loads
+
+from admission import AccountRateLimiter, AdmissionController, Overloaded, RateLimited
+from candle_encoding import ENCODINGS, encode_candles, parse_limits
+from candle_store import CandleStore
+from circuit_breaker import STATE_CODES as BREAKER_STATE_CODES, BreakerBoard
+from diagnostics import LoopMonitor, SamplingProfiler
+from gates import GateConfig, GateContext, GatePipeline, parse_session_block
+from history_store import HistoryStore
+from http_compression import CompressionMiddleware
+from indicators import (
+    STRUCTURE_WINDOW, TIMEFRAME_SECONDS, CandleSeries, TFIndicators, build_series, compute_indicators,
+    preferred_timeframe,
+)
+from job_store import JobStore, JobTableFull
+from logging_setup import configure_capture, configure_logging, logging_stats, start_log_receiver, stop_logging
+from metrics import (
+    BREAKER_STATE, CLIENT_DISCONNECTS, EARLY_EXITS, FALLBACKS, HTTP_REQUEST_SECONDS, LLM_INFLIGHT, LLM_QUEUE_DEPTH, LOAD_SHED,
+    OPENAI_SECONDS, OPENAI_TOKENS, PREFILTER_VETOES, SIGNALS, STAGE_SECONDS, VETOES, WS_CONNECTIONS, render_metrics, stage,
+    veto_reason_class,
+)
+from resample import resample, resample_error
+from scheduler import PrecomputeScheduler
+from shared_state import SharedDB, SharedJobTable, SharedRateLimiter, SharedSignalCache, reset_shared_state
+from signal_cache import SignalCache
+from signal_stream import SignalStreamParser, early_exit
+from ws_sessions import ConnectionLimit, SessionRegistry, WSSession
 
 # ---------------------------------------------------------------------------
 # Force unbuffered stdout so prints appear immediately in PowerShell
@@ -33,95 +75,377 @@ else:
     sys.stdout = os.fdopen(sys.stdout.fileno(), 'w', buffering=1)
 
 # ---------------------------------------------------------------------------
-# Configure logging (console + file)
+# Load environment
 # ---------------------------------------------------------------------------
-from logging.handlers import RotatingFileHandler
+load_dotenv()
 
+# ---------------------------------------------------------------------------
+# Configure logging (console + file, written by a background thread)
+# ---------------------------------------------------------------------------
 LOG_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 LOG_FILE = os.path.join(LOG_DIR, "goldmind.log")
 
-log_format = logging.Formatter(
-    "%(asctime)s | %(levelname)-5s | %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+LOG_MODE = os.getenv("LOG_MODE", "queue").lower()        # queue | sync
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()     # text | json
+LOG_SAMPLING = os.getenv("LOG_SAMPLING", "")             # e.g. "INFO=0.2"
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
 
-# Console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(log_format)
+# Multi-worker mode (python main.py --workers N): the parent process owns the
+# log files and its workers forward their records to it over a local socket
+WORKERS = int(os.getenv("WORKERS", "1"))
+WORKER_COUNT = int(os.getenv("GOLDMIND_WORKERS", "1"))    # set by the parent for its workers
+LOG_FORWARD = os.getenv("GOLDMIND_LOG_SOCKET", "")        # parent's log receiver (host:port)
 
-# File handler with auto-flush
-file_handler = RotatingFileHandler(
-    LOG_FILE, maxBytes=5 * 1024 * 1024, backupCount=5, encoding="utf-8",
-    delay=True,  # Don't open file until first write (avoids lock conflict on reload)
-)
-file_handler.setFormatter(log_format)
-# Set up root logger with force=True (works reliably under uvicorn reload)
-logging.basicConfig(
-    level=logging.INFO,
-    handlers=[console_handler, file_handler],
-    force=True,
-)
-# Use the root logger directly — avoids all named-logger propagation issues
-logger = logging.getLogger()
+logger = configure_logging(LOG_FILE, LOG_MODE, LOG_FORMAT, LOG_SAMPLING, LOG_QUEUE_SIZE, forward_to=LOG_FORWARD)
+atexit.register(stop_logging)
 
 # Startup test — verify file logging works
 logger.info("=" * 60)
 logger.info("GoldMind AI logger initialized — file logging active")
-logger.info(f"Log file: {LOG_FILE}")
+logger.info(f"Log file: {LOG_FILE} (mode: {LOG_MODE}, format: {LOG_FORMAT})")
 logger.info("=" * 60)
 
-# ---------------------------------------------------------------------------
-# Load environment
-# ---------------------------------------------------------------------------
-load_dotenv()
-
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-5.2")
 FALLBACK_MODEL = os.getenv("FALLBACK_MODEL", "gpt-5")
 
-app = FastAPI(title="GoldMind AI Signal Backend", version="1.0.0")
+# Connection pool settings for the shared OpenAI clients
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "") or None
+FALLBACK_BASE_URL = os.getenv("FALLBACK_BASE_URL", "") or OPENAI_BASE_URL
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+OPENAI_KEEPALIVE_SECONDS = float(os.getenv("OPENAI_KEEPALIVE_SECONDS", "120"))
+OPENAI_PREWARM_CONNECTIONS = int(os.getenv("OPENAI_PREWARM_CONNECTIONS", "2"))
+
+# Streamed completions: parse the answer as it arrives and stop the generation
+# once it is a no-trade or an invalid order (LLM_EARLY_EXIT)
+LLM_STREAMING = os.getenv("LLM_STREAMING", "false").lower() in ("1", "true", "yes")
+LLM_EARLY_EXIT = os.getenv("LLM_EARLY_EXIT", "true").lower() in ("1", "true", "yes")
+
+# Compressed HTTP bodies (Content-Encoding on requests, Accept-Encoding on responses)
+HTTP_COMPRESSION_ENABLED = os.getenv("HTTP_COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+REQUEST_MAX_DECOMPRESSED_BYTES = int(os.getenv("REQUEST_MAX_DECOMPRESSED_BYTES", str(32 * 1024 * 1024)))
+RESPONSE_COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "1024"))
+RESPONSE_COMPRESS_LEVEL = int(os.getenv("RESPONSE_COMPRESS_LEVEL", "5"))
+
+# Diagnostics: admin-only profiler endpoints and the event-loop monitor
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")   # empty = /admin endpoints disabled
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "300"))
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+LOOP_MONITOR_INTERVAL_MS = float(os.getenv("LOOP_MONITOR_INTERVAL_MS", "100"))
+LOOP_BLOCKED_THRESHOLD_MS = float(os.getenv("LOOP_BLOCKED_THRESHOLD_MS", "200"))
+
+# WebSocket channel (/ws): heartbeats, resume window and per-account connection cap
+WS_MAX_CONNECTIONS_PER_ACCOUNT = int(os.getenv("WS_MAX_CONNECTIONS_PER_ACCOUNT", "2"))
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", "20"))
+WS_IDLE_TIMEOUT_SECONDS = float(os.getenv("WS_IDLE_TIMEOUT_SECONDS", "60"))
+WS_RESUME_SECONDS = float(os.getenv("WS_RESUME_SECONDS", "300"))
+WS_MAX_OUTBOX = int(os.getenv("WS_MAX_OUTBOX", "100"))
+
+# Hedged requests: fire FALLBACK_MODEL in parallel once the primary is slow
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.9"))
+HEDGE_DELAY_SECONDS = float(os.getenv("HEDGE_DELAY_SECONDS", "8.0"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "1.0"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "10"))
+
+# Signal cache / single-flight coalescing of identical market-state requests
+SIGNAL_CACHE_ENABLED = os.getenv("SIGNAL_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+SIGNAL_CACHE_SIZE = int(os.getenv("SIGNAL_CACHE_SIZE", "512"))
+SIGNAL_CACHE_SPREAD_BUCKET = max(1, int(os.getenv("SIGNAL_CACHE_SPREAD_BUCKET", "10")))
+SIGNAL_CACHE_MAX_TTL_SECONDS = float(os.getenv("SIGNAL_CACHE_MAX_TTL_SECONDS", "14400"))
+SIGNAL_CACHE_VETO_TTL_SECONDS = float(os.getenv("SIGNAL_CACHE_VETO_TTL_SECONDS", "900"))
+
+# Incremental candle ingest: per-(account, symbol, TF) ring buffers
+CANDLE_STORE_ENABLED = os.getenv("CANDLE_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+CANDLE_STORE_MAX_CANDLES = int(os.getenv("CANDLE_STORE_MAX_CANDLES", "1000"))
+CANDLE_STORE_MAX_SERIES = int(os.getenv("CANDLE_STORE_MAX_SERIES", "500"))
+
+# /signals batch endpoint
+SIGNAL_BATCH_MAX_ITEMS = int(os.getenv("SIGNAL_BATCH_MAX_ITEMS", "20"))
+SIGNAL_BATCH_CONCURRENCY = max(1, int(os.getenv("SIGNAL_BATCH_CONCURRENCY", "4")))
+
+# Async job mode (POST /signal?async=1, GET /signal/{job_id})
+SIGNAL_JOBS_MAX = int(os.getenv("SIGNAL_JOBS_MAX", "1000"))
+SIGNAL_JOB_MIN_TTL_SECONDS = float(os.getenv("SIGNAL_JOB_MIN_TTL_SECONDS", "300"))
+SIGNAL_JOB_MAX_WAIT_SECONDS = float(os.getenv("SIGNAL_JOB_MAX_WAIT_SECONDS", "8"))
+
+# Candle-close scheduler: pre-compute signals before the EAs ask
+PRECOMPUTE_ENABLED = os.getenv("PRECOMPUTE_ENABLED", "false").lower() in ("1", "true", "yes")
+PRECOMPUTE_CONCURRENCY = int(os.getenv("PRECOMPUTE_CONCURRENCY", "2"))
+PRECOMPUTE_STAGGER_SECONDS = float(os.getenv("PRECOMPUTE_STAGGER_SECONDS", "1.5"))
+PRECOMPUTE_DELAY_SECONDS = float(os.getenv("PRECOMPUTE_DELAY_SECONDS", "2"))
+if PRECOMPUTE_ENABLED and WORKER_COUNT > 1:
+    # Every worker would pre-compute the same snapshots (and keep them to itself)
+    logger.warning("⚠️  PRECOMPUTE_ENABLED is not supported with several workers — turned off")
+    PRECOMPUTE_ENABLED = False
+
+# Per-model circuit breakers: stop sending traffic to a failing model
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "3"))
+BREAKER_ERROR_RATE = float(os.getenv("BREAKER_ERROR_RATE", "0.5"))
+BREAKER_MIN_SAMPLES = int(os.getenv("BREAKER_MIN_SAMPLES", "10"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "60"))
+BREAKER_PROBE_TIMEOUT_SECONDS = float(os.getenv("BREAKER_PROBE_TIMEOUT_SECONDS", "20"))
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", "60"))
+
+# Admission control: cap concurrent OpenAI calls, shed instead of queueing forever
+LLM_MAX_INFLIGHT = int(os.getenv("LLM_MAX_INFLIGHT", "8"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "50"))
+LLM_INITIAL_SERVICE_SECONDS = float(os.getenv("LLM_INITIAL_SERVICE_SECONDS", "4"))
+CLIENT_BUDGET_SECONDS = float(os.getenv("CLIENT_BUDGET_SECONDS", "10"))
+
+# Deadlines: the client's budget (X-Timeout-Ms) bounds model choice, fallbacks and OpenAI timeouts
+DEADLINE_SAFETY_MS = float(os.getenv("DEADLINE_SAFETY_MS", "250"))        # kept back to send the reply
+DEADLINE_LATENCY_PERCENTILE = float(os.getenv("DEADLINE_LATENCY_PERCENTILE", "0.75"))
+DEADLINE_MIN_CALL_SECONDS = float(os.getenv("DEADLINE_MIN_CALL_SECONDS", "1.0"))  # for models without history
+ACCOUNT_RATE_PER_MINUTE = float(os.getenv("ACCOUNT_RATE_PER_MINUTE", "6"))
+ACCOUNT_BURST = int(os.getenv("ACCOUNT_BURST", "3"))
+
+# Pre-filter gates run before any OpenAI call (comma list, in order; empty = off, the default)
+PREFILTER_GATES = [g.strip() for g in os.getenv("PREFILTER_GATES", "").split(",") if g.strip()]
+GATE_ATR_MIN_RATIO = float(os.getenv("GATE_ATR_MIN_RATIO", "0.3"))
+GATE_CHOP_MAX = float(os.getenv("GATE_CHOP_MAX", "80"))
+GATE_MIN_RANGE_ATR = float(os.getenv("GATE_MIN_RANGE_ATR", "2.0"))
+GATE_STALE_PERIODS = float(os.getenv("GATE_STALE_PERIODS", "4"))
+# Broker server time minus UTC, for stale_candles (blank = derive from each request's server_time_utc)
+GATE_BROKER_UTC_OFFSET_HOURS = os.getenv("GATE_BROKER_UTC_OFFSET_HOURS", "").strip()
+GATE_SESSION_BLOCK = os.getenv("GATE_SESSION_BLOCK", "")   # e.g. "index=asian"
+
+# Request capture for offline replay (tools/load_test.py)
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "false").lower() in ("1", "true", "yes")
+CAPTURE_FILE = os.getenv("CAPTURE_FILE", "") or os.path.join(LOG_DIR, "captures.jsonl")
+CAPTURE_SAMPLE_RATE = float(os.getenv("CAPTURE_SAMPLE_RATE", "1.0"))
+capture_logger = configure_capture(CAPTURE_FILE, forward_to=LOG_FORWARD) if CAPTURE_ENABLED else None
+
+# Cross-process state for multi-worker mode: signal cache, rate limits, async jobs
+SHARED_STATE_FILE = os.getenv("SHARED_STATE_FILE", "") or os.path.join(LOG_DIR, "shared_state.db")
+shared_db = SharedDB(SHARED_STATE_FILE) if WORKER_COUNT > 1 else None
+
+# Signal history: SQLite (WAL) database written in batches by a background task
+HISTORY_ENABLED = os.getenv("HISTORY_ENABLED", "true").lower() in ("1", "true", "yes")
+HISTORY_FILE = os.getenv("HISTORY_FILE", "") or os.path.join(LOG_DIR, "history.db")
+HISTORY_BATCH_SIZE = int(os.getenv("HISTORY_BATCH_SIZE", "200"))
+HISTORY_FLUSH_SECONDS = float(os.getenv("HISTORY_FLUSH_SECONDS", "1.0"))
+HISTORY_MAX_PENDING = int(os.getenv("HISTORY_MAX_PENDING", "10000"))
+HISTORY_QUERY_MAX_ROWS = int(os.getenv("HISTORY_QUERY_MAX_ROWS", "100000"))
+
+# Candle tables in the prompt: encoding and how many candles per timeframe
+CANDLE_ENCODING = os.getenv("CANDLE_ENCODING", "verbose").lower()   # verbose | csv | delta
+CANDLE_PROMPT_LIMIT = int(os.getenv("CANDLE_PROMPT_LIMIT", str(STRUCTURE_WINDOW)))
+CANDLE_PROMPT_LIMITS = parse_limits(os.getenv("CANDLE_PROMPT_LIMITS", ""))  # e.g. "M5=30,H4=40"
+if CANDLE_ENCODING not in ENCODINGS:
+    logger.warning(f"⚠️  Unknown CANDLE_ENCODING '{CANDLE_ENCODING}' — using verbose")
+    CANDLE_ENCODING = "verbose"
 
 
 # ---------------------------------------------------------------------------
-# Middleware — log every incoming request and outgoing response
+# OpenAI client pool — one shared AsyncOpenAI per model endpoint
 # ---------------------------------------------------------------------------
-class RequestResponseLogger(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        # --- Incoming request ---
-        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-        body_size = request.headers.get("content-length", "?")
-        logger.info("")
-        logger.info("━" * 60)
-        logger.info(f"📨 [{now}] INCOMING REQUEST")
-        logger.info(f"   {request.method} {request.url.path}")
-        logger.info(f"   From: {request.client.host}:{request.client.port}" if request.client else "   From: unknown")
-        logger.info(f"   Content-Length: {body_size} bytes")
-        sys.stdout.flush()
+class OpenAIClientPool:
+    """Holds one long-lived AsyncOpenAI client (and its httpx connection pool)
+    per API endpoint.  Created once in the app lifespan so every /signal call
+    reuses warm keep-alive connections instead of paying for DNS + TLS again."""
+
+    def __init__(self):
+        self._clients: dict[str, AsyncOpenAI] = {}
+        self.ready = False
+        self.warm_connections = 0
+        self.error: Optional[str] = None
+
+    @staticmethod
+    def endpoint_for(model: str) -> str:
+        base_url = FALLBACK_BASE_URL if model == FALLBACK_MODEL and model != OPENAI_MODEL else OPENAI_BASE_URL
+        return base_url or "https://api.openai.com/v1"
+
+    async def start(self, models: list[str]):
+        for model in models:
+            endpoint = self.endpoint_for(model)
+            if endpoint in self._clients:
+                continue
+            http_client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=OPENAI_POOL_SIZE,
+                    max_keepalive_connections=OPENAI_POOL_SIZE,
+                    keepalive_expiry=OPENAI_KEEPALIVE_SECONDS,
+                ),
+                timeout=60.0,
+            )
+            try:
+                self._clients[endpoint] = AsyncOpenAI(
+                    api_key=OPENAI_API_KEY, base_url=endpoint,
+                    timeout=60.0, http_client=http_client,
+                )
+            except openai.OpenAIError as e:
+                await http_client.aclose()
+                self.error = str(e)
+                logger.error(f"   ❌ OpenAI client init failed: {e}")
+                return
+        await self.prewarm(models)
+        self.ready = True
+
+    async def prewarm(self, models: list[str]):
+        """Open a few connections per endpoint ahead of the first signal.
+        Any HTTP answer (even 401/404) means DNS + TLS are done and the
+        connection is parked in the keep-alive pool."""
+        if OPENAI_PREWARM_CONNECTIONS <= 0:
+            return
+
+        async def _touch(model: str) -> bool:
+            try:
+                await self.get(model).models.retrieve(model, timeout=10.0)
+                return True
+            except openai.APIStatusError:
+                return True
+            except Exception as e:
+                logger.warning(f"   ⚠️  Pre-warm to {self.endpoint_for(model)} failed: {e}")
+                return False
 
-        # --- Process request ---
         start = time.time()
-        response = await call_next(request)
-        elapsed = time.time() - start
+        results = await asyncio.gather(*(
+            _touch(model) for model in models for _ in range(OPENAI_PREWARM_CONNECTIONS)
+        ))
+        self.warm_connections = sum(results)
+        logger.info(f"   🔥 Pre-warmed {self.warm_connections}/{len(results)} OpenAI connections in {time.time() - start:.2f}s")
+
+    def get(self, model: str) -> AsyncOpenAI:
+        client = self._clients.get(self.endpoint_for(model))
+        if client is None:
+            raise RuntimeError(f"OpenAI client pool not ready ({self.error or 'not started'})")
+        return client
+
+    async def close(self):
+        self.ready = False
+        for client in self._clients.values():
+            await client.close()
+        self._clients.clear()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "endpoints": list(self._clients.keys()),
+            "pool_size": OPENAI_POOL_SIZE,
+            "warm_connections": self.warm_connections,
+            "error": self.error,
+        }
+
+
+openai_pool = OpenAIClientPool()
+
+
+def configured_models() -> list[str]:
+    models = [OPENAI_MODEL]
+    if FALLBACK_MODEL and FALLBACK_MODEL != OPENAI_MODEL:
+        models.append(FALLBACK_MODEL)
+    return models
+
+
+profiler = SamplingProfiler()
+loop_monitor = LoopMonitor(LOOP_MONITOR_INTERVAL_MS / 1000, LOOP_BLOCKED_THRESHOLD_MS / 1000) if LOOP_MONITOR_ENABLED else None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup_banner()
+    await openai_pool.start(configured_models())
+    if history_store is not None:
+        await history_store.start()
+    if precompute_scheduler is not None:
+        precompute_scheduler.start()
+    if loop_monitor is not None:
+        loop_monitor.start()
+    ws_sessions.start()
+    yield
+    if loop_monitor is not None:
+        await loop_monitor.stop()
+    profiler.stop()
+    if precompute_scheduler is not None:
+        await precompute_scheduler.stop()
+    if history_store is not None:
+        await history_store.stop()
+    await ws_sessions.close()
+    if shared_db is not None:
+        await shared_db.close()
+    await model_breakers.stop()
+    await openai_pool.close()
+
+
+app = FastAPI(title="GoldMind AI Signal Backend", version="1.0.0", lifespan=lifespan)
 
-        # --- Outgoing response ---
-        status_emoji = "✅" if response.status_code < 400 else "⚠️" if response.status_code < 500 else "❌"
-        logger.info(f"📤 [{now}] OUTGOING RESPONSE")
-        logger.info(f"   {status_emoji} Status: {response.status_code}")
-        logger.info(f"   ⏱️  Processed in: {elapsed:.2f}s")
-        logger.info("━" * 60)
-        sys.stdout.flush()
 
-        return response
+# ---------------------------------------------------------------------------
+# Middleware — log every incoming request and outgoing response
+# ---------------------------------------------------------------------------
+class RequestResponseLogger:
+    """Pure ASGI middleware: logs each request/response and records its
+    latency in goldmind_http_request_duration_seconds.  Avoids the extra task
+    and body streaming that BaseHTTPMiddleware adds to every request."""
+
+    QUIET_PATHS = ("/metrics",)  # Scraped every few seconds — not worth a log block
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        # Client deadlines count from arrival, before the body is read (client_budget)
+        scope.setdefault("state", {})["received_at"] = time.monotonic()
+        path = scope["path"]
+        quiet = path in self.QUIET_PATHS
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+        if not quiet:
+            # --- Incoming request ---
+            headers = dict(scope.get("headers") or [])
+            body_size = headers.get(b"content-length", b"?").decode("latin-1")
+            client = scope.get("client")
+            logger.info("")
+            logger.info("━" * 60)
+            logger.info(f"📨 [{now}] INCOMING REQUEST")
+            logger.info(f"   {scope['method']} {path}")
+            logger.info(f"   From: {client[0]}:{client[1]}" if client else "   From: unknown")
+            logger.info(f"   Content-Length: {body_size} bytes")
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
 
+        # --- Process request ---
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            handler = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            HTTP_REQUEST_SECONDS.observe(elapsed, method=scope["method"], handler=handler, status=status_code)
+
+            if not quiet:
+                # --- Outgoing response ---
+                status_emoji = "✅" if status_code < 400 else "⚠️" if status_code < 500 else "❌"
+                logger.info(f"📤 [{now}] OUTGOING RESPONSE")
+                logger.info(f"   {status_emoji} Status: {status_code}")
+                logger.info(f"   ⏱️  Processed in: {elapsed:.2f}s")
+                logger.info("━" * 60)
+
+if HTTP_COMPRESSION_ENABLED:
+    # Inside the logger, so request latency includes decompression
+    app.add_middleware(
+        CompressionMiddleware,
+        max_body_bytes=REQUEST_MAX_DECOMPRESSED_BYTES,
+        min_response_bytes=RESPONSE_COMPRESS_MIN_BYTES,
+        level=RESPONSE_COMPRESS_LEVEL,
+    )
 app.add_middleware(RequestResponseLogger)
 
 
 # ---------------------------------------------------------------------------
-# Startup event — show config banner
+# Startup banner — called from the lifespan hook
 # ---------------------------------------------------------------------------
-@app.on_event("startup")
-async def startup_banner():
+def startup_banner():
     key_preview = OPENAI_API_KEY[:8] + "..." + OPENAI_API_KEY[-4:] if len(OPENAI_API_KEY) > 12 else "NOT SET"
     logger.info("")
     logger.info("=" * 60)
@@ -129,9 +453,22 @@ async def startup_banner():
     logger.info("=" * 60)
     logger.info(f"  Model:    {OPENAI_MODEL} (fallback: {FALLBACK_MODEL})")
     logger.info(f"  API Key:  {key_preview}")
+    logger.info(f"  Pool:     {OPENAI_POOL_SIZE} connections/endpoint (pre-warm: {OPENAI_PREWARM_CONNECTIONS})")
+    logger.info(f"  Admission: {LLM_MAX_INFLIGHT} concurrent AI calls, queue {LLM_MAX_QUEUE}, client budget {CLIENT_BUDGET_SECONDS:g}s")
+    logger.info(f"  Candles:  {CANDLE_ENCODING} encoding, {CANDLE_PROMPT_LIMIT}/TF in prompt")
+    if CAPTURE_ENABLED:
+        logger.info(f"  Capture:  {CAPTURE_FILE} ({CAPTURE_SAMPLE_RATE:.0%} of requests)")
+    if HISTORY_ENABLED:
+        logger.info(f"  History:  {HISTORY_FILE}")
+    if shared_db is not None:
+        logger.info(f"  Worker:   pid {os.getpid()}, one of {WORKER_COUNT} (shared state: {SHARED_STATE_FILE})")
+    if PRECOMPUTE_ENABLED:
+        logger.info(f"  Precompute: on at candle close (max {PRECOMPUTE_CONCURRENCY} concurrent, {PRECOMPUTE_STAGGER_SECONDS}s stagger)")
     logger.info(f"  Server:   http://127.0.0.1:8000")
     logger.info(f"  Health:   http://127.0.0.1:8000/health")
     logger.info(f"  Signal:   http://127.0.0.1:8000/signal  (POST)")
+    logger.info(f"  Batch:    http://127.0.0.1:8000/signals (POST, up to {SIGNAL_BATCH_MAX_ITEMS} symbols)")
+    logger.info(f"  Metrics:  http://127.0.0.1:8000/metrics")
     logger.info("=" * 60)
     logger.info("  Waiting for signal requests from MT5 EA...")
     logger.info("=" * 60)
@@ -157,6 +494,12 @@ class Constraints(BaseModel):
     expiry_minutes: int = 240
 
 
+class CandleDelta(BaseModel):
+    since: Optional[str] = Field(None, description="Last candle time acknowledged by the server (None = full series)")
+    candles: list[CandleData] = []
+    checksum: Optional[str] = Field(None, description="CRC32 of the full series the EA expects (see candle_store)")
+
+
 class SignalRequest(BaseModel):
     account_id: Optional[str] = None
     symbol: str = "XAUUSD"  # Default fallback; EA always sends _Symbol explicitly
@@ -167,9 +510,40 @@ class SignalRequest(BaseModel):
     spread_points: int
     digits: int = 2
     point: float = 0.01
-    candles: dict[str, list[CandleData]]
+    candles: dict[str, list[CandleData]] = {}
+    candle_delta: Optional[dict[str, CandleDelta]] = None  # Incremental mode, needs account_id
     atr: Optional[float] = None
     constraints: Constraints = Constraints()
+    # Server-side resampling: upload one base timeframe, get these derived from it
+    resample: list[str] = Field([], description="Timeframes to build from the single base series, e.g. [\"M15\", \"H1\", \"H4\"]")
+    resample_offset_minutes: int = Field(0, description="Broker UTC offset when candle times are true UTC (MT5 times need 0)")
+
+    @field_validator("resample")
+    @classmethod
+    def _known_timeframes(cls, value: list[str]) -> list[str]:
+        value = [tf.upper() for tf in value]
+        unknown = [tf for tf in value if tf not in TIMEFRAME_SECONDS]
+        if unknown:
+            raise ValueError(f"unknown timeframe(s) {', '.join(unknown)}; use {', '.join(TIMEFRAME_SECONDS)}")
+        return value
+
+    # Set by parse_signal_body for columnar uploads (never part of the JSON)
+    _columnar: Optional[dict[str, CandleSeries]] = PrivateAttr(default=None)
+
+
+class ColumnarCandles(BaseModel):
+    """Columnar alternative to list[CandleData] — documented for the OpenAPI
+    schema only; the fast path parses these straight into NumPy arrays."""
+    t: list[int] = Field(..., description="Candle open times, epoch seconds")
+    o: list[float]
+    h: list[float]
+    l: list[float]
+    c: list[float]
+    v: Optional[list[float]] = None
+
+
+class ColumnarSignalRequest(SignalRequest):
+    candles_columnar: dict[str, ColumnarCandles]
 
 
 # ---------------------------------------------------------------------------
@@ -206,38 +580,156 @@ class SignalResponse(BaseModel):
     veto: bool
     veto_reason: str
 
+    # Set by call_model: the model that answered and its (prompt, completion,
+    # cached) token counts (never part of the JSON)
+    _model: Optional[str] = PrivateAttr(default=None)
+    _usage: Optional[tuple[int, int, int]] = PrivateAttr(default=None)
+
 
 # ---------------------------------------------------------------------------
-# Helper: compute ATR from candles
+# Helper: parse /signal bodies (row or columnar candles)
 # ---------------------------------------------------------------------------
 
-def compute_atr(candles: dict[str, list[CandleData]], period: int = 14) -> float:
-    """Compute Average True Range from candle list (defaults to H1 or M15)."""
-    # Pick a timeframe to calculate ATR, prefer H1, else M15, else the first available
-    tf_to_use = None
-    if "H1" in candles and candles["H1"]:
-        tf_to_use = "H1"
-    elif "M15" in candles and candles["M15"]:
-        tf_to_use = "M15"
-    elif candles:
-        tf_to_use = list(candles.keys())[0]
-        
-    if not tf_to_use or len(candles[tf_to_use]) < 2:
-        return 0.0
-        
-    c_list = candles[tf_to_use]
-    trs: list[float] = []
-    for i in range(1, len(c_list)):
-        high = c_list[i].high
-        low = c_list[i].low
-        prev_close = c_list[i - 1].close
-        tr = max(high - low, abs(high - prev_close), abs(low - prev_close))
-        trs.append(tr)
-    if not trs:
-        return 0.0
-    # Simple moving average of the last `period` true ranges
-    p = min(period, len(trs))
-    return sum(trs[-p:]) / p
+def parse_signal_body(body: bytes) -> SignalRequest:
+    """Validate a /signal body.  Row uploads go straight through Pydantic's
+    JSON parser; columnar uploads (``candles_columnar``) are decoded with
+    orjson and turned into arrays without creating one model per candle.
+    Raises RequestValidationError so clients still get FastAPI's 422."""
+    if b'"candles_columnar"' not in body:
+        try:
+            return SignalRequest.model_validate_json(body)
+        except ValidationError as e:
+            errors = [{**err, "loc": ("body", *err["loc"])} for err in e.errors(include_url=False)]
+            raise RequestValidationError(errors, body=body)
+    try:
+        payload = json_loads(body)
+    except ValueError as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": str(e), "input": None}])
+    return parse_signal_payload(payload)
+
+
+def parse_signal_payload(payload, loc: tuple = ("body",)) -> SignalRequest:
+    """Validate one already-decoded /signal body (row or columnar).  ``loc``
+    prefixes error locations, e.g. ("body", "requests", 2) in a batch."""
+    if not isinstance(payload, dict):
+        raise RequestValidationError([{"type": "dict_type", "loc": loc, "msg": "must be an object", "input": None}])
+    payload = dict(payload)
+    columns = payload.pop("candles_columnar", None)
+    try:
+        req = SignalRequest.model_validate(payload)
+    except ValidationError as e:
+        errors = [{**err, "loc": (*loc, *err["loc"])} for err in e.errors(include_url=False)]
+        raise RequestValidationError(errors)
+    if columns is None:
+        return req
+
+    if not isinstance(columns, dict):
+        raise RequestValidationError([{"type": "dict_type", "loc": (*loc, "candles_columnar"), "msg": "must be an object of timeframes", "input": None}])
+    series = {}
+    for tf, cols in columns.items():
+        try:
+            series[tf] = CandleSeries.from_columns(cols)
+        except (ValueError, TypeError, AttributeError) as e:
+            raise RequestValidationError([{"type": "value_error", "loc": (*loc, "candles_columnar", tf), "msg": str(e), "input": None}])
+    req._columnar = series
+    return req
+
+
+def candle_series(req: SignalRequest) -> dict[str, CandleSeries]:
+    """The request's candles as arrays: columnar uploads plus any row TFs."""
+    series = build_series(req.candles)
+    if req._columnar:
+        series.update((tf, s) for tf, s in req._columnar.items() if len(s))
+    if req.resample and series:
+        series = resampled_series(req, series)
+    return series
+
+
+def resampled_series(req: SignalRequest, series: dict[str, CandleSeries]) -> dict[str, CandleSeries]:
+    """Add the ``req.resample`` timeframes, built from the lowest timeframe
+    sent.  Timeframes the EA sent itself are kept as they are."""
+    base_tf = min(series, key=lambda tf: TIMEFRAME_SECONDS.get(tf, float("inf")))
+    offset = req.resample_offset_minutes * 60
+    for tf in req.resample:
+        if tf in series:
+            continue
+        error = resample_error(base_tf, tf)
+        derived = resample(series[base_tf], tf, offset) if error is None else None
+        if derived is None:
+            logger.warning(f"   ⚠️ Cannot resample {req.symbol} {base_tf} → {tf}: {error or 'unparseable candle times'}")
+            continue
+        series[tf] = derived
+    # Prompt and cache key list timeframes lowest first, as the EA sends them
+    return dict(sorted(series.items(), key=lambda item: TIMEFRAME_SECONDS.get(item[0], float("inf"))))
+
+
+def atr_timeframe(series: dict[str, CandleSeries]) -> Optional[str]:
+    return preferred_timeframe([tf for tf, s in series.items() if len(s) >= 2])
+
+
+def signal_indicators(req: SignalRequest, series: dict[str, CandleSeries]) -> tuple[dict[str, TFIndicators], float]:
+    """Indicators per timeframe plus the ATR used in the prompt (the EA's
+    own value if it sent one, else H1/M15/first TF)."""
+    indicators = compute_indicators(series, req.bid)
+    if req.atr is not None:
+        return indicators, req.atr
+    atr_tf = atr_timeframe(series)
+    return indicators, indicators[atr_tf].atr if atr_tf else 0.0
+
+
+def prefilter_veto(
+    req: SignalRequest,
+    series: dict[str, CandleSeries],
+    indicators: dict[str, TFIndicators],
+) -> Optional[tuple[str, str]]:
+    """Run the pre-filter gates; (gate, reason) if one vetoes, else None."""
+    if prefilter is None:
+        return None
+    now = datetime.now(timezone.utc)
+    ctx = GateContext(
+        symbol=req.symbol,
+        timeframe=req.timeframe,
+        series=series,
+        indicators=indicators,
+        atr_tf=atr_timeframe(series),
+        session=session_for_minute(now.replace(second=0, microsecond=0), req.symbol),
+        now=now,
+        server_time=req.server_time_utc,
+    )
+    with stage("prefilter"):
+        return prefilter.run(ctx)
+
+
+# ---------------------------------------------------------------------------
+# Helper: incremental candle ingest (delta mode)
+# ---------------------------------------------------------------------------
+
+candle_store = CandleStore(max_candles=CANDLE_STORE_MAX_CANDLES, max_series=CANDLE_STORE_MAX_SERIES)
+
+
+def merge_candle_deltas(req: SignalRequest) -> list[str]:
+    """Seed the ring buffers from full uploads, merge any deltas and rebuild
+    req.candles in place.  Returns the timeframes the EA must resend in full."""
+    if not req.account_id:
+        return list(req.candle_delta or {})
+
+    for tf, tf_candles in req.candles.items():
+        if tf_candles:
+            candle_store.replace((req.account_id, req.symbol, tf), tf_candles)
+
+    resync = []
+    for tf, delta in (req.candle_delta or {}).items():
+        key = (req.account_id, req.symbol, tf)
+        if candle_store.apply_delta(key, delta.since, delta.candles, delta.checksum, req.digits):
+            req.candles[tf] = candle_store.view(key)
+        else:
+            resync.append(tf)
+    return resync
+
+
+def candle_ack_header(req: SignalRequest) -> str:
+    """``TF=last_time`` pairs the EA sends back as ``since`` on the next call."""
+    return ";".join(f"{tf}={c[-1].time}" for tf, c in req.candles.items() if c)
 
 
 # ---------------------------------------------------------------------------
@@ -311,10 +803,11 @@ SIGNAL_JSON_SCHEMA = {
 # Helper: classify instrument type from symbol name
 # ---------------------------------------------------------------------------
 
+@lru_cache(maxsize=256)
 def classify_instrument(symbol: str) -> dict:
     """Classify a trading instrument and return its display name, specialty, and
     session-specific liquidity descriptions.  Covers gold, silver, oil, indices,
-    crypto, and forex (default)."""
+    crypto, and forex (default).  Cached per symbol — treat the result as read-only."""
     sym = symbol.upper().replace(".", "").replace("_", "").replace("-", "")
 
     # --- Gold ---
@@ -406,49 +899,57 @@ def get_session_info(utc_time: datetime, symbol: str = "XAUUSD") -> dict:
     # New York:      13:00 – 22:00 UTC
     # Overlaps:      London-NY 13:00–16:00 UTC
     if 13 <= hour_utc < 16:
-        session = "London-New York overlap"
-        liquidity = instrument["sessions"]["overlap"]
+        key, session = "overlap", "London-New York overlap"
     elif 7 <= hour_utc < 13:
-        session = "London session"
-        liquidity = instrument["sessions"]["london"]
+        key, session = "london", "London session"
     elif 16 <= hour_utc < 22:
-        session = "New York session"
-        liquidity = instrument["sessions"]["newyork"]
+        key, session = "newyork", "New York session"
     else:
-        session = "Asian/Sydney session"
-        liquidity = instrument["sessions"]["asian"]
+        key, session = "asian", "Asian/Sydney session"
 
     return {
+        "key": key,
         "session": session,
-        "liquidity": liquidity,
+        "liquidity": instrument["sessions"][key],
         "instrument": instrument,
         "myt_str": myt_time.strftime("%Y-%m-%d %H:%M MYT"),
         "utc_str": utc_time.strftime("%Y-%m-%d %H:%M UTC"),
     }
 
 
+@lru_cache(maxsize=128)
+def session_for_minute(utc_minute: datetime, symbol: str) -> dict:
+    """get_session_info memoised per (minute, symbol) — all requests of a
+    batch (or a burst) in the same minute share one result.  Read-only."""
+    return get_session_info(utc_minute, symbol)
+
+
 # ---------------------------------------------------------------------------
 # Build system prompt for OpenAI
 # ---------------------------------------------------------------------------
 
-def build_system_prompt(req: SignalRequest, atr_value: float) -> str:
-    now_utc = datetime.now(timezone.utc)
-    session = get_session_info(now_utc, req.symbol)
-    inst = session["instrument"]
+@lru_cache(maxsize=256)
+def compile_system_prefix(symbol: str, digits: int, constraints: tuple) -> str:
+    """Static part of the system prompt for one instrument + constraint set.
+
+    Byte-identical across requests so the provider's prefix prompt cache can
+    hit; everything that changes per request (time, session, prices, ATR)
+    lives in the trailing market context section instead."""
+    max_spread_points, _risk_percent, min_rr, expiry_minutes = constraints
+    inst = classify_instrument(symbol)
+    notes = inst["sessions"]
 
     return f"""You are a professional {inst['name']} trading analyst operating from Malaysia (UTC+8).
 You specialize in {inst['specialty']}. Your goal is to find the best available trading opportunity, even if conditions are not absolutely perfect, provided they meet minimum viability.
 
 ═══ INSTRUMENT ═══
-- Symbol: {req.symbol}
+- Symbol: {symbol}
 - Type: {inst['type']}
-
-═══ CURRENT MARKET CONTEXT ═══
-- Server time: {session['utc_str']} (Malaysia: {session['myt_str']})
-- Trading session: {session['session']} — {session['liquidity']}
-- Current price: Bid={req.bid}, Ask={req.ask}, Spread={req.spread_points} pts
-- Primary Timeframe: {req.timeframe} (Multi-timeframe data provided below)
-- ATR(14): {atr_value:.5f} (recent average volatility per candle)
+- Session liquidity for this instrument:
+  - Asian/Sydney session: {notes['asian']}
+  - London session: {notes['london']}
+  - London-New York overlap: {notes['overlap']}
+  - New York session: {notes['newyork']}
 
 ═══ ANALYSIS FRAMEWORK ═══
 Before making your decision, mentally perform these analysis steps:
@@ -465,7 +966,7 @@ Before making your decision, mentally perform these analysis steps:
    - Is the market in a consolidation/squeeze that could lead to a breakout?
 
 3. SESSION CONTEXT:
-   - Current session: {session['session']}. {session['liquidity']}.
+   - Use the current session given in CURRENT MARKET CONTEXT below.
    - During Asian session, prefer wider stops and be cautious with breakouts.
    - During London/NY, breakouts are more reliable — look for momentum.
    - During London-NY overlap, expect the strongest moves.
@@ -483,17 +984,17 @@ Before making your decision, mentally perform these analysis steps:
    - buy_stop: SL < entry (e.g. entry - 1.5×ATR)
    - sell_stop: SL > entry (e.g. entry + 1.5×ATR)
 4. TP placement — use your best technical judgement:
-   - R:R benchmark from settings: {req.constraints.min_rr} (reference only, NOT a hard rule)
+   - R:R benchmark from settings: {min_rr} (reference only, NOT a hard rule)
    - Place TP at the level that makes the most sense technically (key S/R, Fib extensions, ATR targets, etc.)
-   - You may use a HIGHER or LOWER R:R than {req.constraints.min_rr} if the chart structure supports it
+   - You may use a HIGHER or LOWER R:R than {min_rr} if the chart structure supports it
    - The goal is the best risk-adjusted trade, not a fixed R:R ratio
-5. expiry_minutes = {req.constraints.expiry_minutes}.
+5. expiry_minutes = {expiry_minutes}.
 6. Provide a short comment (max 30 chars) describing the setup.
-7. If spread ({req.spread_points} pts) > max allowed ({req.constraints.max_spread_points} pts),
+7. If the current spread (see CURRENT MARKET CONTEXT) > max allowed ({max_spread_points} pts),
    OR if no clear setup exists, set order.type="none", veto=true,
    veto_reason explaining why.
-8. All prices must be rounded to {req.digits} decimal places.
-9. symbol = "{req.symbol}". timestamp_utc = current UTC time in ISO-8601.
+8. All prices must be rounded to {digits} decimal places.
+9. symbol = "{symbol}". timestamp_utc = current UTC time in ISO-8601.
 
 ═══ CONFIDENCE GUIDE ═══
 - 0.80–1.00: Strong conviction — clear trend, key level breakout, good session, multiple confirming factors.
@@ -501,51 +1002,67 @@ Before making your decision, mentally perform these analysis steps:
 - 0.40–0.59: Weak setup — acceptable if you want to test a level, but consider vetoing if conditions are extremely poor.
 - Below 0.40: Veto. Do not trade.
 
-Respond ONLY with valid JSON matching the required schema. No extra text."""
+Respond ONLY with valid JSON matching the required schema. No extra text.
+"""
+
+
+def build_system_prompt(req: SignalRequest, atr_value: float) -> str:
+    now_utc = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+    session = session_for_minute(now_utc, req.symbol)
+    c = req.constraints
+    prefix = compile_system_prefix(
+        req.symbol, req.digits, (c.max_spread_points, c.risk_percent, c.min_rr, c.expiry_minutes),
+    )
+
+    return prefix + f"""
+═══ CURRENT MARKET CONTEXT ═══
+- Server time: {session['utc_str']} (Malaysia: {session['myt_str']})
+- Trading session: {session['session']} — {session['liquidity']}
+- Current price: Bid={req.bid}, Ask={req.ask}, Spread={req.spread_points} pts
+- Primary Timeframe: {req.timeframe} (Multi-timeframe data provided below)
+- ATR(14): {atr_value:.5f} (recent average volatility per candle)"""
 
 
 # ---------------------------------------------------------------------------
 # Build user message with candle data
 # ---------------------------------------------------------------------------
 
-def build_user_message(req: SignalRequest) -> str:
+def build_user_message(
+    req: SignalRequest,
+    series: dict[str, CandleSeries],
+    indicators: dict[str, TFIndicators],
+    encoding: Optional[str] = None,
+    limits: Optional[dict[str, int]] = None,
+) -> str:
+    """Per-TF structure summary plus candle tables in ``encoding`` (default
+    CANDLE_ENCODING), newest ``limits[tf]`` candles per timeframe."""
     lines = []
-    
+    d = req.digits
+    encoding = encoding or CANDLE_ENCODING
+    limits = CANDLE_PROMPT_LIMITS if limits is None else limits
+
     # Process each timeframe
-    for tf, tf_candles in req.candles.items():
-        if not tf_candles:
+    for tf, tf_series in series.items():
+        ind = indicators.get(tf)
+        if ind is None:
             continue
-            
-        candle_subset = tf_candles[-60:] # Limit to 60 candles per timeframe for context
-
-        # Compute a quick market structure summary from the candles
-        highs = [c.high for c in candle_subset]
-        lows = [c.low for c in candle_subset]
-        recent_high = max(highs)
-        recent_low = min(lows)
-        price_range = recent_high - recent_low
-        mid_price = req.bid
-        position_pct = ((mid_price - recent_low) / price_range * 100) if price_range > 0 else 50.0
-
-        # Simple trend from first vs last candle
-        first_close = candle_subset[0].close
-        last_close = candle_subset[-1].close
-        trend_change = last_close - first_close
-        trend_dir = "bullish" if trend_change > 0 else "bearish" if trend_change < 0 else "flat"
 
+        swing_highs = ", ".join(f"{p:.{d}f}" for p in ind.swing_highs) or "none"
+        swing_lows = ", ".join(f"{p:.{d}f}" for p in ind.swing_lows) or "none"
         lines.extend([
             f"═══ {tf} MARKET STRUCTURE SUMMARY ═══",
-            f"Recent 60-candle high: {recent_high}",
-            f"Recent 60-candle low:  {recent_low}",
-            f"Current price position: {position_pct:.0f}% of range (0%=at low, 100%=at high)",
-            f"Short-term trend: {trend_dir} (moved {trend_change:+.{req.digits}f} over last 60 candles)",
+            f"Recent {ind.window}-candle high: {ind.recent_high}",
+            f"Recent {ind.window}-candle low:  {ind.recent_low}",
+            f"Current price position: {ind.range_position:.0f}% of range (0%=at low, 100%=at high)",
+            f"Short-term trend: {ind.trend_dir} (moved {ind.trend_change:+.{d}f} over last {ind.window} candles, slope {ind.slope:+.{d}f}/candle)",
+            f"ATR(14): {ind.atr:.{d}f}  EMA20: {ind.ema_fast:.{d}f}  EMA50: {ind.ema_slow:.{d}f}  SMA20: {ind.sma:.{d}f}",
+            f"Recent swing highs: {swing_highs}",
+            f"Recent swing lows:  {swing_lows}",
             "",
             f"═══ {tf} CANDLE DATA (newest last) ═══",
         ])
-        for c in candle_subset:
-            lines.append(
-                f"  {c.time} O={c.open} H={c.high} L={c.low} C={c.close} V={c.volume}"
-            )
+        limit = limits.get(tf.upper(), CANDLE_PROMPT_LIMIT)
+        lines.extend(encode_candles(tf_series, limit, d, encoding))
         lines.append("")
 
     lines.append(f"Bid={req.bid} Ask={req.ask} Spread={req.spread_points}pts")
@@ -555,64 +1072,183 @@ def build_user_message(req: SignalRequest) -> str:
 
 
 # ---------------------------------------------------------------------------
-# Endpoints
+# OpenAI call helpers — single model call and hedged primary/fallback race
 # ---------------------------------------------------------------------------
 
-@app.get("/health")
-async def health():
-    logger.info("Health check requested")
-    return {"status": "ok"}
+async def probe_model(model: str):
+    """Tiny completion used by the circuit breaker to test an open model.
+    Fails only on the errors the breaker counts (see breaker_failure): a
+    4xx answer still shows the model is reachable."""
+    client = openai_pool.get(model)
+    try:
+        await asyncio.wait_for(
+            client.chat.completions.create(
+                model=model, messages=[{"role": "user", "content": "ping"}], max_completion_tokens=16,
+            ),
+            timeout=BREAKER_PROBE_TIMEOUT_SECONDS,
+        )
+    except openai.APIStatusError as e:
+        if breaker_failure(e, client_bound=False) is not None:
+            raise
+
+
+model_breakers = BreakerBoard(
+    probe_model,
+    failure_threshold=BREAKER_FAILURE_THRESHOLD,
+    error_rate=BREAKER_ERROR_RATE,
+    min_samples=BREAKER_MIN_SAMPLES,
+    open_seconds=BREAKER_OPEN_SECONDS,
+    slow_seconds=BREAKER_SLOW_SECONDS,
+)
 
 
-@app.post("/signal", response_model=SignalResponse)
-async def generate_signal(req: SignalRequest):
-    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
-    logger.info("")
-    logger.info("─" * 60)
-    logger.info(f"📥 [{now}] Signal request received")
-    if req.account_id:
-        logger.info(f"   Account: {req.account_id}")
-    logger.info(f"   Symbol: {req.symbol}  Timeframe: {req.timeframe}")
-    logger.info(f"   Bid: {req.bid}  Ask: {req.ask}  Spread: {req.spread_points}pts")
-    # Log per-timeframe candle counts
-    tf_summary = ", ".join(f"{tf}={len(c)}" for tf, c in req.candles.items())
-    total_candles = sum(len(c) for c in req.candles.values())
-    logger.info(f"   Candles: {total_candles} total across {len(req.candles)} timeframes")
-    logger.info(f"   Timeframes: {tf_summary}")
-    logger.info(f"   ATR: {req.atr}")
-    logger.info(f"   Model: {OPENAI_MODEL}")
+class LatencyWindow:
+    """Rolling window of recent successful response times for one model."""
 
-    # 1. Compute ATR if not provided
-    atr_value = req.atr if req.atr is not None else compute_atr(req.candles)
+    def __init__(self, size: int = 100):
+        self.samples: deque[float] = deque(maxlen=size)
 
-    # 2. Quick spread veto (server-side too, belt-and-suspenders)
-    if req.spread_points > req.constraints.max_spread_points:
-        logger.warning(f"   🚫 VETO: Spread {req.spread_points} > max {req.constraints.max_spread_points}")
-        logger.info("─" * 60)
-        return veto_response(req.symbol, f"spread {req.spread_points} > max {req.constraints.max_spread_points}")
+    def record(self, seconds: float):
+        self.samples.append(seconds)
 
-    # 3. Call OpenAI with Structured Outputs (with fallback)
-    client = AsyncOpenAI(api_key=OPENAI_API_KEY, timeout=60.0)
-    models_to_try = [OPENAI_MODEL]
-    if FALLBACK_MODEL and FALLBACK_MODEL != OPENAI_MODEL:
-        models_to_try.append(FALLBACK_MODEL)
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        idx = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[idx]
 
-    messages = [
-        {"role": "system", "content": build_system_prompt(req, atr_value)},
-        {"role": "user", "content": build_user_message(req)},
-    ]
 
-    last_error = None
-    for model in models_to_try:
-        try:
-            is_fallback = model != OPENAI_MODEL
-            if is_fallback:
-                logger.warning(f"   🔄 Falling back to {model}...")
-            else:
-                logger.info(f"   ⏳ Calling OpenAI ({model})...")
-            sys.stdout.flush()
-            start_time = time.time()
+model_latency: dict[str, LatencyWindow] = defaultdict(LatencyWindow)
+
+
+def hedge_delay(model: str) -> float:
+    """Seconds to wait on the primary before firing the fallback in parallel:
+    the configured percentile of the primary's recent latency, or the static
+    default until enough samples exist."""
+    window = model_latency[model]
+    if len(window.samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DELAY_SECONDS
+    return max(HEDGE_MIN_DELAY_SECONDS, window.percentile(HEDGE_PERCENTILE))
+
 
+def latency_estimate(model: str) -> float:
+    """Seconds a call to ``model`` is expected to take: the
+    DEADLINE_LATENCY_PERCENTILE of its recent latency, or
+    DEADLINE_MIN_CALL_SECONDS until it has HEDGE_MIN_SAMPLES answers."""
+    window = model_latency[model]
+    if len(window.samples) < HEDGE_MIN_SAMPLES:
+        return DEADLINE_MIN_CALL_SECONDS
+    return window.percentile(DEADLINE_LATENCY_PERCENTILE)
+
+
+def time_left(deadline: Optional[float]) -> Optional[float]:
+    return deadline - time.monotonic() if deadline is not None else None
+
+
+def deadline_passed(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def is_deadline_veto(signal: SignalResponse) -> bool:
+    return signal.veto and signal.veto_reason.startswith("deadline")
+
+
+def fits_budget(model: str, deadline: Optional[float]) -> bool:
+    left = time_left(deadline)
+    return left is None or latency_estimate(model) <= left
+
+
+async def stream_completion(
+    client: AsyncOpenAI,
+    model: str,
+    messages: list[dict],
+    quote: Optional[tuple[float, float]],
+    on_progress: Optional[Callable[[dict], None]],
+) -> tuple[str, Any, Optional[str], SignalStreamParser]:
+    """Streamed Structured Outputs completion.  Returns (content, usage,
+    early-exit veto reason or None, parser).  Each field the parser
+    completes is passed to ``on_progress``; with LLM_EARLY_EXIT and a
+    (bid, ask) ``quote`` the generation is stopped as soon as early_exit()
+    decides the request."""
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=messages,
+        response_format={"type": "json_schema", "json_schema": SIGNAL_JSON_SCHEMA},
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parser = SignalStreamParser()
+    usage = None
+    try:
+        async for chunk in stream:
+            if chunk.usage:
+                usage = chunk.usage
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if not delta:
+                continue
+            for name, value in parser.feed(delta):
+                if on_progress is not None:
+                    on_progress({"model": model, "field": name, "value": value})
+            if LLM_EARLY_EXIT and quote is not None:
+                decided = early_exit(parser.fields, *quote)
+                if decided:
+                    kind, reason = decided
+                    EARLY_EXITS.inc(model=model, kind=kind)
+                    logger.info(f"   ✂️  Early exit after {parser.chunks} chunks ({model}): {reason}")
+                    return parser.text, usage, reason, parser
+    finally:
+        await stream.close()  # an early exit stops the generation here
+    return parser.text, usage, None, parser
+
+
+def breaker_failure(error: BaseException, client_bound: bool) -> Optional[str]:
+    """Why ``error`` counts against the model's circuit breaker: "timeout",
+    "connection", "rate_limit" (429) or "server_error" (5xx).  None for
+    errors that say nothing about the model's health — a bad request or
+    schema (4xx), our own cancellation or the client's deadline."""
+    if isinstance(error, asyncio.TimeoutError):
+        return None if client_bound else "timeout"
+    if isinstance(error, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(error, openai.APIConnectionError):
+        return "connection"
+    if isinstance(error, openai.RateLimitError):
+        return "rate_limit"
+    if isinstance(error, openai.APIStatusError) and error.status_code >= 500:
+        return "server_error"
+    return None
+
+
+async def call_model(
+    model: str,
+    messages: list[dict],
+    quote: Optional[tuple[float, float]] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    deadline: Optional[float] = None,
+) -> SignalResponse:
+    """Run one Structured Outputs completion and validate it.  Raises on
+    timeout, API error or invalid JSON so callers can fall back.  With
+    LLM_STREAMING the answer is streamed (see stream_completion); ``quote``
+    is the (bid, ask) used for early-exit checks.  The call is cut off at
+    90s, or at the client's ``deadline`` (monotonic) if that comes first."""
+    timeout = 90.0  # Hard 90s deadline — force-cancel if OpenAI hangs
+    left = time_left(deadline)
+    client_bound = left is not None and left < timeout
+    if client_bound:
+        timeout = max(left, 0.0)
+    logger.info(f"   ⏳ Calling OpenAI ({model}{', streaming' if LLM_STREAMING else ''}"
+                f"{f', {timeout:.1f}s left' if client_bound else ''})...")
+    start_time = time.time()
+
+    client = openai_pool.get(model)
+    exit_reason, parser = None, None
+    try:
+        if LLM_STREAMING:
+            raw_json, usage, exit_reason, parser = await asyncio.wait_for(
+                stream_completion(client, model, messages, quote, on_progress), timeout=timeout,
+            )
+        else:
             response = await asyncio.wait_for(
                 client.chat.completions.create(
                     model=model,
@@ -622,81 +1258,1238 @@ async def generate_signal(req: SignalRequest):
                         "json_schema": SIGNAL_JSON_SCHEMA,
                     },
                 ),
-                timeout=90.0,  # Hard 90s deadline — force-cancel if OpenAI hangs
+                timeout=timeout,
             )
+            raw_json, usage = response.choices[0].message.content, response.usage
+    except BaseException as e:
+        outcome = (
+            "timeout" if isinstance(e, (openai.APITimeoutError, asyncio.TimeoutError))
+            else "cancelled" if isinstance(e, asyncio.CancelledError)
+            else "error"
+        )
+        if outcome == "timeout" and client_bound and isinstance(e, asyncio.TimeoutError):
+            outcome = "deadline"
+        OPENAI_SECONDS.observe(time.time() - start_time, model=model, outcome=outcome)
+        reason = breaker_failure(e, client_bound)
+        if reason is not None:
+            model_breakers.record_failure(model, reason)
+        raise
+
+    elapsed = time.time() - start_time
+
+    # Token usage (not reported when the stream was cut short)
+    cached = 0
+    if exit_reason and not usage:
+        logger.info(f"   📊 Tokens: ~{parser.chunks} out before the early exit")
+        OPENAI_TOKENS.inc(parser.chunks, model=model, kind="completion")
+    if usage:
+        logger.info(f"   📊 Tokens: {usage.prompt_tokens} in + {usage.completion_tokens} out = {usage.total_tokens} total")
+        OPENAI_TOKENS.inc(usage.prompt_tokens, model=model, kind="prompt")
+        OPENAI_TOKENS.inc(usage.completion_tokens, model=model, kind="completion")
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (details.cached_tokens or 0) if details else 0
+        OPENAI_TOKENS.inc(cached, model=model, kind="cached")
+        logger.info(f"   🗄️  Prompt cache: {cached}/{usage.prompt_tokens} tokens cached ({cached / max(usage.prompt_tokens, 1):.0%})")
+    logger.info(f"   ⏱️  Response time ({model}): {elapsed:.1f}s")
+
+    # An early exit answers with our own veto (and says nothing about the
+    # model's full-answer latency or health)
+    if exit_reason:
+        OPENAI_SECONDS.observe(elapsed, model=model, outcome="early_exit")
+        signal = veto_response(parser.fields.get("symbol", ""), exit_reason)
+        signal._model = model
+        return signal
+
+    # Parse the text output into our Pydantic model for validation; only a
+    # valid answer counts as a success (and as a latency sample)
+    try:
+        with stage("response_validation"):
+            signal = SignalResponse.model_validate_json(raw_json)
+    except ValidationError:
+        OPENAI_SECONDS.observe(elapsed, model=model, outcome="invalid")
+        raise
+    OPENAI_SECONDS.observe(elapsed, model=model, outcome="ok")
+    model_breakers.record_success(model, elapsed)
+    signal._model = model
+    if usage:
+        signal._usage = (usage.prompt_tokens, usage.completion_tokens, cached)
+    model_latency[model].record(elapsed)
+    return signal
+
+
+async def call_models_hedged(
+    models: list[str],
+    messages: list[dict],
+    quote: Optional[tuple[float, float]] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    deadline: Optional[float] = None,
+) -> SignalResponse:
+    """Start the primary model; if it has not answered within the hedge delay
+    (or fails first), start the fallback in parallel.  The first valid
+    SignalResponse wins and the other call is cancelled.  The fallback is
+    not started once it could no longer answer before ``deadline``."""
+    primary, fallback = models[0], models[1]
+    delay = hedge_delay(primary)
+    start = time.time()
+    tasks = {asyncio.create_task(call_model(primary, messages, quote, on_progress, deadline)): primary}
+    hedge_started_at: Optional[float] = None
+    primary_done_at: Optional[float] = None
+    last_error: Optional[BaseException] = None
+
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done and not fits_budget(fallback, deadline):
+            logger.info(f"   ⏭️  {primary} slower than {delay:.1f}s — not hedging: {time_left(deadline):.1f}s left, "
+                        f"{fallback} needs ~{latency_estimate(fallback):.1f}s")
+        elif not done:
+            logger.warning(f"   🔀 {primary} slower than {delay:.1f}s — hedging with {fallback}")
+            hedge_started_at = time.time()
+            FALLBACKS.inc(mode="hedge")
+            tasks[asyncio.create_task(call_model(fallback, messages, quote, on_progress, deadline))] = fallback
+
+        while tasks:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                model = tasks.pop(task)
+                error = task.exception()
+                if error is None:
+                    signal = task.result()
+                    total = time.time() - start
+                    if model == primary:
+                        logger.info(f"   🏁 Hedge winner: {model} in {total:.1f}s")
+                    else:
+                        # Sequential fallback would only have started once the
+                        # primary gave up; we started it at hedge time instead.
+                        saved = (primary_done_at or time.time()) - hedge_started_at if hedge_started_at else 0.0
+                        logger.info(f"   🏁 Hedge winner: {model} (fallback) in {total:.1f}s — saved ≥{saved:.1f}s vs sequential")
+                    return signal
+
+                last_error = error
+                logger.error(f"   ❌ {model} failed: {error!r}")
+                if model == primary:
+                    primary_done_at = time.time()
+                    if fallback not in tasks.values() and hedge_started_at is None:
+                        if not fits_budget(fallback, deadline):
+                            logger.info(f"   ⏭️  Skipping fallback {fallback}: {time_left(deadline):.1f}s left, "
+                                        f"needs ~{latency_estimate(fallback):.1f}s")
+                            continue
+                        logger.info(f"   ↪ Will try fallback model...")
+                        FALLBACKS.inc(mode="sequential")
+                        tasks[asyncio.create_task(call_model(fallback, messages, quote, on_progress, deadline))] = fallback
+        raise last_error or RuntimeError("no model answered")
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def request_signal(
+    req: SignalRequest,
+    atr_value: float,
+    series: dict[str, CandleSeries],
+    indicators: dict[str, TFIndicators],
+    on_progress: Optional[Callable[[dict], None]] = None,
+    deadline: Optional[float] = None,
+) -> SignalResponse:
+    """Build the prompt and ask the configured models (hedged or sequential
+    fallback).  Returns a model_unavailable veto if every model fails or
+    every model's circuit breaker is open.  ``on_progress`` receives the
+    answer's fields as they stream in (LLM_STREAMING).  With a client
+    ``deadline`` (monotonic), only models whose recent latency fits the time
+    left are tried; a ``deadline`` veto is returned if none does."""
+    models_to_try = model_breakers.route(configured_models())
+    if not models_to_try:
+        logger.error(f"   ⛔ Every model's circuit is open — not calling OpenAI")
+        return veto_response(req.symbol, "model_unavailable")
+    in_budget = [m for m in models_to_try if fits_budget(m, deadline)]
+    if not in_budget:
+        left = time_left(deadline)
+        fastest = min(latency_estimate(m) for m in models_to_try)
+        logger.warning(f"   ⏱️  {left:.1f}s left — no model answers that fast (fastest ~{fastest:.1f}s); not calling OpenAI")
+        LOAD_SHED.inc(reason="deadline")
+        return veto_response(req.symbol, f"deadline: {max(left, 0.0):.1f}s left, models need ~{fastest:.1f}s")
+    if in_budget != models_to_try:
+        skipped = ", ".join(f"{m} (~{latency_estimate(m):.1f}s)" for m in models_to_try if m not in in_budget)
+        logger.warning(f"   ⏱️  {time_left(deadline):.1f}s left — skipping {skipped}")
+        models_to_try = in_budget
+    if models_to_try[0] != OPENAI_MODEL:
+        logger.warning(f"   🔀 Routing to {models_to_try[0]} ({OPENAI_MODEL} circuit open or slow)")
+
+    with stage("prompt_build"):
+        messages = [
+            {"role": "system", "content": build_system_prompt(req, atr_value)},
+            {"role": "user", "content": build_user_message(req, series, indicators)},
+        ]
+
+    signal = None
+    last_error = None
+    if HEDGE_ENABLED and len(models_to_try) > 1:
+        try:
+            signal = await call_models_hedged(models_to_try, messages, (req.bid, req.ask), on_progress, deadline)
+        except Exception as e:
+            last_error = e
+    else:
+        for model in models_to_try:
+            is_fallback = model != OPENAI_MODEL
+            if model != models_to_try[0] and not fits_budget(model, deadline):
+                logger.info(f"   ⏭️  Skipping fallback {model}: {time_left(deadline):.1f}s left, "
+                            f"needs ~{latency_estimate(model):.1f}s")
+                break
+            try:
+                if is_fallback:
+                    logger.warning(f"   🔄 Falling back to {model}...")
+                    FALLBACKS.inc(mode="sequential")
+                signal = await call_model(model, messages, (req.bid, req.ask), on_progress, deadline)
+                if is_fallback:
+                    logger.info(f"   ℹ️  Used fallback model: {model}")
+                break
+
+            except (openai.APITimeoutError, asyncio.TimeoutError) as e:
+                last_error = e
+                logger.error(f"   ⏰ {model} timed out: {e!r}")
+                if not is_fallback and len(models_to_try) > 1:
+                    logger.info(f"   ↪ Will try fallback model...")
+                continue
+
+            except Exception as e:
+                last_error = e
+                logger.error(f"   ❌ {model} failed: {e}")
+                if not is_fallback and len(models_to_try) > 1:
+                    logger.info(f"   ↪ Will try fallback model...")
+                continue
+
+    if signal is None and deadline_passed(deadline):
+        # The client's budget ran out, which says nothing about the models
+        logger.warning(f"   ⏱️  Client budget spent before any model answered")
+        return veto_response(req.symbol, "deadline: budget spent before a model answered")
+    if signal is None:
+        # All models failed
+        logger.error(f"   ❌ All models failed. Last error: {last_error}", exc_info=last_error)
+        return veto_response(req.symbol, "model_unavailable")
+
+    # --- FIX Issue 3: Override timestamp with actual server time ---
+    signal.timestamp_utc = datetime.now(timezone.utc).isoformat()
+    return signal
 
-            elapsed = time.time() - start_time
 
-            # Token usage
-            usage = response.usage
-            if usage:
-                logger.info(f"   📊 Tokens: {usage.prompt_tokens} in + {usage.completion_tokens} out = {usage.total_tokens} total")
-            logger.info(f"   ⏱️  Response time: {elapsed:.1f}s")
-            if is_fallback:
-                logger.info(f"   ℹ️  Used fallback model: {model}")
+# ---------------------------------------------------------------------------
+# Admission control — bounded in-flight LLM calls and per-account rate limits
+# ---------------------------------------------------------------------------
 
-            # Extract the text output from the response
-            raw_json = response.choices[0].message.content
+llm_admission = AdmissionController(
+    max_inflight=LLM_MAX_INFLIGHT, max_queue=LLM_MAX_QUEUE, initial_service_seconds=LLM_INITIAL_SERVICE_SECONDS,
+)
+if ACCOUNT_RATE_PER_MINUTE <= 0:
+    account_limiter = None
+elif shared_db is not None:
+    account_limiter = SharedRateLimiter(shared_db, ACCOUNT_RATE_PER_MINUTE, ACCOUNT_BURST)
+else:
+    account_limiter = AccountRateLimiter(ACCOUNT_RATE_PER_MINUTE, ACCOUNT_BURST)
+
+
+async def admitted_request_signal(
+    req: SignalRequest,
+    atr_value: float,
+    series: dict[str, CandleSeries],
+    indicators: dict[str, TFIndicators],
+    deadline: Optional[float] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    charge_account: bool = False,
+    queue_deadline: Optional[float] = None,
+) -> SignalResponse:
+    """request_signal inside an LLM slot.  Raises Overloaded when the wait
+    for a slot would run past ``deadline`` (the client's, monotonic), or
+    past ``queue_deadline`` when the client sent none (both None = wait for
+    a slot).  With ``charge_account``, the request's account pays one
+    rate-limit token first (RateLimited if it has none)."""
+    if charge_account and not await account_limiter.acquire(req.account_id):
+        raise RateLimited(req.account_id)
+    async with llm_admission.slot(time_left(deadline if deadline is not None else queue_deadline)):
+        return await request_signal(req, atr_value, series, indicators, on_progress, deadline)
+
+
+def rate_limited_veto(req: SignalRequest) -> SignalResponse:
+    logger.warning(f"🚦 Rate limit: account {req.account_id} ({req.symbol}) over {ACCOUNT_RATE_PER_MINUTE:g}/min")
+    LOAD_SHED.inc(reason="rate_limited")
+    SIGNALS.inc(outcome="veto", source="server")
+    VETOES.inc(reason="rate_limited")
+    return veto_response(req.symbol, "rate_limited")
+
+
+def client_budget(request: Request) -> Optional[float]:
+    """Seconds the caller will still wait for an answer, from its
+    X-Timeout-Ms header: counted from when the request arrived and minus
+    DEADLINE_SAFETY_MS for sending the reply.  None without the header —
+    then only the queue wait is limited (CLIENT_BUDGET_SECONDS) and each
+    OpenAI call keeps its 90s timeout."""
+    try:
+        budget = max(0.0, float(request.headers["x-timeout-ms"]) / 1000)
+    except (KeyError, ValueError):
+        return None
+    received_at = getattr(request.state, "received_at", None)
+    waited = time.monotonic() - received_at if received_at is not None else 0.0
+    return max(0.0, budget - waited - DEADLINE_SAFETY_MS / 1000)
+
+
+async def until_disconnect(request: Request, work: Awaitable):
+    """Await ``work`` unless the client hangs up first — then cancel it (so
+    an OpenAI call nobody will read stops) and return a 499 response."""
+    task = asyncio.ensure_future(work)
+
+    async def disconnected():
+        # The body is already read, so the next message is the disconnect
+        while (await request.receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(disconnected())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+    if task.cancelled() or not task.done():
+        await asyncio.gather(task, return_exceptions=True)
+        CLIENT_DISCONNECTS.inc()
+        logger.warning(f"   🔌 Client disconnected from {request.url.path} — request cancelled")
+        return JSONResponse(status_code=499, content={"detail": "client_disconnected"})
+    return task.result()
 
-            # Parse into our Pydantic model for validation
-            signal = SignalResponse.model_validate_json(raw_json)
 
-            # --- FIX Issue 3: Override timestamp with actual server time ---
-            signal.timestamp_utc = datetime.now(timezone.utc).isoformat()
-
-            # --- Log R:R for info (no auto-correction, use AI's original TP) ---
-            if not signal.veto and signal.order.type.value != "none":
-                entry = signal.order.entry
-                sl = signal.order.sl
-                tp = signal.order.tp
-                sl_dist = abs(entry - sl)
-                tp_dist = abs(tp - entry)
-                rr = tp_dist / sl_dist if sl_dist > 0 else 0
-                logger.info(f"   📐 R:R ratio: {rr:.2f} (using AI's original TP)")
-
-            # Log the result
-            if signal.veto:
-                logger.warning(f"   🚫 VETO: {signal.veto_reason}")
+# ---------------------------------------------------------------------------
+# Signal cache — key on market state so followers reuse the leader's answer
+# ---------------------------------------------------------------------------
+
+if shared_db is not None:
+    signal_cache = SharedSignalCache(
+        shared_db, dumps=lambda signal: signal.model_dump_json(), loads=SignalResponse.model_validate_json,
+    )
+else:
+    signal_cache = SignalCache(max_entries=SIGNAL_CACHE_SIZE)
+
+
+def signal_cache_key(req: SignalRequest, series: dict[str, CandleSeries]) -> tuple:
+    """Requests with the same symbol, timeframe, latest candle per TF, spread
+    bucket and constraints would send the model an equivalent prompt."""
+    last_candles = tuple(sorted((tf, s.last_time()) for tf, s in series.items() if len(s)))
+    return (
+        req.symbol.upper(),
+        req.timeframe,
+        last_candles,
+        req.spread_points // SIGNAL_CACHE_SPREAD_BUCKET,
+        tuple(req.constraints.model_dump().values()),
+    )
+
+
+def signal_cache_ttl(signal: SignalResponse) -> float:
+    """Keep a signal until its pending order would expire; never cache
+    transport failures."""
+    if signal.veto_reason == "model_unavailable" or is_deadline_veto(signal):
+        return 0.0
+    minutes = signal.order.expiry_minutes
+    return min(minutes * 60.0, SIGNAL_CACHE_MAX_TTL_SECONDS) if minutes > 0 else SIGNAL_CACHE_VETO_TTL_SECONDS
+
+
+async def cached_signal(
+    key: tuple,
+    account_id: str,
+    compute: Callable[[], Awaitable[SignalResponse]],
+    deadline: Optional[float],
+) -> tuple[SignalResponse, str, float]:
+    """signal_cache.get_or_compute for one request.  A request that joined
+    another one's computation computes again on its own terms when that one
+    failed for reasons of its own: the other caller's deadline ran out (in
+    the queue or at OpenAI), or its account was rate limited."""
+    # The wait outlasts our deadline by the reply margin, so a computation
+    # of our own ends with its deadline veto rather than a cancellation
+    grace = lambda: time_left(deadline) + DEADLINE_SAFETY_MS / 1000 if deadline is not None else None
+    ours = False
+
+    async def owned() -> SignalResponse:
+        nonlocal ours
+        ours = True
+        return await compute()
+
+    try:
+        signal, status, age = await signal_cache.get_or_compute(key, owned, ttl_for=signal_cache_ttl, timeout=grace())
+        if not (status == "coalesced" and is_deadline_veto(signal) and not deadline_passed(deadline)):
+            return signal, status, age
+        logger.info(f"   ♻️  Joined request ran out of its own time — computing under ours")
+    except RateLimited as e:
+        if e.account == account_id:
+            raise
+        logger.info(f"   ♻️  Joined request was rate limited (account {e.account}) — computing for ours")
+    except Overloaded as e:
+        if ours or e.reason != "deadline" or deadline_passed(deadline):
+            raise
+        logger.info(f"   ♻️  Joined request was shed on its own budget — queueing under ours")
+    return await signal_cache.get_or_compute(key, compute, ttl_for=signal_cache_ttl, timeout=grace())
+
+
+def aged_signal(signal: SignalResponse, age_seconds: float) -> SignalResponse:
+    """Copy of a stored signal with expiry_minutes shrunk by its age, so the
+    EA's pending order dies with the original.  timestamp_utc is the time of
+    this reply (see FIX Issue 3); cache_age_seconds reports the age."""
+    signal = signal.model_copy(deep=True)
+    signal.timestamp_utc = datetime.now(timezone.utc).isoformat()
+    if signal.order.expiry_minutes > 0:
+        signal.order.expiry_minutes = max(1, signal.order.expiry_minutes - int(age_seconds // 60))
+    return signal
+
+
+# ---------------------------------------------------------------------------
+# Pre-filter gate pipeline
+# ---------------------------------------------------------------------------
+
+prefilter = GatePipeline(PREFILTER_GATES, GateConfig(
+    atr_min_ratio=GATE_ATR_MIN_RATIO,
+    chop_max=GATE_CHOP_MAX,
+    min_range_atr=GATE_MIN_RANGE_ATR,
+    stale_periods=GATE_STALE_PERIODS,
+    broker_utc_offset=float(GATE_BROKER_UTC_OFFSET_HOURS) * 3600 if GATE_BROKER_UTC_OFFSET_HOURS else None,
+    session_block=parse_session_block(GATE_SESSION_BLOCK),
+)) if PREFILTER_GATES else None
+
+
+# ---------------------------------------------------------------------------
+# Candle-close pre-computation — warm results before the EAs ask
+# ---------------------------------------------------------------------------
+
+def precompute_key(req: SignalRequest) -> tuple:
+    return (req.symbol.upper(), req.timeframe.upper(), tuple(req.constraints.model_dump().values()))
+
+
+def quote_mismatch(signal: SignalResponse, req: SignalRequest) -> Optional[str]:
+    """Why a signal built from an earlier snapshot no longer fits the
+    request's live bid/ask (entry on the wrong side of price, SL/TP on the
+    wrong side of entry), else None."""
+    if signal.veto or signal.order.type == OrderTypeEnum.none:
+        return None
+    order = signal.order
+    verdict = early_exit(
+        {"type": order.type.value, "entry": order.entry, "sl": order.sl, "tp": order.tp}, req.bid, req.ask,
+    )
+    return verdict[1] if verdict is not None else None
+
+
+async def precompute_signal(req: SignalRequest) -> Optional[SignalResponse]:
+    """Run the model pipeline on the last snapshot seen for this key.
+    Transport failures are not kept, so EAs fall back to a live call."""
+    series = candle_series(req)
+    indicators, atr_value = signal_indicators(req, series)
+    if prefilter_veto(req, series, indicators) is not None:
+        return None
+    logger.info(f"   🔥 Pre-computing {req.symbol} {req.timeframe}")
+    signal = await admitted_request_signal(req, atr_value, series, indicators)
+    return None if signal.veto_reason == "model_unavailable" else signal
+
+
+precompute_scheduler = PrecomputeScheduler(
+    precompute_signal,
+    concurrency=PRECOMPUTE_CONCURRENCY,
+    stagger_seconds=PRECOMPUTE_STAGGER_SECONDS,
+    delay_seconds=PRECOMPUTE_DELAY_SECONDS,
+) if PRECOMPUTE_ENABLED else None
+
+
+# ---------------------------------------------------------------------------
+# Async job mode — POST /signal?async=1, then poll GET /signal/{job_id}
+# ---------------------------------------------------------------------------
+
+signal_jobs = JobStore(max_jobs=SIGNAL_JOBS_MAX)
+# Multi-worker: results are also published so any worker can answer the poll
+shared_jobs = SharedJobTable(shared_db) if shared_db is not None else None
+
+
+def signal_job_ttl(result) -> float:
+    """Keep a finished job while its signal is still valid (at least
+    SIGNAL_JOB_MIN_TTL_SECONDS, so the EA can always collect failures)."""
+    signal = result[0] if result else None
+    if isinstance(signal, SignalResponse) and signal.order.expiry_minutes > 0:
+        return max(SIGNAL_JOB_MIN_TTL_SECONDS, signal.order.expiry_minutes * 60.0)
+    return SIGNAL_JOB_MIN_TTL_SECONDS
+
+
+async def submit_signal_job(req: SignalRequest, parse_ms: float) -> JSONResponse:
+    job_response = Response()
+
+    async def work():
+        try:
+            result = await process_signal(req, job_response, parse_ms)
+        except Exception as e:
+            logger.error(f"   ❌ Signal job for {req.symbol} failed: {e}", exc_info=True)
+            if shared_jobs is not None:
+                await shared_jobs.finish(job.id, 500, json.dumps({"detail": "job_failed"}), None, SIGNAL_JOB_MIN_TTL_SECONDS)
+            raise
+        candle_ack = job_response.headers.get("X-Candle-Ack")
+        if shared_jobs is not None:
+            if isinstance(result, JSONResponse):
+                status, body = result.status_code, result.body.decode()
             else:
-                logger.info(f"   ✅ Signal: {signal.bias.value.upper()} (confidence: {signal.confidence:.0%})")
-                logger.info(f"   📋 Order: {signal.order.type.value}")
-                logger.info(f"      Entry: {signal.order.entry}  SL: {signal.order.sl}  TP: {signal.order.tp}")
-                logger.info(f"      Comment: {signal.order.comment}")
-            logger.info("─" * 60)
+                status, body = 200, result.model_dump_json()
+            await shared_jobs.finish(job.id, status, body, candle_ack, signal_job_ttl((result, candle_ack)))
+        return result, candle_ack
 
-            return signal
+    try:
+        job = signal_jobs.submit(work, ttl_for=signal_job_ttl)
+    except JobTableFull:
+        logger.warning(f"   ⚠️  Job table full ({SIGNAL_JOBS_MAX} running) — rejecting async request for {req.symbol}")
+        return JSONResponse(status_code=503, content={"detail": "job_table_full"}, headers={"Retry-After": "5"})
+    if shared_jobs is not None:
+        await shared_jobs.put_pending(job.id, job.created_at)
+    logger.info(f"🧾 Job {job.id} accepted for {req.symbol} {req.timeframe}")
+    return JSONResponse(status_code=202, content={"job_id": job.id, "status": "pending", "poll": f"/signal/{job.id}"})
 
-        except (openai.APITimeoutError, asyncio.TimeoutError) as e:
-            last_error = e
-            logger.error(f"   ⏰ {model} timed out after 90s: {e}")
-            if not is_fallback and len(models_to_try) > 1:
-                logger.info(f"   ↪ Will try fallback model...")
-            continue
 
+# ---------------------------------------------------------------------------
+# Signal history — SQLite store written in batches off the request path
+# ---------------------------------------------------------------------------
+
+history_store = HistoryStore(
+    HISTORY_FILE,
+    batch_size=HISTORY_BATCH_SIZE,
+    flush_seconds=HISTORY_FLUSH_SECONDS,
+    max_pending=HISTORY_MAX_PENDING,
+) if HISTORY_ENABLED else None
+
+
+def history_row(req: SignalRequest, signal: SignalResponse, source: str, latency_ms: float) -> dict:
+    # Tokens are only spent by the request that actually called the model
+    prompt, completion, cached = (signal._usage or (None, None, None)) if source == "openai" else (0, 0, 0)
+    return {
+        "ts": time.time(),
+        "account_id": req.account_id,
+        "symbol": req.symbol.upper(),
+        "timeframe": req.timeframe.upper(),
+        "bid": req.bid,
+        "ask": req.ask,
+        "spread_points": req.spread_points,
+        "source": source,
+        "model": signal._model,
+        "bias": signal.bias.value,
+        "order_type": signal.order.type.value,
+        "entry": signal.order.entry,
+        "sl": signal.order.sl,
+        "tp": signal.order.tp,
+        "expiry_minutes": signal.order.expiry_minutes,
+        "confidence": signal.confidence,
+        "veto": int(signal.veto),
+        "veto_reason": signal.veto_reason,
+        "latency_ms": round(latency_ms, 1),
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "cached_tokens": cached,
+    }
+
+
+def parse_time_param(value: Optional[str], name: str) -> Optional[float]:
+    """Epoch seconds or ISO 8601 (naive = UTC) → epoch seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        raise RequestValidationError([{"type": "datetime_parsing", "loc": ("query", name), "msg": "expected epoch seconds or ISO 8601", "input": value}])
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+# ---------------------------------------------------------------------------
+# Endpoints
+# ---------------------------------------------------------------------------
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus scrape endpoint (latency histograms, tokens, veto/fallback counters)."""
+    for model, status in model_breakers.status().items():
+        BREAKER_STATE.set(BREAKER_STATE_CODES[status["state"]], model=model)
+    LLM_INFLIGHT.set(llm_admission.inflight)
+    LLM_QUEUE_DEPTH.set(llm_admission.waiting)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+async def health():
+    logger.info("Health check requested")
+    return {
+        "status": "ok",
+        "openai_pool": openai_pool.status(),
+        "circuit_breakers": model_breakers.status(),
+        "signal_cache": signal_cache.stats(),
+        "candle_store": candle_store.stats(),
+        "signal_jobs": signal_jobs.stats(),
+        "prefilter": prefilter.stats() if prefilter else {"enabled": False},
+        "admission": llm_admission.stats(),
+        "rate_limit": account_limiter.stats() if account_limiter else {"enabled": False},
+        "precompute": precompute_scheduler.stats() if precompute_scheduler else {"enabled": False},
+        "history": history_store.stats() if history_store else {"enabled": False},
+        "websocket": ws_sessions.stats(),
+        "event_loop": loop_monitor.stats() if loop_monitor else {"enabled": False},
+        "logging": logging_stats(),
+    }
+
+
+# ---------------------------------------------------------------------------
+# Admin — on-demand sampling profiler (ADMIN_TOKEN required)
+# ---------------------------------------------------------------------------
+
+def admin_denied(request: Request) -> Optional[JSONResponse]:
+    """None if the request carries the admin token (X-Admin-Token or
+    Authorization: Bearer), else the error response to return."""
+    if not ADMIN_TOKEN:
+        return JSONResponse(status_code=404, content={"detail": "admin_disabled"})
+    token = request.headers.get("x-admin-token", "")
+    auth = request.headers.get("authorization", "")
+    if not token and auth.lower().startswith("bearer "):
+        token = auth[7:].strip()
+    if not secrets.compare_digest(token.encode(), ADMIN_TOKEN.encode()):
+        logger.warning(f"🔒 Admin request with a bad token from {request.client.host if request.client else 'unknown'}")
+        return JSONResponse(status_code=401, content={"detail": "unauthorized"})
+    return None
+
+
+@app.post("/admin/profile/start")
+async def admin_profile_start(request: Request, seconds: float = 30.0, interval_ms: float = 5.0):
+    """Sample the event-loop thread for ``seconds`` (at most
+    PROFILE_MAX_SECONDS), one stack every ``interval_ms``."""
+    if (denied := admin_denied(request)) is not None:
+        return denied
+    seconds = min(max(seconds, 1.0), PROFILE_MAX_SECONDS)
+    try:
+        profiler.start(seconds, max(interval_ms, 1.0) / 1000)
+    except RuntimeError:
+        return JSONResponse(status_code=409, content={"detail": "profiler_running", **profiler.status()})
+    logger.info(f"🔬 Profiler started for {seconds:.0f}s ({interval_ms:.0f}ms samples)")
+    return profiler.status()
+
+
+@app.post("/admin/profile/stop")
+async def admin_profile_stop(request: Request):
+    if (denied := admin_denied(request)) is not None:
+        return denied
+    await asyncio.to_thread(profiler.stop)
+    logger.info(f"🔬 Profiler stopped: {profiler.status()['samples']} samples")
+    return profiler.status()
+
+
+@app.get("/admin/profile")
+async def admin_profile(request: Request, download: bool = False):
+    """Profiler status, or with ``?download=1`` the last profile as folded
+    stacks (for flamegraph.pl, speedscope.app or inferno)."""
+    if (denied := admin_denied(request)) is not None:
+        return denied
+    if not download:
+        return profiler.status()
+    if profiler.started_at is None:
+        return JSONResponse(status_code=404, content={"detail": "no_profile"})
+    stamp = datetime.fromtimestamp(profiler.started_at, timezone.utc).strftime("%Y%m%d-%H%M%S")
+    return PlainTextResponse(profiler.folded(), headers={
+        "Content-Disposition": f'attachment; filename="goldmind-profile-{stamp}.folded"',
+    })
+
+
+@app.get("/history")
+async def history(
+    symbol: Optional[str] = None,
+    account_id: Optional[str] = None,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = Query(1000, ge=1),
+):
+    """Signal history as NDJSON, newest first.  ``since``/``until`` take epoch
+    seconds or ISO 8601; rows are streamed from SQLite in chunks.  Signals
+    from the last HISTORY_FLUSH_SECONDS may not be written yet."""
+    if history_store is None:
+        return JSONResponse(status_code=404, content={"detail": "history_disabled"})
+    rows = history_store.query(
+        symbol=symbol.upper() if symbol else None,
+        account_id=account_id,
+        since=parse_time_param(since, "since"),
+        until=parse_time_param(until, "until"),
+        limit=min(limit, HISTORY_QUERY_MAX_ROWS),
+    )
+
+    async def ndjson():
+        async for row in rows:
+            row["timestamp_utc"] = datetime.fromtimestamp(row["ts"], timezone.utc).isoformat()
+            row["veto"] = bool(row["veto"])
+            yield json.dumps(row) + "\n"
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+
+def capture_body(body: bytes):
+    """Append a /signal body to CAPTURE_FILE (one JSON object per line)."""
+    if capture_logger is None or random.random() >= CAPTURE_SAMPLE_RATE:
+        return
+    if b"\n" in body:
+        try:
+            body = json.dumps(json_loads(body)).encode()
+        except ValueError:
+            return
+    capture_logger.info(body.decode("utf-8", "replace"))
+
+
+# /signal reads the raw body itself (see parse_signal_body), so document both
+# accepted payload shapes explicitly.
+_SIGNAL_BODY_REFS, _SIGNAL_BODY_SCHEMAS = models_json_schema(
+    [(SignalRequest, "validation"), (ColumnarSignalRequest, "validation")],
+    ref_template="#/components/schemas/{model}",
+)
+
+
+def custom_openapi():
+    if app.openapi_schema is None:
+        schema = get_openapi(title=app.title, version=app.version, routes=app.routes)
+        schema.setdefault("components", {}).setdefault("schemas", {}).update(_SIGNAL_BODY_SCHEMAS["$defs"])
+        app.openapi_schema = schema
+    return app.openapi_schema
+
+
+app.openapi = custom_openapi
+
+
+@app.post(
+    "/signal",
+    response_model=SignalResponse,
+    openapi_extra={"requestBody": {"required": True, "content": {"application/json": {"schema": {
+        "anyOf": [ref for ref in _SIGNAL_BODY_REFS.values()],
+    }}}}},
+)
+async def generate_signal(
+    request: Request,
+    response: Response,
+    run_async: bool = Query(False, alias="async"),
+    stream: bool = False,
+):
+    body = await request.body()
+    capture_body(body)
+    parse_start = time.perf_counter()
+    req = parse_signal_body(body)
+    parse_seconds = time.perf_counter() - parse_start
+    STAGE_SECONDS.observe(parse_seconds, stage="parse")
+    if run_async:
+        return await submit_signal_job(req, parse_seconds * 1000)
+    if stream:
+        return signal_event_stream(req, parse_seconds * 1000, client_budget(request))
+    return await until_disconnect(request, process_signal(
+        req, response, parse_seconds * 1000, client_budget(request), queue_seconds=CLIENT_BUDGET_SECONDS,
+    ))
+
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+
+
+def signal_event_stream(req: SignalRequest, parse_ms: float, budget_seconds: Optional[float]) -> StreamingResponse:
+    """POST /signal?stream=1 — relay the answer as server-sent events: one
+    ``progress`` event per answer field as the model streams it
+    (LLM_STREAMING), then ``candle_ack`` if any and a final ``signal`` (or
+    ``error``) event.  Disconnecting cancels the request."""
+    events: asyncio.Queue = asyncio.Queue()
+    item_response = Response()
+    task = asyncio.ensure_future(process_signal(
+        req, item_response, parse_ms, budget_seconds, events.put_nowait, queue_seconds=CLIENT_BUDGET_SECONDS,
+    ))
+    task.add_done_callback(lambda _: events.put_nowait(None))
+
+    async def relay():
+        try:
+            while (event := await events.get()) is not None:
+                yield sse_event("progress", event)
+            error = None if task.cancelled() else task.exception()
+            if task.cancelled() or error is not None:
+                logger.error(f"   ❌ Streamed signal for {req.symbol} failed: {error}", exc_info=error)
+                yield sse_event("error", {"status": 500, "detail": "internal_error"})
+                return
+            result = task.result()
+            if isinstance(result, JSONResponse):
+                yield sse_event("error", {"status": result.status_code, **json_loads(result.body)})
+                return
+            if "X-Candle-Ack" in item_response.headers:
+                yield sse_event("candle_ack", item_response.headers["X-Candle-Ack"])
+            yield sse_event("signal", result.model_dump_json())
+        finally:
+            task.cancel()
+    return StreamingResponse(relay(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+
+@app.get("/signal/{job_id}", response_model=SignalResponse)
+async def get_signal_job(job_id: str, response: Response, wait: float = 0.0):
+    """Result of an async job: 200 + signal when done, 202 while running
+    (``?wait=N`` long-polls up to SIGNAL_JOB_MAX_WAIT_SECONDS), 404 once it
+    expired or was never submitted."""
+    job = signal_jobs.get(job_id)
+    if job is None and shared_jobs is not None:
+        return await get_shared_signal_job(job_id, response, wait)
+    if job is None:
+        return JSONResponse(status_code=404, content={"detail": "job_not_found"})
+    if not job.done and wait > 0:
+        await asyncio.wait({job.task}, timeout=min(wait, SIGNAL_JOB_MAX_WAIT_SECONDS))
+    if not job.done:
+        age = time.time() - job.created_at
+        return JSONResponse(status_code=202, content={"job_id": job.id, "status": "pending", "age_seconds": round(age, 1)})
+    if job.task.cancelled() or job.task.exception() is not None:
+        return JSONResponse(status_code=500, content={"detail": "job_failed"})
+
+    result, candle_ack = job.task.result()
+    if isinstance(result, JSONResponse):
+        return JSONResponse(status_code=result.status_code, content=json_loads(result.body))
+    if candle_ack:
+        response.headers["X-Candle-Ack"] = candle_ack
+    return aged_signal(result, time.time() - job.finished_at)
+
+
+async def get_shared_signal_job(job_id: str, response: Response, wait: float):
+    """GET /signal/{job_id} for a job submitted to another worker: read its
+    published state, polling while it runs for up to ``wait`` seconds."""
+    deadline = time.monotonic() + min(wait, SIGNAL_JOB_MAX_WAIT_SECONDS)
+    while True:
+        row = await shared_jobs.get(job_id)
+        if row is None:
+            return JSONResponse(status_code=404, content={"detail": "job_not_found"})
+        if row["status"] is not None or time.monotonic() >= deadline:
+            break
+        await asyncio.sleep(0.25)
+    if row["status"] is None:
+        age = time.time() - row["created_at"]
+        return JSONResponse(status_code=202, content={"job_id": job_id, "status": "pending", "age_seconds": round(age, 1)})
+    if row["status"] != 200:
+        return JSONResponse(status_code=row["status"], content=json_loads(row["body"]))
+    if row["candle_ack"]:
+        response.headers["X-Candle-Ack"] = row["candle_ack"]
+    return aged_signal(SignalResponse.model_validate_json(row["body"]), time.time() - row["finished_at"])
+
+
+@app.post("/signals")
+async def generate_signals(request: Request, stream: bool = False):
+    """Batch version of /signal for multi-symbol EAs.
+
+    Body: ``{"requests": [<signal body>, ...]}`` (row or columnar items).
+    Items run concurrently, at most SIGNAL_BATCH_CONCURRENCY at a time.  Each
+    result is ``{"index", "symbol", "status", "signal" | "error"}`` — an item
+    that fails validation or processing does not fail the batch.  With
+    ``?stream=1`` results are sent as NDJSON lines in completion order,
+    otherwise as ``{"results": [...]}`` in request order."""
+    body = await request.body()
+    try:
+        payload = json_loads(body)
+    except ValueError as e:
+        raise RequestValidationError([{"type": "json_invalid", "loc": ("body",), "msg": str(e), "input": None}])
+    items = payload.get("requests") if isinstance(payload, dict) else None
+    if isinstance(items, list):
+        for item in items:
+            capture_body(json.dumps(item).encode())
+    if not isinstance(items, list) or not items:
+        raise RequestValidationError([{"type": "list_type", "loc": ("body", "requests"), "msg": "must be a non-empty list of signal requests", "input": None}])
+    if len(items) > SIGNAL_BATCH_MAX_ITEMS:
+        raise RequestValidationError([{"type": "too_long", "loc": ("body", "requests"), "msg": f"at most {SIGNAL_BATCH_MAX_ITEMS} requests per batch", "input": None}])
+
+    logger.info(f"📦 Batch of {len(items)} signal requests (concurrency {SIGNAL_BATCH_CONCURRENCY})")
+    # A batch costs each account one rate-limit token, however many symbols it holds
+    allowed: dict[str, bool] = {}
+    if account_limiter is not None:
+        for account in {item.get("account_id") for item in items if isinstance(item, dict)}:
+            if isinstance(account, str) and account:
+                allowed[account] = await account_limiter.acquire(account)
+    semaphore = asyncio.Semaphore(SIGNAL_BATCH_CONCURRENCY)
+    budget = client_budget(request)
+    deadline = time.monotonic() + budget if budget is not None else None
+    queue_deadline = time.monotonic() + CLIENT_BUDGET_SECONDS
+    tasks = [
+        asyncio.ensure_future(run_batch_item(i, item, semaphore, deadline, queue_deadline, allowed))
+        for i, item in enumerate(items)
+    ]
+
+    if stream:
+        async def ndjson():
+            try:
+                for done in asyncio.as_completed(tasks):
+                    yield json.dumps(await done) + "\n"
+            finally:
+                for task in tasks:
+                    task.cancel()
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    results = await until_disconnect(request, asyncio.gather(*tasks))
+    return results if isinstance(results, JSONResponse) else {"results": results}
+
+
+async def run_batch_item(
+    index: int, item, semaphore: asyncio.Semaphore, deadline: Optional[float], queue_deadline: float,
+    allowed: dict[str, bool],
+) -> dict:
+    """Validate and process one batch item; never raises.  ``deadline`` is
+    the client's (None without X-Timeout-Ms) and ``queue_deadline`` limits the
+    wait for an LLM slot; ``allowed`` holds the batch's rate-limit verdict
+    per account."""
+    symbol = item.get("symbol") if isinstance(item, dict) else None
+    result = {"index": index, "symbol": symbol}
+    try:
+        with stage("parse"):
+            req = parse_signal_payload(item, ("body", "requests", index))
+    except RequestValidationError as e:
+        return {**result, "status": 422, "error": jsonable_encoder(e.errors())}
+
+    item_response = Response()
+    async with semaphore:
+        try:
+            signal = await process_signal(
+                req, item_response, budget_seconds=time_left(deadline),
+                account_allowed=allowed.get(req.account_id), queue_seconds=time_left(queue_deadline),
+            )
         except Exception as e:
-            last_error = e
-            logger.error(f"   ❌ {model} failed: {e}")
-            if not is_fallback and len(models_to_try) > 1:
-                logger.info(f"   ↪ Will try fallback model...")
-            continue
+            logger.error(f"   ❌ Batch item {index} ({req.symbol}) failed: {e}", exc_info=True)
+            return {**result, "status": 500, "error": str(e)}
+
+    if isinstance(signal, JSONResponse):
+        return {**result, "status": signal.status_code, "error": json_loads(signal.body)}
+    result.update(status=200, signal=signal.model_dump(mode="json"))
+    if "X-Candle-Ack" in item_response.headers:
+        result["candle_ack"] = item_response.headers["X-Candle-Ack"]
+    return result
+
+
+# ---------------------------------------------------------------------------
+# WebSocket channel — one long-lived connection per EA, answers pushed back
+# ---------------------------------------------------------------------------
 
-    # All models failed
-    logger.error(f"   ❌ All models failed. Last error: {last_error}")
-    traceback.print_exc()
+# Abandoned sessions are swept well within their resume window
+ws_sessions = SessionRegistry(
+    WS_MAX_CONNECTIONS_PER_ACCOUNT, WS_RESUME_SECONDS, WS_MAX_OUTBOX, sweep_seconds=min(60.0, WS_RESUME_SECONDS / 5),
+)
+
+
+@app.websocket("/ws")
+async def signal_socket(websocket: WebSocket, account_id: str = "", resume: str = "", last_seq: int = 0):
+    """Persistent channel for EAs.  Client messages (JSON text frames):
+
+      {"type": "signal", "id": "..", "request": {<signal body>}}   ask for a signal
+      {"type": "candles", "id": "..", "request": {<signal body>}}  update candles only
+      {"type": "ack", "seq": N}                                    everything up to N received
+      {"type": "ping"} / {"type": "pong"}                          heartbeats
+
+    The server answers with ``hello`` (session id), then pushes ``progress``,
+    ``signal`` and ``candle_ack`` messages, each with a ``seq``.  Reconnect
+    with ``?resume=<session>&last_seq=<n>`` to get everything after ``n``."""
+    await websocket.accept()
+    if not account_id:
+        await websocket.send_json({"type": "error", "detail": "account_id_required"})
+        return await websocket.close(code=1008)
+    try:
+        session, resumed = ws_sessions.attach(account_id, resume or None, last_seq)
+    except ConnectionLimit:
+        logger.warning(f"🔌 WebSocket refused for {account_id}: {WS_MAX_CONNECTIONS_PER_ACCOUNT} connections already open")
+        await websocket.send_json({"type": "error", "detail": "too_many_connections", "limit": WS_MAX_CONNECTIONS_PER_ACCOUNT})
+        return await websocket.close(code=4429)
+
+    generation = session.generation
+    WS_CONNECTIONS.set(ws_sessions.live())
+    logger.info(f"🔌 WebSocket {'resumed' if resumed else 'opened'} for {account_id} (session {session.id}"
+                f"{f', replaying after seq {last_seq}' if resumed else ''})")
+    send_lock = asyncio.Lock()
+
+    async def send(message: dict):
+        async with send_lock:
+            await websocket.send_text(json.dumps(message))
+
+    await send({"type": "hello", "session": session.id, "resumed": resumed,
+                "heartbeat_seconds": WS_HEARTBEAT_SECONDS, "last_seq": session.next_seq - 1})
+    sender = asyncio.ensure_future(ws_sender(session, generation, send))
+    try:
+        while session.generation == generation:
+            try:
+                text = await asyncio.wait_for(websocket.receive_text(), WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"🔌 WebSocket {session.id} idle for {WS_IDLE_TIMEOUT_SECONDS:.0f}s — closing")
+                await websocket.close(code=4408)
+                break
+            await ws_handle(session, text, send)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        ws_sessions.detach(session, generation)
+        WS_CONNECTIONS.set(ws_sessions.live())
+        logger.info(f"🔌 WebSocket closed for {account_id} (session {session.id}, {len(session.tasks)} signals still running)")
+
+
+async def ws_sender(session: WSSession, generation: int, send: Callable):
+    """Write queued messages to the connection; ping when it has been quiet
+    for WS_HEARTBEAT_SECONDS.  Stops once a newer connection took over."""
+    try:
+        while session.generation == generation:
+            for message in session.undelivered():
+                await send(message)
+            session.wakeup.clear()
+            try:
+                await asyncio.wait_for(session.wakeup.wait(), WS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                await send({"type": "ping", "ts": time.time()})
+    except (WebSocketDisconnect, RuntimeError):
+        pass  # Connection gone — the receive loop detaches the session
+
+
+async def ws_handle(session: WSSession, text: str, send: Callable):
+    try:
+        message = json_loads(text)
+    except ValueError:
+        return await send({"type": "error", "detail": "invalid_json"})
+    kind = message.get("type") if isinstance(message, dict) else None
+    if kind == "ping":
+        return await send({"type": "pong", "ts": time.time()})
+    if kind == "pong":
+        return
+    if kind == "ack":
+        seq = message.get("seq")
+        if isinstance(seq, int):
+            session.ack(seq)
+        return
+    if kind not in ("signal", "candles"):
+        return await send({"type": "error", "detail": f"unknown message type {kind!r}"})
+
+    ref = message.get("id")
+    payload = message.get("request")
+    if isinstance(payload, dict):
+        payload = {"account_id": session.account_id, **payload}
+        capture_body(json.dumps(payload).encode())
+    try:
+        with stage("parse"):
+            req = parse_signal_payload(payload, ("request",))
+    except RequestValidationError as e:
+        session.push({"type": kind, "id": ref, "status": 422, "error": jsonable_encoder(e.errors())})
+        return
+    if req.account_id != session.account_id:
+        session.push({"type": kind, "id": ref, "status": 403, "error": "account_id does not match the connection"})
+        return
+    if kind == "candles":
+        resync = merge_candle_deltas(req) if CANDLE_STORE_ENABLED else []
+        if resync:
+            session.push({"type": "candles", "id": ref, "status": 409, "error": {"detail": "candle_resync", "resync": resync}})
+        else:
+            session.push({"type": "candle_ack", "id": ref, "status": 200, "candle_ack": candle_ack_header(req)})
+        return
+    session.track(asyncio.ensure_future(ws_signal(session, ref, req)))
+
+
+async def ws_signal(session: WSSession, ref, req: SignalRequest):
+    """Run one signal request for a socket session and push its result
+    (kept in the outbox for a reconnect if the connection is down)."""
+    item_response = Response()
+    on_progress = lambda event: session.push({"type": "progress", "id": ref, **event})
+    try:
+        signal = await process_signal(req, item_response, on_progress=on_progress)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.error(f"   ❌ WebSocket signal for {req.symbol} failed: {e}", exc_info=True)
+        session.push({"type": "signal", "id": ref, "status": 500, "error": "internal_error"})
+        return
+    if isinstance(signal, JSONResponse):
+        session.push({"type": "signal", "id": ref, "status": signal.status_code, "error": json_loads(signal.body)})
+        return
+    result = {"type": "signal", "id": ref, "status": 200, "signal": signal.model_dump(mode="json")}
+    if "X-Candle-Ack" in item_response.headers:
+        result["candle_ack"] = item_response.headers["X-Candle-Ack"]
+    session.push(result)
+
+
+async def process_signal(
+    req: SignalRequest,
+    response: Optional[Response] = None,
+    parse_ms: float = 0.0,
+    budget_seconds: Optional[float] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    account_allowed: Optional[bool] = None,
+    queue_seconds: Optional[float] = None,
+):
+    """The /signal pipeline.  ``budget_seconds`` is how long the caller said
+    it will wait (X-Timeout-Ms); when set it is a hard deadline for model
+    choice, fallbacks and OpenAI calls.  Without it, ``queue_seconds`` caps
+    only the wait for an LLM slot (None = wait).
+    ``on_progress`` receives streamed answer fields (SSE relay).
+    ``account_allowed`` is the rate-limit verdict when the caller already
+    charged the account (a /signals batch pays once); None charges it here,
+    on a cache miss.  Every answered signal is queued for the history store."""
+    start = time.perf_counter()
+    result, source = await run_signal_pipeline(
+        req, response, parse_ms, budget_seconds, on_progress, account_allowed, queue_seconds,
+    )
+    if history_store is not None and isinstance(result, SignalResponse):
+        history_store.record(history_row(req, result, source, (time.perf_counter() - start) * 1000))
+    return result
+
+
+async def run_signal_pipeline(
+    req: SignalRequest,
+    response: Optional[Response],
+    parse_ms: float,
+    budget_seconds: Optional[float],
+    on_progress: Optional[Callable[[dict], None]] = None,
+    account_allowed: Optional[bool] = None,
+    queue_seconds: Optional[float] = None,
+) -> tuple:
+    """(signal or JSONResponse, source) — source is where the answer came from:
+    openai, cache, coalesced, precomputed, prefilter or server."""
+    deadline = time.monotonic() + budget_seconds if budget_seconds is not None else None
+    queue_deadline = time.monotonic() + queue_seconds if queue_seconds is not None else None
+
+    # Per-account rate limit — a batch already charged this account once
+    if account_allowed is False:
+        return rate_limited_veto(req), "server"
+
+    # 0. Rebuild the full candle view from the ring buffers (delta mode)
+    if CANDLE_STORE_ENABLED and (req.candle_delta or req.account_id):
+        with stage("candle_merge"):
+            resync = merge_candle_deltas(req)
+        if resync:
+            logger.warning(f"   🔁 Candle resync needed for {req.symbol}: {', '.join(resync)}")
+            return JSONResponse(status_code=409, content={"detail": "candle_resync", "resync": resync}), "server"
+        if response is not None and req.candles:
+            response.headers["X-Candle-Ack"] = candle_ack_header(req)
+
+    with stage("candle_arrays"):
+        series = candle_series(req)
+
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+    logger.info("")
     logger.info("─" * 60)
-    return veto_response(req.symbol, "model_unavailable")
+    logger.info(f"📥 [{now}] Signal request received")
+    if req.account_id:
+        logger.info(f"   Account: {req.account_id}")
+    logger.info(f"   Symbol: {req.symbol}  Timeframe: {req.timeframe}")
+    logger.info(f"   Bid: {req.bid}  Ask: {req.ask}  Spread: {req.spread_points}pts")
+    # Log per-timeframe candle counts
+    tf_summary = ", ".join(f"{tf}={len(s)}" for tf, s in series.items())
+    total_candles = sum(len(s) for s in series.values())
+    logger.info(f"   Candles: {total_candles} total across {len(series)} timeframes ({'columnar' if req._columnar else 'rows'}, parsed in {parse_ms:.1f}ms)")
+    logger.info(f"   Timeframes: {tf_summary}")
+    logger.info(f"   ATR: {req.atr}")
+    logger.info(f"   Model: {OPENAI_MODEL}")
+
+    # 1. Compute all indicators once from the candle arrays
+    with stage("indicators"):
+        indicators, atr_value = signal_indicators(req, series)
+    if precompute_scheduler is not None:
+        precompute_scheduler.remember(precompute_key(req), req.timeframe, req)
+
+    # 2. Quick spread veto (server-side too, belt-and-suspenders)
+    if req.spread_points > req.constraints.max_spread_points:
+        logger.warning(f"   🚫 VETO: Spread {req.spread_points} > max {req.constraints.max_spread_points}")
+        logger.info("─" * 60)
+        SIGNALS.inc(outcome="veto", source="server")
+        VETOES.inc(reason="spread")
+        return veto_response(req.symbol, f"spread {req.spread_points} > max {req.constraints.max_spread_points}"), "server"
+
+    # 3. Deterministic pre-filter gates — veto dead/closed markets without an LLM call
+    vetoed = prefilter_veto(req, series, indicators)
+    if vetoed is not None:
+        gate, reason = vetoed
+        logger.warning(f"   🚧 VETO (pre-filter {gate}): {reason} — no OpenAI call")
+        logger.info("─" * 60)
+        PREFILTER_VETOES.inc(gate=gate)
+        SIGNALS.inc(outcome="veto", source="prefilter")
+        VETOES.inc(reason="prefilter")
+        return veto_response(req.symbol, f"prefilter: {reason}"), "prefilter"
+
+    # 4. Ask the models — unless the candle-close scheduler already did, or an
+    #    identical concurrent/recent request shares its answer
+    source = "openai"
+    warm = None
+    if precompute_scheduler is not None:
+        warm = await precompute_scheduler.take(
+            precompute_key(req), timeout=time_left(deadline if deadline is not None else queue_deadline))
+    if warm is not None and (mismatch := quote_mismatch(warm[0], req)) is not None:
+        logger.info(f"   🔥 Pre-computed signal no longer fits the live quote ({mismatch}) — computing afresh")
+        warm = None
+    if warm is not None:
+        signal = aged_signal(*warm)
+        source = "precomputed"
+        logger.info(f"   🔥 Pre-computed at candle close ({warm[1]:.0f}s ago) — no OpenAI call")
+    else:
+        # Only a request that needs an OpenAI call pays a rate-limit token
+        charge = account_limiter is not None and bool(req.account_id) and account_allowed is None
+        compute = lambda: admitted_request_signal(
+            req, atr_value, series, indicators, deadline, on_progress, charge, queue_deadline,
+        )
+        try:
+            if SIGNAL_CACHE_ENABLED:
+                signal, status, age = await cached_signal(signal_cache_key(req, series), req.account_id, compute, deadline)
+                signal = aged_signal(signal, age)
+                if status == "hit":
+                    logger.info(f"   ♻️  Signal cache hit (age {age:.0f}s) — no OpenAI call")
+                elif status == "coalesced":
+                    logger.info(f"   ♻️  Joined identical in-flight request — no extra OpenAI call")
+                source = {"hit": "cache", "coalesced": "coalesced"}.get(status, source)
+            else:
+                signal = await compute()
+        except Overloaded as e:
+            logger.warning(f"   🚦 VETO: overloaded ({e.reason}, expected queue wait {e.expected_wait:.1f}s, "
+                           f"{llm_admission.inflight} in flight, {llm_admission.waiting} queued)")
+            logger.info("─" * 60)
+            LOAD_SHED.inc(reason=e.reason)
+            SIGNALS.inc(outcome="veto", source="server")
+            VETOES.inc(reason="overloaded")
+            return veto_response(req.symbol, "overloaded"), "server"
+        except RateLimited:
+            return rate_limited_veto(req), "server"
+        except asyncio.TimeoutError:
+            # Waited on an identical in-flight request until our own budget ran out
+            logger.warning(f"   ⏱️  Budget spent waiting for an identical in-flight request")
+            signal = veto_response(req.symbol, "deadline: budget spent waiting for an identical request")
+
+    # --- Log R:R for info (no auto-correction, use AI's original TP) ---
+    if not signal.veto and signal.order.type.value != "none":
+        entry = signal.order.entry
+        sl = signal.order.sl
+        tp = signal.order.tp
+        sl_dist = abs(entry - sl)
+        tp_dist = abs(tp - entry)
+        rr = tp_dist / sl_dist if sl_dist > 0 else 0
+        logger.info(f"   📐 R:R ratio: {rr:.2f} (using AI's original TP)")
+
+    # Log the result
+    SIGNALS.inc(outcome="veto" if signal.veto else "trade", source=source)
+    if signal.veto:
+        VETOES.inc(reason=veto_reason_class(signal.veto_reason))
+        logger.warning(f"   🚫 VETO: {signal.veto_reason}")
+    else:
+        logger.info(f"   ✅ Signal: {signal.bias.value.upper()} (confidence: {signal.confidence:.0%})")
+        logger.info(f"   📋 Order: {signal.order.type.value}")
+        logger.info(f"      Entry: {signal.order.entry}  SL: {signal.order.sl}  TP: {signal.order.tp}")
+        logger.info(f"      Comment: {signal.order.comment}")
+    logger.info("─" * 60)
+
+    return signal, source
 
 
 # ---------------------------------------------------------------------------
 # Run directly: python main.py
 # ---------------------------------------------------------------------------
 if __name__ == "__main__":
+    import argparse
+
     import uvicorn
 
+    parser = argparse.ArgumentParser(description="GoldMind AI signal backend")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="worker processes (default: WORKERS from .env, 1)")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # This process only supervises: it writes the log files for every
+        # worker and gives them a fresh shared-state database.
+        reset_shared_state(SHARED_STATE_FILE)
+        os.environ["GOLDMIND_WORKERS"] = str(args.workers)
+        os.environ["GOLDMIND_LOG_SOCKET"] = start_log_receiver()
+        logger.info(f"🧩 Starting {args.workers} worker processes (shared state: {SHARED_STATE_FILE})")
+
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
         reload=False,  # Disabled: reload subprocess breaks file logging
         log_level="info",
+        workers=args.workers,
     )
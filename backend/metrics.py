@@ -0,0 +1,216 @@
+"""
+Metrics
+=======
+Minimal in-process Prometheus metrics (counters, gauges, histograms) and
+the per-stage timers used by the /signal pipeline.  Rendered in the
+Prometheus text exposition format on /metrics — no extra dependency.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+# Latency buckets (seconds) from sub-millisecond parsing up to the 90s OpenAI deadline
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 90.0)
+
+
+def _label_str(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_str(self.label_names, key)} {_fmt(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # key -> [bucket counts..., sum, count]
+        self._series: dict[tuple, list[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            if idx < len(self.buckets):
+                series[idx] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = self.header()
+        for key, series in sorted(self._series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _label_str(self.label_names, key, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {_fmt(cumulative)}")
+            le = _label_str(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {_fmt(series[-1])}")
+            lines.append(f"{self.name}_sum{_label_str(self.label_names, key)} {series[-2]!r}")
+            lines.append(f"{self.name}_count{_label_str(self.label_names, key)} {_fmt(series[-1])}")
+        return lines
+
+
+REGISTRY: list[_Metric] = []
+
+
+def render_metrics() -> str:
+    lines: list[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# Backend metrics
+# ---------------------------------------------------------------------------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "goldmind_http_request_duration_seconds", "HTTP request latency by handler and status.",
+    ("method", "handler", "status"),
+)
+STAGE_SECONDS = Histogram(
+    "goldmind_stage_duration_seconds", "Time spent in each /signal pipeline stage.", ("stage",),
+)
+OPENAI_SECONDS = Histogram(
+    "goldmind_openai_request_duration_seconds", "OpenAI chat completion latency per model and outcome "
+    "(ok, early_exit, invalid, timeout, deadline, cancelled, error).",
+    ("model", "outcome"),
+)
+OPENAI_TOKENS = Counter(
+    "goldmind_openai_tokens_total", "Tokens used per model (prompt/completion/cached prompt tokens).", ("model", "kind"),
+)
+SIGNALS = Counter(
+    "goldmind_signals_total", "Signals returned, by outcome (trade/veto) and source.", ("outcome", "source"),
+)
+VETOES = Counter(
+    "goldmind_vetoes_total", "Vetoed signals by reason class.", ("reason",),
+)
+FALLBACKS = Counter(
+    "goldmind_fallbacks_total", "Fallback model invocations (sequential or hedged).", ("mode",),
+)
+BREAKER_STATE = Gauge(
+    "goldmind_circuit_breaker_state", "Circuit breaker state per model (0=closed, 1=half_open, 2=open).", ("model",),
+)
+PREFILTER_VETOES = Counter(
+    "goldmind_prefilter_vetoes_total", "Signals vetoed by a pre-filter gate (each one an OpenAI call avoided).", ("gate",),
+)
+LLM_INFLIGHT = Gauge(
+    "goldmind_llm_inflight", "OpenAI calls currently holding an admission slot.",
+)
+LLM_QUEUE_DEPTH = Gauge(
+    "goldmind_llm_queue_depth", "Requests waiting for an admission slot.",
+)
+EARLY_EXITS = Counter(
+    "goldmind_llm_early_exits_total", "Streamed completions stopped early, by model and kind (no_trade/geometry).",
+    ("model", "kind"),
+)
+LOAD_SHED = Counter(
+    "goldmind_load_shed_total", "Requests shed before an OpenAI call (queue_full, deadline, rate_limited).", ("reason",),
+)
+HTTP_BODY_BYTES = Counter(
+    "goldmind_http_body_bytes_total", "Compressed HTTP body bytes on the wire and decoded, by direction and coding.",
+    ("direction", "encoding", "form"),
+)
+HTTP_DECOMPRESS_SECONDS = Histogram(
+    "goldmind_http_decompress_seconds", "Time spent decompressing request bodies, by coding.", ("encoding",),
+)
+HTTP_DECOMPRESS_REJECTED = Counter(
+    "goldmind_http_decompress_rejected_total", "Compressed request bodies refused (too_large, invalid, unsupported).",
+    ("reason",),
+)
+WS_CONNECTIONS = Gauge(
+    "goldmind_ws_connections", "Open /ws connections.",
+)
+LOOP_LAG_SECONDS = Histogram(
+    "goldmind_event_loop_lag_seconds", "How late the event-loop monitor's timer fired.",
+)
+LOOP_BLOCKED = Counter(
+    "goldmind_event_loop_blocked_total", "Times the event loop was blocked past LOOP_BLOCKED_THRESHOLD_MS.",
+)
+CLIENT_DISCONNECTS = Counter(
+    "goldmind_client_disconnects_total", "Requests cancelled because the client disconnected before the answer.",
+)
+
+
+def veto_reason_class(reason: str) -> str:
+    """Collapse free-text veto reasons into a low-cardinality label."""
+    reason = reason.lower()
+    for prefix in ("spread", "model_unavailable", "overloaded", "rate_limited", "deadline", "prefilter"):
+        if reason.startswith(prefix):
+            return prefix
+    return "model"
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block into goldmind_stage_duration_seconds{stage=name}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
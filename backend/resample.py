@@ -0,0 +1,75 @@
+"""
+Resampling
+==========
+Builds higher-timeframe candles from one base series, so an EA can upload
+a single long M5 (or M1) series and let the backend derive M15, M30, H1,
+H4 and D1 instead of sending every timeframe separately.
+
+Bars are bucketed the way MT5 builds them: a bar opens at a multiple of the
+timeframe in broker server time (H4 and D1 from broker midnight), and takes
+the open of its first base bar, the highest high, the lowest low, the close
+of its last base bar and the summed tick volume.  The newest bucket stays
+partial, just like the still-forming bar MT5 returns.  The oldest bucket is
+dropped when the base series starts part-way through it, since its open,
+high and low would not match the broker's bar.
+
+MT5 candle times already are broker time, so no offset is needed for them.
+When times are true UTC, ``offset_seconds`` (broker UTC offset) shifts the
+bucket boundaries onto the broker's session.
+"""
+
+from typing import Optional
+
+import numpy as np
+
+from candle_encoding import epoch_seconds
+from indicators import TIMEFRAME_SECONDS, CandleSeries
+
+
+def resample_error(base_tf: str, target_tf: str) -> Optional[str]:
+    """Why ``target_tf`` cannot be built from ``base_tf``, or None if it can."""
+    if base_tf not in TIMEFRAME_SECONDS:
+        return f"unknown base timeframe {base_tf}"
+    if target_tf not in TIMEFRAME_SECONDS:
+        return f"unknown timeframe {target_tf}"
+    base, target = TIMEFRAME_SECONDS[base_tf], TIMEFRAME_SECONDS[target_tf]
+    if target <= base or target % base:
+        return f"{target_tf} is not a multiple of {base_tf}"
+    return None
+
+
+def _mt5_labels(times: np.ndarray) -> list[str]:
+    """Epoch seconds as MT5 labels (``2026.04.28 11:00``), matching row uploads."""
+    iso = np.datetime_as_string(times.astype("datetime64[s]"), unit="m")
+    return [label.replace("-", ".").replace("T", " ") for label in iso.tolist()]
+
+
+def resample(series: CandleSeries, target_tf: str, offset_seconds: int = 0) -> Optional[CandleSeries]:
+    """``series`` aggregated into ``target_tf`` bars.  None when the base
+    candle times cannot be parsed.  Times come back in the base series'
+    form: epoch seconds for columnar uploads, MT5 labels for row uploads."""
+    times = epoch_seconds(series)
+    if times is None:
+        return None
+    if len(times) == 0:
+        return CandleSeries(times.copy(), *(np.empty(0) for _ in range(5)))
+
+    period = TIMEFRAME_SECONDS[target_tf]
+    bucket = (times + offset_seconds) // period
+    # Index of the first base bar of every bucket (the series is oldest-first)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    bar_times = bucket[starts] * period - offset_seconds
+    if times[0] != bar_times[0]:
+        starts, bar_times = starts[1:], bar_times[1:]
+    if len(starts) == 0:
+        return CandleSeries(bar_times, *(np.empty(0) for _ in range(5)))
+
+    ends = np.r_[starts[1:], len(times)] - 1
+    return CandleSeries(
+        bar_times if isinstance(series.time, np.ndarray) else _mt5_labels(bar_times),
+        series.open[starts],
+        np.maximum.reduceat(series.high, starts),
+        np.minimum.reduceat(series.low, starts),
+        series.close[ends],
+        np.add.reduceat(series.volume, starts),
+    )
@@ -0,0 +1,156 @@
+"""
+Candle-Close Scheduler
+======================
+Optional background pre-computation of signals.  EAs ask for signals right
+after a candle closes, so demand spikes are predictable: the scheduler keeps
+the newest market snapshot (the last /signal request) per (symbol,
+timeframe, constraints) and, when that timeframe's candle closes, runs the
+signal pipeline on it before the EAs ask.  The result is kept for the new
+candle period and handed to the first EA requests for the same symbol,
+timeframe and constraints; the caller re-checks it against the request's
+live quote before using it.
+
+Only snapshots received during the candle that just closed are used, so a
+warm result never lags by more than one candle of data.  Starts are
+staggered and concurrent runs capped so a top-of-hour close across many
+symbols does not burst the OpenAI API.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from indicators import TIMEFRAME_SECONDS
+
+logger = logging.getLogger()
+
+
+def candle_open(ts: float, period: int) -> int:
+    """Open time of the candle containing ``ts`` (UTC-aligned)."""
+    return int(ts // period) * period
+
+
+class PrecomputeScheduler:
+    def __init__(
+        self,
+        compute: Callable[[Any], Awaitable[Optional[Any]]],
+        concurrency: int = 2,
+        stagger_seconds: float = 1.5,
+        delay_seconds: float = 2.0,
+    ):
+        self.compute = compute          # snapshot -> result (None = don't keep)
+        self.delay_seconds = delay_seconds
+        self.stagger_seconds = stagger_seconds
+        self._semaphore = asyncio.Semaphore(max(1, concurrency))
+        # key -> (period, received_at, snapshot)
+        self._snapshots: dict[Hashable, tuple[int, float, Any]] = {}
+        # key -> (candle_open, finished_at, result)
+        self._results: dict[Hashable, tuple[int, float, Any]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._inflight: dict[Hashable, tuple[int, asyncio.Task]] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.served = 0
+        self.failures = 0
+        self.timeouts = 0     # requests that could not wait for a running pre-compute
+
+    def remember(self, key: Hashable, timeframe: str, snapshot: Any):
+        period = TIMEFRAME_SECONDS.get(timeframe.upper())
+        if period is not None:
+            self._snapshots[key] = (period, time.time(), snapshot)
+
+    async def take(self, key: Hashable, timeout: Optional[float] = None) -> Optional[tuple[Any, float]]:
+        """(result, age_seconds) if a warm result exists for the current
+        candle of ``key``'s timeframe, else None.  Waits up to ``timeout``
+        seconds for a pre-compute of the current candle that is still
+        running (it keeps running for later requests)."""
+        snapshot = self._snapshots.get(key)
+        if snapshot is None:
+            return None
+        opened_now = candle_open(time.time(), snapshot[0])
+        inflight = self._inflight.get(key)
+        if inflight is not None and inflight[0] == opened_now:
+            done, _ = await asyncio.wait({inflight[1]}, timeout=timeout)
+            if not done:
+                self.timeouts += 1
+                return None
+        entry = self._results.get(key)
+        if entry is None:
+            return None
+        opened, finished_at, result = entry
+        now = time.time()
+        if candle_open(now, snapshot[0]) != opened:
+            del self._results[key]
+            return None
+        self.served += 1
+        return result, now - finished_at
+
+    def start(self):
+        if self._loop_task is None:
+            self._loop_task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        tasks = [t for t in (self._loop_task, *self._tasks) if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._loop_task = None
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            periods = {period for period, _, _ in self._snapshots.values()}
+            if not periods:
+                await asyncio.sleep(5)
+                continue
+            boundary = min(candle_open(now, p) + p for p in periods)
+            await asyncio.sleep(boundary - now + self.delay_seconds)
+            self._fire(boundary)
+
+    def _fire(self, boundary: int):
+        due = []
+        for key, (period, received_at, snapshot) in list(self._snapshots.items()):
+            if boundary % period:
+                continue
+            if received_at < boundary - period:
+                # Nothing seen during the candle that just closed — the EA is gone
+                del self._snapshots[key]
+                self._results.pop(key, None)
+                continue
+            due.append((key, snapshot))
+        if due:
+            logger.info(f"⏰ Candle close {time.strftime('%H:%M', time.gmtime(boundary))} UTC — pre-computing {len(due)} signal(s)")
+        for i, (key, snapshot) in enumerate(due):
+            task = asyncio.ensure_future(self._precompute(key, snapshot, boundary, i * self.stagger_seconds))
+            self._tasks.add(task)
+            self._inflight[key] = (boundary, task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _precompute(self, key: Hashable, snapshot: Any, boundary: int, start_delay: float):
+        try:
+            await asyncio.sleep(start_delay)
+            async with self._semaphore:
+                self.runs += 1
+                result = await self.compute(snapshot)
+            if result is not None:
+                self._results[key] = (boundary, time.time(), result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"   ❌ Pre-compute failed for {key}: {e}")
+        finally:
+            if self._inflight.get(key, (None,))[0] == boundary:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        return {
+            "snapshots": len(self._snapshots),
+            "warm_results": len(self._results),
+            "running": len(self._tasks),
+            "runs": self.runs,
+            "served": self.served,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+        }
@@ -0,0 +1,284 @@
+"""
+Shared State
+============
+Cross-process state for multi-worker mode (``python main.py --workers N``).
+Every uvicorn worker is a separate process with its own memory, so state
+that must be global goes through one local SQLite database (WAL mode)
+instead:
+
+  SharedSignalCache  — SignalCache whose entries, and the lease saying
+                       "a worker is already asking OpenAI for this", live in
+                       SQLite; in-process followers still share one task
+  SharedRateLimiter  — AccountRateLimiter with its token buckets in SQLite
+  SharedJobTable     — async-job status and results, so GET /signal/{job_id}
+                       works on whichever worker the poll lands on
+
+Each worker runs all of its statements on one dedicated thread, so the event
+loop never waits on an SQLite lock.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Hashable, Iterator, Optional
+
+from admission import AccountRateLimiter
+from signal_cache import SignalCache
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS leases (
+    key TEXT PRIMARY KEY, owner INTEGER NOT NULL, expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    account TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY, created_at REAL NOT NULL, finished_at REAL, expires_at REAL,
+    status INTEGER, body TEXT, candle_ack TEXT
+);
+"""
+
+
+def reset_shared_state(path: str):
+    """Delete the database (and its WAL files) — leases and pending jobs of
+    a previous run would otherwise outlive the workers that held them."""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+@contextmanager
+def immediate(conn: sqlite3.Connection) -> Iterator[None]:
+    """Write transaction that takes the database lock up front, so
+    read-modify-write sequences are atomic across processes."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+class SharedDB:
+    def __init__(self, path: str, busy_timeout: float = 10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-state")
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    async def run(self, fn: Callable[..., Any], *args) -> Any:
+        """Run ``fn(connection, *args)`` on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: fn(self._connection(), *args))
+
+    async def close(self):
+        def _close(_):
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+        await self.run(_close)
+        self._executor.shutdown(wait=False)
+
+
+def key_digest(key: Hashable) -> str:
+    # repr() of the cache-key tuples is stable across processes (hash() is salted)
+    return hashlib.sha1(repr(key).encode()).hexdigest()
+
+
+class SharedSignalCache(SignalCache):
+    def __init__(
+        self,
+        db: SharedDB,
+        dumps: Callable[[Any], str],
+        loads: Callable[[str], Any],
+        lease_seconds: float = 240.0,
+        poll_seconds: float = 0.25,
+    ):
+        super().__init__(max_entries=0)
+        self.db = db
+        self.dumps = dumps
+        self.loads = loads
+        self.lease_seconds = lease_seconds   # longer than any single computation
+        self.poll_seconds = poll_seconds
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_for: Callable[[Any], float],
+        timeout: Optional[float] = None,
+    ) -> tuple[Any, str, float]:
+        """Same contract as SignalCache.get_or_compute, across all workers.
+        While another worker holds the lease the database is polled only as
+        long as some local caller still waits: when the last one's
+        ``timeout`` runs out the poll is cancelled with it."""
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            value, _, age = await self._wait(key, task, timeout)
+            return value, "coalesced", age
+        task = asyncio.ensure_future(self._shared_compute(key, compute, ttl_for))
+        self._inflight[key] = task
+        return await self._wait(key, task, timeout)
+
+    async def _shared_compute(self, key, compute, ttl_for) -> tuple[Any, str, float]:
+        digest = key_digest(key)
+        try:
+            waited = False
+            while True:
+                state, value, age = await self.db.run(self._lookup_or_lease, digest, time.time())
+                if state == "hit":
+                    if waited:
+                        self.coalesced += 1
+                        return self.loads(value), "coalesced", age
+                    self.hits += 1
+                    return self.loads(value), "hit", age
+                if state == "leased":
+                    break
+                # Another worker holds the lease — wait for its answer
+                waited = True
+                await asyncio.sleep(self.poll_seconds)
+
+            self.misses += 1
+            stored = False
+            try:
+                value = await compute()
+                ttl = ttl_for(value)
+                await self.db.run(self._store, digest, self.dumps(value) if ttl > 0 else None, time.time(), ttl)
+                stored = True
+                return value, "miss", 0.0
+            finally:
+                if not stored:
+                    await self.db.run(self._release, digest)
+        finally:
+            self._forget(key, asyncio.current_task())
+
+    def _lookup_or_lease(self, conn: sqlite3.Connection, digest: str, now: float) -> tuple[str, Optional[str], float]:
+        with immediate(conn):
+            row = conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ? AND expires_at > ?", (digest, now)
+            ).fetchone()
+            if row is not None:
+                return "hit", row[0], now - row[1]
+            lease = conn.execute("SELECT expires_at FROM leases WHERE key = ?", (digest,)).fetchone()
+            if lease is not None and lease[0] > now:
+                return "busy", None, 0.0
+            conn.execute(
+                "INSERT OR REPLACE INTO leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (digest, os.getpid(), now + self.lease_seconds),
+            )
+            return "leased", None, 0.0
+
+    def _store(self, conn: sqlite3.Connection, digest: str, value: Optional[str], now: float, ttl: float):
+        with immediate(conn):
+            if value is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                    (digest, value, now, now + ttl),
+                )
+            conn.execute("DELETE FROM leases WHERE key = ?", (digest,))
+            conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+            conn.execute("DELETE FROM leases WHERE expires_at <= ?", (now,))
+
+    def _release(self, conn: sqlite3.Connection, digest: str):
+        conn.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (digest, os.getpid()))
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        for local_only in ("entries", "max_entries", "evictions"):
+            del stats[local_only]
+        return {"backend": "sqlite", **stats}
+
+
+class SharedRateLimiter(AccountRateLimiter):
+    def __init__(self, db: SharedDB, rate_per_minute: float, burst: int):
+        super().__init__(rate_per_minute, burst)
+        self.db = db
+        self._calls = 0
+
+    async def acquire(self, account: Hashable) -> bool:
+        self._calls += 1
+        allowed = await self.db.run(self._take, str(account), time.time(), self._calls % 1000 == 0)
+        if not allowed:
+            self.limited += 1
+        return allowed
+
+    def _take(self, conn: sqlite3.Connection, account: str, now: float, prune: bool) -> bool:
+        with immediate(conn):
+            row = conn.execute("SELECT tokens, updated_at FROM rate_buckets WHERE account = ?", (account,)).fetchone()
+            tokens, last = row if row is not None else (float(self.burst), now)
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            allowed = tokens >= 1.0
+            if allowed:
+                tokens -= 1.0
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_buckets (account, tokens, updated_at) VALUES (?, ?, ?)",
+                (account, tokens, now),
+            )
+            if prune and self.rate > 0:
+                # A bucket idle this long is full again — same as no row
+                conn.execute("DELETE FROM rate_buckets WHERE updated_at < ?", (now - self.burst / self.rate,))
+        return allowed
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        del stats["accounts"]
+        return {"backend": "sqlite", **stats}
+
+
+class SharedJobTable:
+    def __init__(self, db: SharedDB):
+        self.db = db
+
+    async def put_pending(self, job_id: str, created_at: float):
+        await self.db.run(self._put_pending, job_id, created_at)
+
+    async def finish(self, job_id: str, status: int, body: str, candle_ack: Optional[str], ttl_seconds: float):
+        await self.db.run(self._finish, job_id, status, body, candle_ack, time.time(), ttl_seconds)
+
+    async def get(self, job_id: str) -> Optional[dict]:
+        """{"created_at", "finished_at", "status", "body", "candle_ack"};
+        status is None while the job runs.  None if unknown or expired."""
+        return await self.db.run(self._get, job_id, time.time())
+
+    @staticmethod
+    def _put_pending(conn: sqlite3.Connection, job_id: str, created_at: float):
+        with immediate(conn):
+            conn.execute("DELETE FROM jobs WHERE expires_at <= ?", (created_at,))
+            conn.execute("INSERT OR REPLACE INTO jobs (id, created_at) VALUES (?, ?)", (job_id, created_at))
+
+    @staticmethod
+    def _finish(conn: sqlite3.Connection, job_id, status, body, candle_ack, now, ttl_seconds):
+        conn.execute(
+            "UPDATE jobs SET finished_at = ?, expires_at = ?, status = ?, body = ?, candle_ack = ? WHERE id = ?",
+            (now, now + ttl_seconds, status, body, candle_ack, job_id),
+        )
+
+    @staticmethod
+    def _get(conn: sqlite3.Connection, job_id: str, now: float) -> Optional[dict]:
+        row = conn.execute(
+            "SELECT created_at, finished_at, expires_at, status, body, candle_ack FROM jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+        if row is None or (row[2] is not None and row[2] <= now):
+            return None
+        return {"created_at": row[0], "finished_at": row[1], "status": row[3], "body": row[4], "candle_ack": row[5]}
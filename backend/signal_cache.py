@@ -0,0 +1,125 @@
+"""
+Signal Cache
+============
+TTL + LRU cache of finished trading signals with single-flight request
+coalescing.  EAs on many accounts that ask for the same symbol/timeframe
+within the same candle share one OpenAI call: the first request computes,
+concurrent identical requests await the same in-flight task, and later
+requests reuse the stored signal until it expires.
+
+A computation outlives any one waiter (a disconnecting leader does not cancel
+it for its followers), but once every waiter has gone it is cancelled — no
+one is left to read the answer.  Each waiter may bring its own ``timeout``:
+it stops waiting when that runs out, without cutting the others short.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+
+class SignalCache:
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        # key -> (created_at, expires_at, value), oldest first
+        self._entries: OrderedDict[Hashable, tuple[float, float, Any]] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Future] = {}
+        self._waiters: dict[asyncio.Future, int] = {}   # in-flight task -> requests awaiting it
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.abandoned = 0
+
+    def get(self, key: Hashable) -> Optional[tuple[Any, float]]:
+        """Return (value, age_seconds) for a live entry, else None."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        created_at, expires_at, value = entry
+        now = time.time()
+        if now >= expires_at:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value, now - created_at
+
+    def put(self, key: Hashable, value: Any, ttl_seconds: float):
+        if ttl_seconds <= 0:
+            return
+        now = time.time()
+        self._entries[key] = (now, now + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        key: Hashable,
+        compute: Callable[[], Awaitable[Any]],
+        ttl_for: Callable[[Any], float],
+        timeout: Optional[float] = None,
+    ) -> tuple[Any, str, float]:
+        """Return (value, status, age_seconds) where status is "hit",
+        "coalesced" or "miss".  The computation runs as its own task so a
+        disconnecting leader does not cancel it for the followers.  Raises
+        asyncio.TimeoutError if this caller's ``timeout`` runs out first."""
+        cached = self.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached[0], "hit", cached[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            status = "miss"
+            task = asyncio.ensure_future(self._compute(key, compute, ttl_for))
+            self._inflight[key] = task
+        else:
+            self.coalesced += 1
+            status = "coalesced"
+        return await self._wait(key, task, timeout), status, 0.0
+
+    async def _wait(self, key: Hashable, task: asyncio.Future, timeout: Optional[float] = None) -> Any:
+        """Await the shared ``task`` for up to ``timeout`` seconds; cancel it
+        when the last waiter leaves."""
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout)
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+                if not task.done():
+                    task.cancel()
+                    self.abandoned += 1
+                    # A new request for this key must start afresh, not join the cancelled task
+                    self._forget(key, task)
+
+    def _forget(self, key: Hashable, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _compute(self, key, compute, ttl_for):
+        try:
+            value = await compute()
+            self.put(key, value, ttl_for(value))
+            return value
+        finally:
+            self._forget(key, asyncio.current_task())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "abandoned": self.abandoned,
+            "hit_ratio": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+        }
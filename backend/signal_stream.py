@@ -0,0 +1,81 @@
+"""
+Streaming Signal Parser
+=======================
+Incremental reader for a streamed Structured Outputs completion.  The JSON
+arrives in schema order — symbol, timestamp_utc, bias, order {type, entry,
+sl, tp, expiry_minutes, comment}, confidence, veto, veto_reason — so the
+fields that decide a request are known well before the end of the answer.
+
+SignalStreamParser picks each of those fields out as soon as its value is
+complete.  early_exit() says when the rest is not worth waiting for: a
+no-trade answer (order.type "none"), or a pending order whose geometry is
+already invalid for the current quote.
+"""
+
+import re
+from typing import Any, Optional
+
+# A number only counts once the delimiter after it has arrived ("20" may
+# still become "2015.5").  Keys inside JSON strings are written as \"key\"
+# and never match.
+_NUMBER = r"(-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)\s*[,}]"
+FIELD_PATTERNS = {
+    "symbol": re.compile(r'"symbol"\s*:\s*"((?:[^"\\]|\\.)*)"'),
+    "bias": re.compile(r'"bias"\s*:\s*"(\w+)"'),
+    "type": re.compile(r'"type"\s*:\s*"(\w+)"'),
+    "entry": re.compile(r'"entry"\s*:\s*' + _NUMBER),
+    "sl": re.compile(r'"sl"\s*:\s*' + _NUMBER),
+    "tp": re.compile(r'"tp"\s*:\s*' + _NUMBER),
+}
+NUMERIC_FIELDS = {"entry", "sl", "tp"}
+
+
+class SignalStreamParser:
+    def __init__(self):
+        self.text = ""
+        self.fields: dict[str, Any] = {}
+        self.chunks = 0
+
+    def feed(self, delta: str) -> list[tuple[str, Any]]:
+        """Append a content delta; return the fields it completed."""
+        self.text += delta
+        self.chunks += 1
+        completed = []
+        for name, pattern in FIELD_PATTERNS.items():
+            if name in self.fields:
+                continue
+            match = pattern.search(self.text)
+            if match:
+                value = float(match.group(1)) if name in NUMERIC_FIELDS else match.group(1)
+                self.fields[name] = value
+                completed.append((name, value))
+        return completed
+
+
+def early_exit(fields: dict[str, Any], bid: float, ask: float) -> Optional[tuple[str, str]]:
+    """(kind, veto reason) once the partial answer already decides the
+    request, else None.  kind is "no_trade" or "geometry"."""
+    kind = fields.get("type")
+    if kind == "none":
+        return "no_trade", f"model: no trade setup (bias {fields.get('bias', 'neutral')})"
+    if kind not in ("buy_stop", "sell_stop"):
+        return None
+    # Checked field by field, in the order they arrive: entry, sl, tp
+    entry, sl, tp = fields.get("entry"), fields.get("sl"), fields.get("tp")
+    if entry is None:
+        return None
+    if kind == "buy_stop":
+        if entry <= ask:
+            return "geometry", f"invalid order geometry: buy_stop entry {entry} not above ask {ask}"
+        if sl is not None and sl >= entry:
+            return "geometry", f"invalid order geometry: buy_stop sl {sl} not below entry {entry}"
+        if tp is not None and tp <= entry:
+            return "geometry", f"invalid order geometry: buy_stop tp {tp} not above entry {entry}"
+    else:
+        if entry >= bid:
+            return "geometry", f"invalid order geometry: sell_stop entry {entry} not below bid {bid}"
+        if sl is not None and sl <= entry:
+            return "geometry", f"invalid order geometry: sell_stop sl {sl} not above entry {entry}"
+        if tp is not None and tp >= entry:
+            return "geometry", f"invalid order geometry: sell_stop tp {tp} not below entry {entry}"
+    return None
@@ -0,0 +1,143 @@
+"""
+Indicator micro-benchmark
+=========================
+Times, on synthetic candles:
+  legacy   — the original loops (simple-average ATR on one TF + highs/lows
+             list comprehensions per TF)
+  loops    — the engine's full indicator set written as plain Python loops
+  engine   — indicators.build_series + compute_indicators (rows → arrays → indicators)
+  compute  — compute_indicators alone, arrays already built (columnar input)
+
+Usage (from the backend folder):
+    python tools/bench_indicators.py
+    python tools/bench_indicators.py --sizes 200 1000 --repeat 200
+"""
+
+import argparse
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from indicators import build_series, compute_indicators, preferred_timeframe  # noqa: E402
+
+TIMEFRAMES = ["M5", "M15", "M30", "H1", "H4"]
+
+
+@dataclass
+class Candle:
+    time: str
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+def make_candles(n: int, seed: int) -> list[Candle]:
+    rng = np.random.default_rng(seed)
+    close = 2000 + np.cumsum(rng.normal(0, 1.5, n))
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    high = np.maximum(open_, close) + rng.random(n) * 2
+    low = np.minimum(open_, close) - rng.random(n) * 2
+    return [
+        Candle(f"2026-04-28T{i % 24:02d}:00:00", round(o, 2), round(h, 2), round(l, 2), round(c, 2), 100.0)
+        for i, (o, h, l, c) in enumerate(zip(open_, high, low, close))
+    ]
+
+
+def legacy(candles: dict[str, list[Candle]], price: float):
+    """The loops from main.py before the indicator engine."""
+    tf = "H1" if candles.get("H1") else "M15" if candles.get("M15") else next(iter(candles))
+    c_list = candles[tf]
+    trs = []
+    for i in range(1, len(c_list)):
+        high, low, prev_close = c_list[i].high, c_list[i].low, c_list[i - 1].close
+        trs.append(max(high - low, abs(high - prev_close), abs(low - prev_close)))
+    p = min(14, len(trs))
+    atr = sum(trs[-p:]) / p
+
+    summary = {}
+    for tf, tf_candles in candles.items():
+        subset = tf_candles[-60:]
+        highs = [c.high for c in subset]
+        lows = [c.low for c in subset]
+        recent_high, recent_low = max(highs), min(lows)
+        rng = recent_high - recent_low
+        position = (price - recent_low) / rng * 100 if rng > 0 else 50.0
+        summary[tf] = (recent_high, recent_low, position, subset[-1].close - subset[0].close)
+    return atr, summary
+
+
+def loops(candles: dict[str, list[Candle]], price: float):
+    """Wilder ATR, EMA20/50, SMA20, range, swings and slope for every TF in
+    pure Python — what the engine computes, without NumPy."""
+    out = {}
+    for tf, c_list in candles.items():
+        closes = [c.close for c in c_list]
+        trs = [max(c_list[i].high - c_list[i].low, abs(c_list[i].high - closes[i - 1]),
+                   abs(c_list[i].low - closes[i - 1])) for i in range(1, len(c_list))]
+        atr = sum(trs[:14]) / 14
+        for tr in trs[14:]:
+            atr += (tr - atr) / 14
+        emas = []
+        for period in (20, 50):
+            e = sum(closes[:period]) / period
+            for x in closes[period:]:
+                e += (x - e) * 2 / (period + 1)
+            emas.append(e)
+        sma20 = sum(closes[-20:]) / 20
+        subset = c_list[-60:]
+        highs = [c.high for c in subset]
+        lows = [c.low for c in subset]
+        w_close = closes[-60:]
+        swing_h = [highs[i] for i in range(2, len(highs) - 2)
+                   if all(highs[i] > highs[j] for j in (i - 2, i - 1, i + 1, i + 2))]
+        swing_l = [lows[i] for i in range(2, len(lows) - 2)
+                   if all(lows[i] < lows[j] for j in (i - 2, i - 1, i + 1, i + 2))]
+        n = len(w_close)
+        xm, ym = (n - 1) / 2, sum(w_close) / n
+        slope = sum((i - xm) * (y - ym) for i, y in enumerate(w_close)) / sum((i - xm) ** 2 for i in range(n))
+        rng = max(highs) - min(lows)
+        out[tf] = (atr, emas, sma20, (price - min(lows)) / rng * 100 if rng else 50.0, swing_h[-3:], swing_l[-3:], slope)
+    return out
+
+
+def engine(candles: dict[str, list[Candle]], price: float):
+    series = build_series(candles)
+    indicators = compute_indicators(series, price)
+    return indicators[preferred_timeframe(list(series))].atr, indicators
+
+
+def bench(fn, candles, price, repeat: int) -> float:
+    fn(candles, price)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(candles, price)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'candles/TF':>10} {'TFs':>4} {'legacy µs':>10} {'loops µs':>10} {'engine µs':>10} {'compute µs':>11}")
+    for n in args.sizes:
+        candles = {tf: make_candles(n, seed) for seed, tf in enumerate(TIMEFRAMES)}
+        price = candles["M5"][-1].close
+        series = build_series(candles)
+        t_legacy = bench(legacy, candles, price, args.repeat)
+        t_loops = bench(loops, candles, price, args.repeat)
+        t_engine = bench(engine, candles, price, args.repeat)
+        t_compute = bench(lambda _, p: compute_indicators(series, p), None, price, args.repeat)
+        print(f"{n:>10} {len(TIMEFRAMES):>4} {t_legacy:>10.0f} {t_loops:>10.0f} {t_engine:>10.0f} {t_compute:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
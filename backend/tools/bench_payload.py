@@ -0,0 +1,80 @@
+"""
+Payload format benchmark
+========================
+Compares the row /signal payload (one CandleData object per candle) with
+the columnar payload (``candles_columnar``: per-TF t/o/h/l/c/v arrays) on
+synthetic 5-timeframe requests.  Reports body size, parse time (JSON →
+validated request → candle arrays, i.e. everything before indicators) and
+peak memory allocated while parsing.
+
+Usage (from the backend folder):
+    python tools/bench_payload.py
+    python tools/bench_payload.py --sizes 200 1000 --repeat 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from sample_requests import BASE_REQUEST, synthetic_columns  # noqa: E402
+
+def make_bodies(n: int) -> tuple[bytes, bytes]:
+    """The same synthetic candles as a row and as a columnar body."""
+    columns = synthetic_columns(n)
+    rows = {
+        tf: [
+            {"time": np.datetime_as_string(np.datetime64(int(ts), "s")), "open": o, "high": h, "low": l,
+             "close": c, "volume": v}
+            for ts, o, h, l, c, v in zip(col["t"], col["o"], col["h"], col["l"], col["c"], col["v"])
+        ]
+        for tf, col in columns.items()
+    }
+    return (json.dumps({**BASE_REQUEST, "candles": rows}).encode(),
+            json.dumps({**BASE_REQUEST, "candles_columnar": columns}).encode())
+
+
+def parse(body: bytes):
+    return main.candle_series(main.parse_signal_body(body))
+
+
+def timed(body: bytes, repeat: int) -> float:
+    parse(body)  # warm-up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse(body)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def peak_memory(body: bytes) -> float:
+    tracemalloc.start()
+    result = parse(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1024
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    print(f"{'candles/TF':>10} {'format':>9} {'body KB':>9} {'parse ms':>9} {'peak KB':>9}")
+    for n in args.sizes:
+        for name, body in zip(("rows", "columnar"), make_bodies(n)):
+            print(f"{n:>10} {name:>9} {len(body) / 1024:>9.0f} {timed(body, args.repeat):>9.2f} {peak_memory(body):>9.0f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,112 @@
+"""
+Prompt encoding benchmark
+=========================
+Builds the full prompt (system + user message) for each candle encoding
+(verbose / csv / delta) from recorded /signal request bodies and reports
+prompt tokens per encoding.  With ``--live`` it also sends every prompt to
+OPENAI_MODEL and reports end-to-end latency (uses the .env API key).
+
+Recorded requests are JSON files holding a /signal body (row or columnar),
+or .jsonl files with one body per line.  Without any, a synthetic
+5-timeframe request is used.
+
+Token counts use tiktoken when it is installed (``pip install tiktoken``),
+otherwise an estimate of 4 characters per token (marked with ~).
+
+Usage (from the backend folder):
+    python tools/bench_prompt.py
+    python tools/bench_prompt.py requests/*.json --limit 40
+    python tools/bench_prompt.py requests.jsonl --live --repeat 3
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from candle_encoding import ENCODINGS  # noqa: E402
+from sample_requests import load_bodies  # noqa: E402
+
+try:
+    import tiktoken
+    _ENCODER = tiktoken.get_encoding("o200k_base")
+except ImportError:
+    _ENCODER = None
+
+
+def count_tokens(text: str) -> int:
+    if _ENCODER is None:
+        return len(text) // 4
+    return len(_ENCODER.encode(text))
+
+
+def build_messages(body: bytes, encoding: str, limit: int) -> list[dict]:
+    req = main.parse_signal_body(body)
+    series = main.candle_series(req)
+    indicators = main.compute_indicators(series, req.bid)
+    tf = main.preferred_timeframe(list(series))
+    atr_value = indicators[tf].atr if tf in indicators else 0.0
+    limits = {name.upper(): limit for name in series}
+    return [
+        {"role": "system", "content": main.build_system_prompt(req, atr_value)},
+        {"role": "user", "content": main.build_user_message(req, series, indicators, encoding, limits)},
+    ]
+
+
+async def live_latency(messages: list[dict], repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await main.call_model(main.OPENAI_MODEL, messages)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def run_async(args):
+    bodies = load_bodies(args.requests)
+    if args.live:
+        await main.openai_pool.start([main.OPENAI_MODEL])
+
+    mark = "" if _ENCODER else "~"
+    header = f"{'encoding':>9} {'system tok':>11} {'user tok':>9} {'total tok':>10}"
+    print(f"{len(bodies)} request(s), {args.limit} candles/TF" + ("" if _ENCODER else " — tiktoken not installed, estimating"))
+    print(header + (f" {'p50 s':>7} {'mean s':>7}" if args.live else ""))
+    try:
+        for encoding in ENCODINGS:
+            system_tok, user_tok, latencies = [], [], []
+            for body in bodies:
+                messages = build_messages(body, encoding, args.limit)
+                system_tok.append(count_tokens(messages[0]["content"]))
+                user_tok.append(count_tokens(messages[1]["content"]))
+                if args.live:
+                    latencies.extend(await live_latency(messages, args.repeat))
+            s, u = statistics.mean(system_tok), statistics.mean(user_tok)
+            line = f"{encoding:>9} {mark + f'{s:.0f}':>11} {mark + f'{u:.0f}':>9} {mark + f'{s + u:.0f}':>10}"
+            if latencies:
+                line += f" {statistics.median(latencies):>7.2f} {statistics.mean(latencies):>7.2f}"
+            print(line)
+    finally:
+        if args.live:
+            await main.openai_pool.close()
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("requests", nargs="*", help="recorded /signal bodies (.json or .jsonl)")
+    parser.add_argument("--limit", type=int, default=main.STRUCTURE_WINDOW, help="candles per timeframe")
+    parser.add_argument("--live", action="store_true", help="also call OPENAI_MODEL and time each prompt")
+    parser.add_argument("--repeat", type=int, default=1, help="live calls per request and encoding")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+    asyncio.run(run_async(args))
+
+
+if __name__ == "__main__":
+    run()
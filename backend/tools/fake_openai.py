@@ -0,0 +1,148 @@
+"""
+Fake OpenAI server
+==================
+A local stand-in for the chat-completions API, so the backend's throughput
+and latency can be measured without an API key or token cost.  It answers
+with a schema-valid trading signal built from the prompt (symbol, prices,
+ATR, expiry), after a random delay drawn from a log-normal distribution, and
+can inject errors and hangs.
+
+Point the backend at it with OPENAI_BASE_URL=http://127.0.0.1:9999/v1 (any
+OPENAI_API_KEY works).
+
+Usage (from the backend folder):
+    python tools/fake_openai.py
+    python tools/fake_openai.py --latency 4 --sigma 0.6 --error-rate 0.05 --timeout-rate 0.01
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+app = FastAPI(title="Fake OpenAI")
+config = argparse.Namespace(latency=3.0, sigma=0.5, error_rate=0.0, rate_limit_share=0.5,
+                            timeout_rate=0.0, hang_seconds=120.0, veto_rate=0.2)
+stats = {"requests": 0, "ok": 0, "errors": 0, "hangs": 0, "streams": 0}
+
+
+def _find(pattern: str, text: str, default: str) -> str:
+    match = re.search(pattern, text)
+    return match.group(1) if match else default
+
+
+def fake_signal(messages: list[dict]) -> dict:
+    system = next((m["content"] for m in messages if m["role"] == "system"), "")
+    user = next((m["content"] for m in messages if m["role"] == "user"), "")
+    symbol = _find(r'symbol = "([^"]+)"', system, "XAUUSD")
+    digits = int(_find(r"rounded to (\d+) decimal", system, "2"))
+    expiry = int(_find(r"expiry_minutes = (\d+)", system, "240"))
+    bid = float(_find(r"Bid=([\d.]+)", user, "2000"))
+    ask = float(_find(r"Ask=([\d.]+)", user, str(bid)))
+    atr = float(_find(r"ATR\(14\): ([\d.]+)", system, "0")) or bid * 0.001
+
+    if random.random() < config.veto_rate:
+        return {"symbol": symbol, "timestamp_utc": "", "bias": "neutral",
+                "order": {"type": "none", "entry": 0, "sl": 0, "tp": 0, "expiry_minutes": 0, "comment": "no setup"},
+                "confidence": 0.3, "veto": True, "veto_reason": "no clear setup (fake)"}
+    if random.random() < 0.5:
+        entry = ask + atr
+        order = {"type": "buy_stop", "entry": entry, "sl": entry - 1.5 * atr, "tp": entry + 3 * atr}
+        bias = "bullish"
+    else:
+        entry = bid - atr
+        order = {"type": "sell_stop", "entry": entry, "sl": entry + 1.5 * atr, "tp": entry - 3 * atr}
+        bias = "bearish"
+    order = {k: round(v, digits) if isinstance(v, float) else v for k, v in order.items()}
+    order.update(expiry_minutes=expiry, comment="fake breakout")
+    return {"symbol": symbol, "timestamp_utc": "", "bias": bias, "order": order,
+            "confidence": round(random.uniform(0.55, 0.85), 2), "veto": False, "veto_reason": ""}
+
+
+def usage_for(messages: list[dict], content: str) -> dict:
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4
+    system = sum(len(m.get("content") or "") for m in messages if m["role"] == "system") // 4
+    completion = len(content) // 4
+    return {"prompt_tokens": prompt, "completion_tokens": completion, "total_tokens": prompt + completion,
+            "prompt_tokens_details": {"cached_tokens": system // 128 * 128}}
+
+
+@app.get("/v1/models/{model}")
+async def get_model(model: str):
+    return {"id": model, "object": "model", "created": 0, "owned_by": "fake"}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    stats["requests"] += 1
+    model, messages = body.get("model", "fake"), body.get("messages", [])
+
+    roll = random.random()
+    if roll < config.timeout_rate:
+        stats["hangs"] += 1
+        await asyncio.sleep(config.hang_seconds)
+    delay = config.latency * math.exp(config.sigma * random.gauss(0, 1))
+    await asyncio.sleep(delay)
+    if config.timeout_rate <= roll < config.timeout_rate + config.error_rate:
+        stats["errors"] += 1
+        status = 429 if random.random() < config.rate_limit_share else 500
+        return JSONResponse(status_code=status, content={"error": {"message": f"fake {status}", "type": "fake"}},
+                            headers={"retry-after": "0"})
+
+    content = json.dumps(fake_signal(messages)) if "response_format" in body else "pong"
+    usage = usage_for(messages, content)
+    stats["ok"] += 1
+    created = int(time.time())
+
+    if body.get("stream"):
+        stats["streams"] += 1
+
+        async def chunks():
+            for i in range(0, len(content), 16):
+                chunk = {"id": "fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                         "choices": [{"index": 0, "delta": {"content": content[i:i + 16]}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0.005)
+            last = {"id": "fake", "object": "chat.completion.chunk", "created": created, "model": model,
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+            if (body.get("stream_options") or {}).get("include_usage"):
+                last["usage"] = usage
+            yield f"data: {json.dumps(last)}\n\n"
+            yield "data: [DONE]\n\n"
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return {"id": "fake", "object": "chat.completion", "created": created, "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage}
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--latency", type=float, default=config.latency, help="median response time (s)")
+    parser.add_argument("--sigma", type=float, default=config.sigma, help="log-normal spread of the response time")
+    parser.add_argument("--error-rate", type=float, default=config.error_rate, help="share of 429/500 answers")
+    parser.add_argument("--rate-limit-share", type=float, default=config.rate_limit_share, help="share of errors that are 429")
+    parser.add_argument("--timeout-rate", type=float, default=config.timeout_rate, help="share of requests that hang")
+    parser.add_argument("--hang-seconds", type=float, default=config.hang_seconds, help="how long a hang lasts (s)")
+    parser.add_argument("--veto-rate", type=float, default=config.veto_rate, help="share of veto signals")
+    args = parser.parse_args()
+    vars(config).update({k: v for k, v in vars(args).items() if k != "port"})
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    run()
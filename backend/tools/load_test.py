@@ -0,0 +1,182 @@
+"""
+Load test
+=========
+Replays recorded /signal bodies (CAPTURE_ENABLED=true writes them to
+logs/captures.jsonl) against the backend at a fixed concurrency and reports
+latency percentiles, throughput, status/veto counts and event-loop lag.
+
+Two targets:
+  --url       a running backend (default http://127.0.0.1:8000/signal);
+              the loop lag shown is this client's own loop.
+  --in-process  imports main.py and drives the app through httpx's ASGI
+              transport in this process, so the loop lag is the server's.
+              Pre-filter gates and the per-account rate limit are turned
+              off; add other settings with --env KEY=VALUE.
+
+Pair it with tools/fake_openai.py (OPENAI_BASE_URL=http://127.0.0.1:9999/v1)
+to measure the backend without an API key.  Without capture files a
+synthetic 5-timeframe request is replayed.
+
+Usage (from the backend folder):
+    python tools/load_test.py logs/captures.jsonl --concurrency 20 --requests 500
+    python tools/load_test.py logs/captures.jsonl --in-process --no-cache --duration 60 \\
+        --env OPENAI_BASE_URL=http://127.0.0.1:9999/v1
+"""
+
+import argparse
+import asyncio
+import gzip
+import itertools
+import json
+import logging
+import os
+import statistics
+import sys
+import time
+import zlib
+from collections import Counter
+
+import httpx
+
+from sample_requests import load_bodies
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def encode_bodies(bodies: list[bytes], encoding: str) -> list[bytes]:
+    """Pre-compress the bodies so the client's CPU time is not measured."""
+    if encoding == "gzip":
+        encoded = [gzip.compress(b, 5) for b in bodies]
+    elif encoding == "deflate":
+        encoded = [zlib.compress(b, 5) for b in bodies]
+    else:
+        import zstandard
+        encoded = [zstandard.ZstdCompressor().compress(b) for b in bodies]
+    raw, wire = sum(map(len, bodies)), sum(map(len, encoded))
+    print(f"bodies:      {encoding} {raw / len(bodies) / 1024:.1f} KB → {wire / len(bodies) / 1024:.1f} KB "
+          f"per request ({raw / wire:.1f}×)")
+    return encoded
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def sample_loop_lag(samples: list[float], interval: float = 0.01):
+    """Oversleep of a 10 ms timer — how long callbacks wait for the loop."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - start - interval)
+
+
+async def replay(client: httpx.AsyncClient, url: str, bodies: list[bytes], args) -> dict:
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    vetoes: Counter = Counter()
+    counter = itertools.count()
+    deadline = time.monotonic() + args.duration if args.duration else None
+    headers = {"content-type": "application/json"}
+    if args.encoding:
+        headers["content-encoding"] = args.encoding
+
+    async def worker():
+        while True:
+            i = next(counter)
+            if deadline is None and i >= args.requests:
+                return
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+            start = time.perf_counter()
+            try:
+                resp = await client.post(url, content=bodies[i % len(bodies)], headers=headers)
+            except httpx.HTTPError as e:
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+            statuses[resp.status_code] += 1
+            if resp.status_code == 200:
+                data = resp.json()
+                if data.get("veto"):
+                    vetoes[data.get("veto_reason", "").split(":")[0][:40]] += 1
+
+    lag: list[float] = []
+    sampler = asyncio.ensure_future(sample_loop_lag(lag))
+    start = time.perf_counter()
+    try:
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    finally:
+        sampler.cancel()
+    return {"elapsed": time.perf_counter() - start, "latencies": sorted(latencies),
+            "statuses": statuses, "vetoes": vetoes, "lag": sorted(lag)}
+
+
+def report(result: dict, concurrency: int, lag_label: str):
+    lat, lag = result["latencies"], result["lag"]
+    print(f"requests:    {len(lat)} in {result['elapsed']:.1f}s at concurrency {concurrency} "
+          f"→ {len(lat) / result['elapsed']:.1f} req/s")
+    if lat:
+        print(f"latency:     p50 {percentile(lat, 0.5):.3f}s  p95 {percentile(lat, 0.95):.3f}s  "
+              f"p99 {percentile(lat, 0.99):.3f}s  max {lat[-1]:.3f}s  mean {statistics.mean(lat):.3f}s")
+    print("status:      " + ", ".join(f"{k}×{v}" for k, v in sorted(result["statuses"].items(), key=str)))
+    if result["vetoes"]:
+        print("vetoes:      " + ", ".join(f"{k or '?'}×{v}" for k, v in result["vetoes"].most_common()))
+    if lag:
+        print(f"{lag_label}: p50 {percentile(lag, 0.5) * 1000:.1f}ms  p99 {percentile(lag, 0.99) * 1000:.1f}ms  "
+              f"max {lag[-1] * 1000:.1f}ms")
+
+
+async def run_async(args):
+    if args.in_process:
+        os.environ.update({"PREFILTER_GATES": "", "ACCOUNT_RATE_PER_MINUTE": "0"})
+        if args.no_cache:
+            os.environ["SIGNAL_CACHE_ENABLED"] = "false"
+        os.environ.update(kv.split("=", 1) for kv in args.env)
+        os.chdir(BACKEND_DIR)
+        sys.path.insert(0, BACKEND_DIR)
+        import main
+
+        if args.quiet:
+            logging.getLogger().setLevel(logging.WARNING)
+        bodies = load_bodies(args.requests_files)
+        if args.encoding:
+            bodies = encode_bodies(bodies, args.encoding)
+        transport = httpx.ASGITransport(app=main.app)
+        async with main.app.router.lifespan_context(main.app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=None) as client:
+                result = await replay(client, "/signal", bodies, args)
+        report(result, args.concurrency, "server loop lag")
+    else:
+        bodies = load_bodies(args.requests_files)
+        if args.encoding:
+            bodies = encode_bodies(bodies, args.encoding)
+        limits = httpx.Limits(max_connections=args.concurrency)
+        async with httpx.AsyncClient(limits=limits, timeout=args.timeout) as client:
+            result = await replay(client, args.url, bodies, args)
+        report(result, args.concurrency, "client loop lag")
+
+
+def run():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("requests_files", nargs="*", help="recorded /signal bodies (.json or .jsonl)")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/signal")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200, help="total requests (ignored with --duration)")
+    parser.add_argument("--duration", type=float, default=0, help="run for this many seconds instead")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per-request HTTP timeout (s)")
+    parser.add_argument("--encoding", choices=("gzip", "deflate", "zstd"),
+                        help="send the bodies compressed (Content-Encoding)")
+    parser.add_argument("--in-process", action="store_true", help="run main.app in this process")
+    parser.add_argument("--no-cache", action="store_true", help="--in-process: disable the signal cache")
+    parser.add_argument("--quiet", action="store_true", help="--in-process: log warnings and errors only")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="--in-process: extra backend setting (repeatable)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run_async(args))
+
+
+if __name__ == "__main__":
+    run()
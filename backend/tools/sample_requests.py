@@ -0,0 +1,53 @@
+"""
+Sample requests
+===============
+/signal request bodies for the tools in this folder: recorded ones loaded
+from disk, or a synthetic 5-timeframe request when none are given.
+
+Recorded requests are JSON files holding a /signal body (row or columnar),
+or .jsonl files with one body per line (CAPTURE_ENABLED=true writes
+logs/captures.jsonl).
+"""
+
+import json
+
+import numpy as np
+
+TIMEFRAMES = {"M5": 300, "M15": 900, "M30": 1800, "H1": 3600, "H4": 14400}
+
+BASE_REQUEST = {"account_id": "bench", "symbol": "XAUUSD", "timeframe": "M15", "bid": 2000.0, "ask": 2000.2,
+                "spread_points": 20, "digits": 2, "point": 0.01}
+
+
+def synthetic_columns(n: int = 200) -> dict[str, dict[str, list]]:
+    """``candles_columnar`` for a random walk around 2000, ``n`` candles per TF."""
+    columns = {}
+    for seed, (tf, seconds) in enumerate(TIMEFRAMES.items()):
+        rng = np.random.default_rng(seed)
+        close = np.round(2000 + np.cumsum(rng.normal(0, 1.5, n)), 2)
+        open_ = np.concatenate(([close[0]], close[:-1]))
+        columns[tf] = {
+            "t": (1777377300 - seconds * np.arange(n)[::-1]).tolist(),
+            "o": open_.tolist(),
+            "h": np.round(np.maximum(open_, close) + rng.random(n) * 2, 2).tolist(),
+            "l": np.round(np.minimum(open_, close) - rng.random(n) * 2, 2).tolist(),
+            "c": close.tolist(),
+            "v": rng.integers(50, 500, n).astype(float).tolist(),
+        }
+    return columns
+
+
+def synthetic_body(n: int = 200) -> bytes:
+    return json.dumps({**BASE_REQUEST, "candles_columnar": synthetic_columns(n)}).encode()
+
+
+def load_bodies(paths: list[str]) -> list[bytes]:
+    """Bodies from .json / .jsonl files, or one synthetic body without any."""
+    bodies = []
+    for path in paths:
+        with open(path, "rb") as f:
+            if path.endswith(".jsonl"):
+                bodies.extend(line for line in f.read().splitlines() if line.strip())
+            else:
+                bodies.append(f.read())
+    return bodies or [synthetic_body()]
@@ -0,0 +1,114 @@
+"""
+WebSocket client
+================
+Reference client for the backend's /ws channel, for testing and as a model
+for an EA-side implementation.  It keeps one connection open, sends a signal
+request every --interval seconds, prints what the server pushes, answers
+heartbeats, acknowledges every sequenced message, and reconnects with
+resume after a drop (so a signal that finished while it was offline is
+still delivered).
+
+Without request files a synthetic 5-timeframe request is sent.
+
+Usage (from the backend folder):
+    python tools/ws_client.py --account 12345678
+    python tools/ws_client.py logs/captures.jsonl --account 12345678 --interval 60 --count 5
+    python tools/ws_client.py --account 12345678 --drop-after 1    # test resume
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import websockets
+
+from sample_requests import load_bodies
+
+
+def load_requests(paths: list[str]) -> list[dict]:
+    return [json.loads(body) for body in load_bodies(paths)]
+
+
+def show(message: dict):
+    kind = message.get("type")
+    if kind == "signal" and message.get("status") == 200:
+        s = message["signal"]
+        order = s["order"]
+        print(f"[{message['seq']}] signal {message.get('id')}: {s['symbol']} {s['bias']} {order['type']} "
+              f"entry={order['entry']} sl={order['sl']} tp={order['tp']} veto={s['veto']} {s['veto_reason']}")
+    elif kind == "progress":
+        fields = {k: v for k, v in message.items() if k not in ("type", "id", "seq")}
+        print(f"[{message['seq']}] progress {message.get('id')}: {fields}")
+    else:
+        print(f"[{message.get('seq', '-')}] {json.dumps(message)[:200]}")
+
+
+async def run(args):
+    requests = load_requests(args.requests_files)
+    session, last_seq = None, 0
+    sent = answered = drops = 0
+
+    while answered < args.count:
+        url = f"{args.url}?account_id={args.account}"
+        if session:
+            url += f"&resume={session}&last_seq={last_seq}"
+        try:
+            async with websockets.connect(url, max_size=None) as ws:
+                next_send = time.monotonic()
+                ready = False   # requests go out once the server said hello
+                while answered < args.count:
+                    if ready and sent < args.count and sent == answered and time.monotonic() >= next_send:
+                        body = {**requests[sent % len(requests)], "account_id": args.account}
+                        await ws.send(json.dumps({"type": "signal", "id": f"req-{sent}", "request": body}))
+                        sent += 1
+                        next_send = time.monotonic() + args.interval
+                        if drops < args.drop_after:
+                            drops += 1
+                            print("-- dropping the connection while the signal is computed")
+                            break
+                    try:
+                        text = await asyncio.wait_for(ws.recv(), timeout=1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    message = json.loads(text)
+                    if message["type"] == "hello":
+                        print(f"-- session {message['session']} ({'resumed' if message['resumed'] else 'new'})")
+                        if not message["resumed"] and session:
+                            sent = answered   # the old session is gone: ask again
+                        session, ready = message["session"], True
+                        continue
+                    if message["type"] == "ping":
+                        await ws.send(json.dumps({"type": "pong"}))
+                        continue
+                    if message["type"] == "error":
+                        print(f"-- error: {message}")
+                        if message.get("detail") == "too_many_connections":
+                            return
+                        continue
+                    show(message)
+                    if "seq" in message:
+                        last_seq = message["seq"]
+                        await ws.send(json.dumps({"type": "ack", "seq": last_seq}))
+                    if message["type"] == "signal":
+                        answered += 1
+        except (OSError, websockets.ConnectionClosed) as e:
+            print(f"-- connection lost ({e}); reconnecting")
+        await asyncio.sleep(args.reconnect_delay)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("requests_files", nargs="*", help="recorded /signal bodies (.json or .jsonl)")
+    parser.add_argument("--url", default="ws://127.0.0.1:8000/ws")
+    parser.add_argument("--account", required=True, help="account_id for the connection")
+    parser.add_argument("--count", type=int, default=3, help="signals to request before exiting")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between signal requests")
+    parser.add_argument("--drop-after", type=int, default=0, metavar="N",
+                        help="drop the connection right after sending each of the first N requests")
+    parser.add_argument("--reconnect-delay", type=float, default=1.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+WebSocket Sessions
+==================
+State behind the ``/ws`` channel.  An EA keeps one connection open, sends
+signal requests and candle updates over it, and gets each answer pushed as
+soon as it is ready.
+
+Every message the server pushes gets a sequence number and stays in the
+session's outbox until the client acknowledges it.  When the connection
+drops, the session (and any signal still being computed for it) is kept for
+``resume_seconds``; reconnecting with ``?resume=<session>&last_seq=<n>``
+replays everything after ``n`` and carries on.  Each account may hold at
+most ``max_per_account`` live connections.  Sessions nobody resumed are
+swept every ``sweep_seconds`` (see start()), along with their outbox and any
+signal still being computed for them.
+
+Sessions live in this process only: in multi-worker mode a reconnect that
+lands on another worker starts a fresh session.
+"""
+
+import asyncio
+import secrets
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+
+class ConnectionLimit(Exception):
+    """The account already holds its maximum number of connections."""
+
+
+@dataclass
+class WSSession:
+    id: str
+    account_id: str
+    max_outbox: int = 100
+    next_seq: int = 1
+    connected: bool = False
+    generation: int = 0              # bumped per connection; a stale one stops sending
+    delivered: int = 0               # highest seq written to the current connection
+    detached_at: Optional[float] = None
+    outbox: deque = field(default_factory=deque)   # (seq, message), oldest first
+    tasks: set = field(default_factory=set)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+    dropped: int = 0
+
+    def push(self, message: dict[str, Any]) -> int:
+        """Queue a message for delivery (and redelivery after a resume)."""
+        seq = self.next_seq
+        self.next_seq += 1
+        self.outbox.append((seq, {**message, "seq": seq}))
+        while len(self.outbox) > self.max_outbox:
+            self.outbox.popleft()
+            self.dropped += 1
+        self.wakeup.set()
+        return seq
+
+    def ack(self, seq: int):
+        while self.outbox and self.outbox[0][0] <= seq:
+            self.outbox.popleft()
+
+    def undelivered(self) -> list[dict[str, Any]]:
+        messages = [m for s, m in self.outbox if s > self.delivered]
+        if messages:
+            self.delivered = messages[-1]["seq"]
+        return messages
+
+    def track(self, task: asyncio.Task):
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+class SessionRegistry:
+    def __init__(self, max_per_account: int = 2, resume_seconds: float = 300.0, max_outbox: int = 100,
+                 sweep_seconds: float = 30.0):
+        self.max_per_account = max_per_account
+        self.resume_seconds = resume_seconds
+        self.max_outbox = max_outbox
+        self.sweep_seconds = sweep_seconds
+        self._sessions: dict[str, WSSession] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.connections = 0
+        self.resumed = 0
+        self.rejected = 0
+        self.expired = 0
+
+    def attach(self, account_id: str, resume_id: Optional[str] = None, last_seq: int = 0) -> tuple[WSSession, bool]:
+        """Session for a new connection: the one named by ``resume_id`` if it
+        is still held for this account, else a fresh one.  Returns (session,
+        resumed).  Raises ConnectionLimit."""
+        self._expire()
+        session = self._sessions.get(resume_id) if resume_id else None
+        resumed = session is not None and session.account_id == account_id
+        if not resumed:
+            live = sum(1 for s in self._sessions.values() if s.connected and s.account_id == account_id)
+            if self.max_per_account > 0 and live >= self.max_per_account:
+                self.rejected += 1
+                raise ConnectionLimit
+            session = WSSession(secrets.token_urlsafe(12), account_id, self.max_outbox)
+            self._sessions[session.id] = session
+        else:
+            # Drop what the client already has; a half-dead old connection is taken over
+            self.resumed += 1
+            session.ack(last_seq)
+        session.generation += 1
+        session.delivered = last_seq if resumed else 0
+        session.connected = True
+        session.detached_at = None
+        session.wakeup.set()
+        self.connections += 1
+        return session, resumed
+
+    def detach(self, session: WSSession, generation: int):
+        """The connection that was ``generation`` has ended."""
+        if session.generation != generation:
+            return  # already taken over by a newer connection
+        session.connected = False
+        session.detached_at = time.time()
+        self._expire()
+
+    def live(self) -> int:
+        return sum(1 for s in self._sessions.values() if s.connected)
+
+    def _expire(self):
+        cutoff = time.time() - self.resume_seconds
+        for session_id, session in list(self._sessions.items()):
+            if not session.connected and session.detached_at is not None and session.detached_at < cutoff:
+                for task in session.tasks:
+                    task.cancel()
+                del self._sessions[session_id]
+                self.expired += 1
+
+    def start(self):
+        if self._sweeper is None:
+            self._sweeper = asyncio.ensure_future(self._sweep())
+
+    async def _sweep(self):
+        while True:
+            await asyncio.sleep(self.sweep_seconds)
+            self._expire()
+
+    async def close(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+        tasks = [t for s in self._sessions.values() for t in s.tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._sessions.clear()
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "connected": self.live(),
+            "max_per_account": self.max_per_account,
+            "connections": self.connections,
+            "resumed": self.resumed,
+            "rejected": self.rejected,
+            "expired": self.expired,
+        }